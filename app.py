@@ -2,7 +2,7 @@ import dash
 import dash_bootstrap_components as dbc
 from flask import Flask
 from flask_login import LoginManager
-from database.db import db
+from database.db import db, configurar_sqlite, instrumentar_sql
 from database.models import Usuario
 import os
 
@@ -18,6 +18,8 @@ server.config.update(
 
 # 2. Inicializar Base de Datos con la App
 db.init_app(server)
+configurar_sqlite(server) # Modo WAL: lecturas largas (exportaciones) no bloquean aprobaciones ni pagos
+instrumentar_sql(server) # Sentencias y tiempo por callback (página /admin_sql)
 
 # 3. Configurar Flask-Login
 login_manager = LoginManager()
@@ -0,0 +1,76 @@
+# Benchmark del motor de amortización: versión vectorizada vs. la versión con ciclo + pandas.
+# Uso: python benchmark_financiero.py
+import timeit
+import pandas as pd
+import numpy as np
+from datetime import date
+from dateutil.relativedelta import relativedelta
+from utils.financiero import plan_pagos_columnar, calcular_plan_pagos, calcular_planes_lote
+from utils.config import TASA_INTERES_ADMIN
+
+MONTO = 1500000
+FECHA = date(2024, 1, 31) # Fin de mes para probar el ajuste de días
+
+
+def plan_pagos_bucle(monto, tasa_mensual, num_cuotas, fecha_inicio):
+    """Implementación original (una fila por iteración y DataFrame al final). Solo para comparar."""
+    if tasa_mensual > 0:
+        cuota = monto * (tasa_mensual * (1 + tasa_mensual)**num_cuotas) / ((1 + tasa_mensual)**num_cuotas - 1)
+    else:
+        cuota = monto / num_cuotas
+
+    saldo = monto
+    plan = []
+
+    for i in range(1, num_cuotas + 1):
+        interes = saldo * tasa_mensual
+        capital = cuota - interes
+        saldo -= capital
+        vencimiento = fecha_inicio + relativedelta(months=i)
+        plan.append({
+            'Cuota #': i,
+            'Fecha Pago': vencimiento,
+            'Valor Cuota': round(cuota, 2),
+            'Interés': round(interes, 2),
+            'Abono Capital': round(capital, 2),
+            'Saldo Restante': round(saldo if saldo > 0 else 0, 2)
+        })
+
+    return pd.DataFrame(plan)
+
+
+def verificar(n):
+    """Confirma que ambas versiones dan la misma tabla (centavo a centavo)."""
+    viejo = plan_pagos_bucle(MONTO, TASA_INTERES_ADMIN, n, FECHA)
+    nuevo = calcular_plan_pagos(MONTO, TASA_INTERES_ADMIN, n, FECHA)
+    assert list(viejo['Fecha Pago']) == list(nuevo['Fecha Pago']), f"Fechas distintas (n={n})"
+    for col in ['Valor Cuota', 'Interés', 'Abono Capital', 'Saldo Restante']:
+        assert np.allclose(viejo[col], nuevo[col], atol=0.011), f"Columna {col} distinta (n={n})"
+
+
+def benchmark_lote(num_prestamos=2000):
+    """Planes de muchos préstamos: un llamado por préstamo vs. calcular_planes_lote."""
+    rng = np.random.default_rng(0)
+    montos = rng.integers(10, 500, num_prestamos) * 10000
+    tasas = np.full(num_prestamos, TASA_INTERES_ADMIN)
+    cuotas = rng.integers(1, 37, num_prestamos)
+    fechas = np.full(num_prestamos, np.datetime64(FECHA))
+
+    t_uno_a_uno = timeit.timeit(lambda: [plan_pagos_columnar(m, t, n, FECHA) for m, t, n in zip(montos, tasas, cuotas)], number=1)
+    t_lote = timeit.timeit(lambda: calcular_planes_lote(montos, tasas, cuotas, fechas), number=1)
+    print(f"\n{num_prestamos} préstamos ({cuotas.sum()} cuotas): uno a uno {t_uno_a_uno * 1000:.1f} ms | lote {t_lote * 1000:.1f} ms | {t_uno_a_uno / t_lote:.1f}x")
+
+
+if __name__ == "__main__":
+    repeticiones = 200
+    print(f"{'Cuotas':>6} | {'Bucle+pandas (µs)':>18} | {'Columnar (µs)':>14} | {'Adaptador DF (µs)':>18} | {'Aceleración':>11}")
+    print("-" * 80)
+    for n in range(1, 37):
+        verificar(n)
+        t_bucle = timeit.timeit(lambda: plan_pagos_bucle(MONTO, TASA_INTERES_ADMIN, n, FECHA), number=repeticiones)
+        t_col = timeit.timeit(lambda: plan_pagos_columnar(MONTO, TASA_INTERES_ADMIN, n, FECHA), number=repeticiones)
+        t_df = timeit.timeit(lambda: calcular_plan_pagos(MONTO, TASA_INTERES_ADMIN, n, FECHA), number=repeticiones)
+        us = 1e6 / repeticiones
+        print(f"{n:>6} | {t_bucle * us:>18.1f} | {t_col * us:>14.1f} | {t_df * us:>18.1f} | {t_bucle / t_col:>10.1f}x")
+
+    benchmark_lote()
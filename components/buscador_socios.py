@@ -0,0 +1,69 @@
+import dash
+from dash import dcc, Input, Output, State, callback
+from sqlalchemy import select, or_
+from database.db import db
+from database.models import Usuario, ResumenUsuario
+from utils.texto import normalizar_texto
+
+# Opciones que se envían por búsqueda
+LIMITE_OPCIONES = 20
+# Desde cuántas letras se busca también dentro del nombre (ej: el apellido), si el prefijo no alcanza
+MINIMO_LETRAS_APELLIDO = 3
+
+
+def buscar_socios(texto=None, limite=LIMITE_OPCIONES, solo_con_prestamos=False):
+    """
+    Los primeros 'limite' socios cuyo nombre o usuario empieza por 'texto' (sin distinguir mayúsculas ni tildes).
+    'texto' se normaliza igual que nombre_busqueda y usuario_busqueda, y el prefijo se busca como rango sobre sus índices.
+    Si no alcanzan, se completa con nombres que tengan una palabra que empiece por 'texto'
+    (ej: el apellido; ese caso sí recorre la tabla, pero se corta en 'limite').
+    solo_con_prestamos: solo socios con préstamos activos (mismo query, JOIN con resumen_usuario).
+    Devuelve [(id, nombre_completo, username)].
+    """
+    nombre, usuario = Usuario.nombre_busqueda, Usuario.usuario_busqueda
+    consulta = select(Usuario.id, Usuario.nombre_completo, Usuario.username).order_by(nombre).limit(limite)
+    if solo_con_prestamos:
+        consulta = consulta.join(ResumenUsuario, ResumenUsuario.usuario_id == Usuario.id).where(ResumenUsuario.prestamos_activos > 0)
+
+    texto = normalizar_texto(texto)
+    if not texto:
+        return db.session.execute(consulta).all()
+
+    fin = texto + '\uffff' # Todo lo que empieza por 'texto' queda en [texto, fin)
+    socios = db.session.execute(consulta.where(or_(
+        nombre.between(texto, fin), usuario.between(texto, fin)
+    ))).all()
+
+    if len(socios) < limite and len(texto) >= MINIMO_LETRAS_APELLIDO:
+        encontrados = [s.id for s in socios]
+        socios += db.session.execute(
+            consulta.where(nombre.contains(' ' + texto, autoescape=True), Usuario.id.notin_(encontrados))
+            .limit(limite - len(socios))
+        ).all()
+    return socios
+
+
+def crear_buscador_socios(id_buscador, placeholder="Escribe el nombre o usuario...", **props):
+    """Dropdown cuyas opciones se piden al servidor mientras se escribe (ver registrar_buscador_socios)."""
+    return dcc.Dropdown(id=id_buscador, options=[], placeholder=placeholder, searchable=True, **props)
+
+
+def registrar_buscador_socios(id_buscador, solo_con_prestamos=False, limite=LIMITE_OPCIONES):
+    """Registra el callback search_value -> options del buscador. El socio ya elegido siempre queda en las opciones."""
+    @callback(
+        Output(id_buscador, 'options'),
+        Input(id_buscador, 'search_value'),
+        State(id_buscador, 'value'),
+        State(id_buscador, 'options')
+    )
+    def opciones_socios(texto, valor, opciones):
+        if not texto and valor:
+            return dash.no_update # Se acaba de elegir un socio: se mantiene su opción
+
+        opciones_nuevas = [{'label': f"{nombre or usuario} ({usuario})", 'value': uid}
+                           for uid, nombre, usuario in buscar_socios(texto, limite, solo_con_prestamos)]
+        if valor and valor not in {o['value'] for o in opciones_nuevas}:
+            opciones_nuevas += [o for o in opciones or [] if o['value'] == valor]
+        return opciones_nuevas
+
+    return opciones_socios
@@ -0,0 +1,50 @@
+import functools
+import json
+import threading
+from collections import OrderedDict
+from plotly.io.json import to_json_plotly
+from database.resumen import version_fondo
+from utils.config import CACHE_FIGURAS
+
+# Figuras y bloques del Dashboard guardados ya serializados (JSON), con la versión de los totales del fondo
+# en la llave: mientras no se apruebe, pague o recalcule nada, visitar el Dashboard no arma ninguna figura.
+# Es un LRU por proceso (cada worker arma cada versión una vez).
+_candado = threading.Lock()
+_guardadas = OrderedDict() # (nombre, versión, argumentos) -> texto JSON
+_estadisticas = {'aciertos': 0, 'fallos': 0}
+
+
+def cache_por_version_fondo(nombre):
+    """
+    Decorador para funciones que arman figuras o componentes a partir de los datos del fondo.
+    Devuelve el resultado ya decodificado (dict) desde el caché; solo se llama a la función cuando
+    cambia la versión de los totales del fondo o los argumentos (que deben ser hashables, ej: fechas).
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envuelta(*args):
+            clave = (nombre, version_fondo(), args)
+            with _candado:
+                texto = _guardadas.get(clave)
+                if texto is not None:
+                    _guardadas.move_to_end(clave)
+                    _estadisticas['aciertos'] += 1
+            if texto is not None:
+                return json.loads(texto)
+
+            resultado = funcion(*args)
+            texto = to_json_plotly(resultado)
+            with _candado:
+                _guardadas[clave] = texto
+                while len(_guardadas) > CACHE_FIGURAS:
+                    _guardadas.popitem(last=False)
+                _estadisticas['fallos'] += 1
+            return json.loads(texto) # Mismo tipo de resultado en aciertos y fallos
+        return envuelta
+    return decorador
+
+
+def estadisticas_cache_figuras():
+    """Aciertos/fallos del caché de figuras del Dashboard (para monitoreo)."""
+    with _candado:
+        return {**_estadisticas, 'tamano': len(_guardadas), 'maximo': CACHE_FIGURAS}
@@ -19,7 +19,11 @@ def crear_navbar():
                         dbc.DropdownMenuItem("👥 Gestionar Usuarios", href="/admin_usuarios"),
                         dbc.DropdownMenuItem("✍️ Aprobar Créditos", href="/admin_prestamos"),
                         dbc.DropdownMenuItem("💰 Registrar Pagos", href="/admin_pagos"),
+                        dbc.DropdownMenuItem("🏦 Conciliación Bancaria", href="/admin_conciliacion"),
+                        dbc.DropdownMenuItem("⏳ Antigüedad de Cartera", href="/admin_cartera"),
                         dbc.DropdownMenuItem("📥 Gestionar Aportes", href="/admin_aportes"),
+                        dbc.DropdownMenuItem(divider=True),
+                        dbc.DropdownMenuItem("🧪 Rendimiento SQL", href="/admin_sql"),
                     ],
                     nav=True,
                     in_navbar=True,
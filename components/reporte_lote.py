@@ -0,0 +1,18 @@
+from dash import html
+import dash_bootstrap_components as dbc
+
+
+def crear_reporte_lote(resultado, accion, etiquetas, motivo_omitido="ya no estaba pendiente"):
+    """
+    Alerta con el resultado de una acción en lote, fila por fila.
+    resultado: ResultadoOperacion; accion: ej. 'Aprobado'; etiquetas: {id: texto para mostrar la fila}.
+    """
+    filas = [html.Li(f"✅ {etiquetas.get(i, f'#{i}')}: {accion}") for i in resultado.procesados]
+    filas += [html.Li(f"⚠️ {etiquetas.get(i, f'#{i}')}: {motivo_omitido}, sin cambios") for i in resultado.omitidos]
+
+    total = len(resultado.procesados) + len(resultado.omitidos)
+    return dbc.Alert([
+        html.Strong(f"{len(resultado.procesados)} de {total} procesados "
+                    f"({resultado.filas} filas escritas en {resultado.duracion_ms:.0f} ms)"),
+        html.Ul(filas, className="mb-0 mt-2 small")
+    ], color="success" if not resultado.omitidos else "warning")
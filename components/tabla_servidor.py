@@ -0,0 +1,195 @@
+import json
+import math
+from collections import namedtuple
+from datetime import date, datetime
+from dash import dcc, html, Input, Output, State, callback, dash_table
+from sqlalchemy import select, func, tuple_, cast, literal, String
+from database.db import db
+
+# Columna de una tabla paginada en el servidor:
+# id = llave en las filas de la DataTable, nombre = encabezado,
+# expresion = columna/expresión SQL para filtrar y ordenar (None = no se puede), tipo = 'texto', 'numero' o 'fecha'
+ColumnaServidor = namedtuple('ColumnaServidor', ['id', 'nombre', 'expresion', 'tipo'])
+
+TIPOS_DATATABLE = {'texto': 'text', 'numero': 'numeric', 'fecha': 'datetime'}
+
+# Operadores de filter_query de la DataTable (mismo orden que el ejemplo de la documentación de Dash)
+OPERADORES = [['ge ', '>='], ['le ', '<='], ['lt ', '<'], ['gt ', '>'], ['ne ', '!='], ['eq ', '='],
+              ['contains '], ['datestartswith ']]
+
+
+def id_version(id_tabla):
+    """Store que otros callbacks incrementan para que la tabla se vuelva a cargar (ej: después de aprobar)."""
+    return f"{id_tabla}-version"
+
+
+def _id_cursores(id_tabla):
+    return f"{id_tabla}-cursores"
+
+
+def crear_tabla_servidor(id_tabla, columnas, page_size=10, **props):
+    """DataTable con paginación, orden y filtro en el servidor (ver registrar_tabla_servidor)."""
+    return html.Div([
+        dash_table.DataTable(
+            id=id_tabla,
+            columns=[{'name': c.nombre, 'id': c.id, 'type': TIPOS_DATATABLE[c.tipo]} for c in columnas],
+            data=[],
+            page_action='custom',
+            sort_action='custom',
+            sort_mode='single',
+            filter_action=props.pop('filter_action', 'custom'),
+            page_current=0,
+            page_size=page_size,
+            **props
+        ),
+        dcc.Store(id=_id_cursores(id_tabla), data={}),
+        dcc.Store(id=id_version(id_tabla), data=0),
+    ])
+
+
+# =========================================================
+# FILTROS: filter_query -> WHERE
+# =========================================================
+def _separar_filtro(parte):
+    """'{Nombre} contains "ana"' -> ('Nombre', 'contains', 'ana')."""
+    for tipo_operador in OPERADORES:
+        for operador in tipo_operador:
+            if operador in parte:
+                nombre, valor = parte.split(operador, 1)
+                nombre = nombre[nombre.find('{') + 1: nombre.rfind('}')]
+                valor = valor.strip()
+                if valor and valor[0] == valor[-1] and valor[0] in ("'", '"', '`'):
+                    valor = valor[1:-1].replace('\\' + valor[0], valor[0])
+                else:
+                    try:
+                        valor = float(valor)
+                    except ValueError:
+                        pass
+                return nombre, tipo_operador[-1].strip(), valor
+    return None, None, None
+
+
+def _valor_fecha(valor):
+    texto = str(valor)
+    return datetime.fromisoformat(texto) if len(texto) > 10 else date.fromisoformat(texto)
+
+
+def filtro_a_sql(filter_query, columnas):
+    """Traduce el filter_query de la DataTable a condiciones SQL. Solo columnas declaradas (con expresión)."""
+    por_id = {c.id: c for c in columnas}
+    condiciones = []
+    for parte in (filter_query or '').split(' && '):
+        nombre, operador, valor = _separar_filtro(parte)
+        columna = por_id.get(nombre)
+        if not columna or columna.expresion is None or valor in (None, ''):
+            continue
+        expresion = columna.expresion
+
+        if operador in ('contains', 'datestartswith') or (columna.tipo == 'texto' and operador == '='):
+            if columna.tipo == 'numero':
+                condiciones.append(expresion == valor)
+            elif operador == 'contains' and columna.tipo == 'texto':
+                condiciones.append(expresion.ilike(f"%{valor}%"))
+            elif operador == '=':
+                condiciones.append(expresion == str(valor))
+            else: # Prefijo: fechas guardadas como texto ISO en SQLite, o texto
+                condiciones.append(cast(expresion, String).like(f"{str(valor)}%"))
+            continue
+
+        if columna.tipo == 'fecha':
+            try:
+                valor = _valor_fecha(valor)
+            except ValueError:
+                continue
+        comparaciones = {
+            '=': expresion == valor, '!=': expresion != valor,
+            '<': expresion < valor, '<=': expresion <= valor,
+            '>': expresion > valor, '>=': expresion >= valor,
+        }
+        condiciones.append(comparaciones[operador])
+    return condiciones
+
+
+# =========================================================
+# PAGINACIÓN POR LLAVE (keyset)
+# =========================================================
+def _a_json(valor):
+    if isinstance(valor, datetime):
+        return {'t': valor.isoformat()}
+    if isinstance(valor, date):
+        return {'d': valor.isoformat()}
+    return valor
+
+
+def _de_json(valor):
+    if isinstance(valor, dict):
+        return datetime.fromisoformat(valor['t']) if 't' in valor else date.fromisoformat(valor['d'])
+    return valor
+
+
+def consultar_pagina(consulta, columnas, llave, pagina, page_size, sort_by=None, filter_query=None,
+                     cursores=None, version=0, orden_descendente=False):
+    """
+    Una página de 'consulta' (un select) con el orden y filtro de la DataTable.
+    Si se conoce la última fila de la página anterior (cursores), se pide con WHERE (orden, llave) > (...)
+    LIMIT page_size, que usa el índice; si no (ej: saltar a la página 50), se usa OFFSET.
+    El total solo se cuenta cuando cambia el filtro u orden. Devuelve (filas, total_paginas, cursores).
+    'llave' debe ser única (ej: Modelo.id) y desempata el orden.
+    """
+    por_id = {c.id: c for c in columnas}
+    consulta = consulta.where(*filtro_a_sql(filter_query, columnas))
+
+    columna_orden, descendente = None, orden_descendente
+    if sort_by and por_id.get(sort_by[0]['column_id']) and por_id[sort_by[0]['column_id']].expresion is not None:
+        columna_orden = por_id[sort_by[0]['column_id']].expresion
+        descendente = sort_by[0]['direction'] == 'desc'
+
+    firma = json.dumps([page_size, sort_by, filter_query, version])
+    if not cursores or cursores.get('firma') != firma:
+        total = db.session.execute(select(func.count()).select_from(consulta.order_by(None).subquery())).scalar()
+        cursores = {'firma': firma, 'total': total, 'paginas': {}}
+
+    ordenar = [columna_orden, llave] if columna_orden is not None else [llave]
+    consulta = consulta.add_columns(llave.label('_llave'))
+    if columna_orden is not None:
+        consulta = consulta.add_columns(columna_orden.label('_orden'))
+    consulta = consulta.order_by(*[c.desc() if descendente else c.asc() for c in ordenar]).limit(page_size)
+
+    anterior = cursores['paginas'].get(str(pagina - 1))
+    if pagina > 0 and anterior is not None and None not in anterior:
+        # Cada valor con el tipo de su columna: un monto en pesos se compara en centavos (Dinero), igual que en la tabla
+        ultimo = [literal(_de_json(v), c.type) for v, c in zip(anterior, ordenar)]
+        clave = tuple_(*ordenar) if columna_orden is not None else llave
+        valor = tuple_(*ultimo) if columna_orden is not None else ultimo[0]
+        consulta = consulta.where(clave < valor if descendente else clave > valor)
+    elif pagina > 0:
+        consulta = consulta.offset(pagina * page_size)
+
+    filas = db.session.execute(consulta).all()
+    if filas:
+        ultima = filas[-1]
+        cursores['paginas'][str(pagina)] = ([_a_json(ultima._orden)] if columna_orden is not None else []) + [_a_json(ultima._llave)]
+    return filas, max(1, math.ceil(cursores['total'] / page_size)), cursores
+
+
+def registrar_tabla_servidor(id_tabla, consulta, columnas, llave, a_fila, orden_descendente=False):
+    """
+    Registra el callback que llena una tabla de crear_tabla_servidor, una página por respuesta.
+    consulta: función sin argumentos que devuelve el select base (se llama en cada petición,
+    así puede depender de current_user). a_fila: convierte una fila del resultado en el dict de la DataTable.
+    """
+    @callback(
+        [Output(id_tabla, 'data'), Output(id_tabla, 'page_count'),
+         Output(_id_cursores(id_tabla), 'data'), Output(id_tabla, 'selected_rows')],
+        [Input(id_tabla, 'page_current'), Input(id_tabla, 'page_size'),
+         Input(id_tabla, 'sort_by'), Input(id_tabla, 'filter_query'), Input(id_version(id_tabla), 'data')],
+        State(_id_cursores(id_tabla), 'data')
+    )
+    def cargar_pagina(pagina, page_size, sort_by, filter_query, version, cursores):
+        filas, total_paginas, cursores = consultar_pagina(
+            consulta(), columnas, llave, pagina or 0, page_size, sort_by, filter_query,
+            cursores, version, orden_descendente
+        )
+        return [a_fila(f) for f in filas], total_paginas, cursores, []
+
+    return cargar_pagina
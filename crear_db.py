@@ -12,4 +12,4 @@ with server.app_context():
         db.session.commit()
         print("✅ Base de datos creada y usuario 'admin' registrado.")
     else:
-        print("ℹ️ La base de datos ya existe.")
\ No newline at end of file
+        print("ℹ️ La base de datos ya existe. Si viene de una versión anterior ejecuta: python migrar_db.py")
\ No newline at end of file
@@ -0,0 +1,240 @@
+import functools
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from flask import current_app
+from flask_login import current_user
+from plotly.io.json import to_json_plotly
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from database.db import db
+from utils.config import CACHE_SOCIOS_ACTIVO, CACHE_SOCIOS_MAXIMO
+
+# Caché por socio de las páginas del socio (home, mis_aportes, mis_prestamos), compartido por todos los workers
+# en un archivo SQLite aparte (instance/cache_socios.db): una página cacheada no toca las tablas del fondo.
+# Cada socio tiene un número de versión que se sube DESPUÉS del commit de cualquier escritura que lo afecte
+# (ver invalidar_socios); la versión se lee antes de armar la página, así una página armada con datos
+# viejos queda guardada bajo una versión que ya nadie pide. Cuando hay más de CACHE_SOCIOS_MAXIMO páginas
+# se borran las usadas hace más tiempo (LRU).
+ARCHIVO_CACHE = 'cache_socios.db'
+CARPETA_PENDIENTES = 'cache_socios_pendientes' # Invalidaciones que no se pudieron aplicar (ver _guardar_pendientes)
+ID_GLOBAL = 0 # Fila de versiones que invalida a todos los socios a la vez
+TOQUE_LRU_SEGUNDOS = 30 # La hora de último uso se actualiza a lo sumo cada tanto (evita una escritura por acierto)
+
+log_cache = logging.getLogger('fondo.cache')
+_local = threading.local()
+_candado = threading.Lock()
+_estadisticas = {'aciertos': 0, 'fallos': 0}
+
+
+# =========================================================
+# ALMACÉN (SQLite propio, una conexión por hilo y proceso)
+# =========================================================
+def _conexion():
+    if getattr(_local, 'pid', None) != os.getpid(): # Después de un fork de gunicorn se abre una conexión nueva
+        os.makedirs(current_app.instance_path, exist_ok=True)
+        conexion = sqlite3.connect(os.path.join(current_app.instance_path, ARCHIVO_CACHE), timeout=5, isolation_level=None)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.execute("CREATE TABLE IF NOT EXISTS versiones (usuario_id INTEGER PRIMARY KEY, version INTEGER NOT NULL)")
+        conexion.execute("""CREATE TABLE IF NOT EXISTS paginas (
+                                clave TEXT PRIMARY KEY, usuario_id INTEGER NOT NULL, version TEXT NOT NULL,
+                                contenido TEXT NOT NULL, ultimo_uso REAL NOT NULL)""")
+        conexion.execute("CREATE INDEX IF NOT EXISTS ix_paginas_ultimo_uso ON paginas (ultimo_uso)")
+        conexion.execute("CREATE INDEX IF NOT EXISTS ix_paginas_usuario ON paginas (usuario_id)")
+        _local.conexion, _local.pid = conexion, os.getpid()
+    return _local.conexion
+
+
+def version_socio(usuario_id):
+    """'version del socio.version global' (0 si nunca se ha invalidado)."""
+    fila = _conexion().execute(
+        "SELECT coalesce(max(CASE WHEN usuario_id = ? THEN version END), 0), "
+        "coalesce(max(CASE WHEN usuario_id = ? THEN version END), 0) "
+        "FROM versiones WHERE usuario_id IN (?, ?)", (usuario_id, ID_GLOBAL, usuario_id, ID_GLOBAL)
+    ).fetchone()
+    return f"{fila[0]}.{fila[1]}"
+
+
+def leer_pagina(pagina, usuario_id, version):
+    """Contenido (JSON ya decodificado) de la página del socio en esa versión, o None."""
+    clave = f"{pagina}:{usuario_id}"
+    fila = _conexion().execute("SELECT contenido, ultimo_uso FROM paginas WHERE clave = ? AND version = ?",
+                               (clave, version)).fetchone()
+    if fila is None:
+        return None
+    ahora = time.time()
+    if ahora - fila[1] > TOQUE_LRU_SEGUNDOS:
+        _conexion().execute("UPDATE paginas SET ultimo_uso = ? WHERE clave = ?", (ahora, clave))
+    return json.loads(fila[0])
+
+
+def guardar_pagina(pagina, usuario_id, version, contenido):
+    conexion = _conexion()
+    conexion.execute("INSERT OR REPLACE INTO paginas (clave, usuario_id, version, contenido, ultimo_uso) VALUES (?, ?, ?, ?, ?)",
+                     (f"{pagina}:{usuario_id}", usuario_id, version, contenido, time.time()))
+    conexion.execute("DELETE FROM paginas WHERE clave IN (SELECT clave FROM paginas ORDER BY ultimo_uso DESC LIMIT -1 OFFSET ?)",
+                     (CACHE_SOCIOS_MAXIMO,))
+
+
+def subir_versiones(usuario_ids):
+    """Sube la versión de los socios y borra sus páginas guardadas. ID_GLOBAL invalida a todos."""
+    filas = [(uid,) for uid in set(usuario_ids)]
+    if not filas:
+        return
+    conexion = _conexion()
+    conexion.execute("BEGIN IMMEDIATE")
+    try:
+        conexion.executemany("INSERT INTO versiones (usuario_id, version) VALUES (?, 1) "
+                             "ON CONFLICT (usuario_id) DO UPDATE SET version = version + 1", filas)
+        if (ID_GLOBAL,) in filas:
+            conexion.execute("DELETE FROM paginas")
+        else:
+            conexion.executemany("DELETE FROM paginas WHERE usuario_id = ?", filas)
+        conexion.execute("COMMIT")
+    except Exception:
+        conexion.execute("ROLLBACK")
+        raise
+
+
+# =========================================================
+# INVALIDACIÓN (se aplica al hacer commit de la sesión)
+# =========================================================
+def invalidar_socios(usuario_ids):
+    """Marca socios cuyos datos cambian en la transacción actual; su versión sube cuando la sesión hace commit."""
+    db.session.info.setdefault('socios_invalidados', set()).update(usuario_ids)
+
+
+def invalidar_todos():
+    """Como invalidar_socios, para todos los socios (ej: reconstruir los resúmenes)."""
+    invalidar_socios([ID_GLOBAL])
+
+
+# --- INVALIDACIONES PENDIENTES (compartidas entre workers) ---
+# Si subir la versión falla (ej: cache_socios.db ocupado más que el timeout) la invalidación no se pierde:
+# queda en un archivo de CARPETA_PENDIENTES, fuera de la base que falló. Todos los workers lo ven:
+# no sirven del caché las páginas de esos socios y reintentan la subida; el archivo se borra cuando se logra.
+# Cada archivo se escribe completo una sola vez y no se modifica, así dos workers no se pisan.
+def _carpeta_pendientes():
+    return os.path.join(current_app.instance_path, CARPETA_PENDIENTES)
+
+
+def _guardar_pendientes(usuario_ids):
+    carpeta = _carpeta_pendientes()
+    os.makedirs(carpeta, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+    with os.fdopen(descriptor, 'w') as archivo:
+        json.dump(sorted(usuario_ids), archivo)
+    os.replace(temporal, temporal[:-len('.tmp')] + '.json') # Nadie ve el archivo a medio escribir
+
+
+def _leer_pendientes():
+    """{ruta del archivo: ids} de las invalidaciones pendientes. Vacío (lo normal) si la carpeta no existe o está vacía."""
+    try:
+        nombres = [n for n in os.listdir(_carpeta_pendientes()) if n.endswith('.json')]
+    except FileNotFoundError:
+        return {}
+    pendientes = {}
+    for nombre in nombres:
+        ruta = os.path.join(_carpeta_pendientes(), nombre)
+        try:
+            with open(ruta) as archivo:
+                pendientes[ruta] = json.load(archivo)
+        except FileNotFoundError: # Otro worker ya la aplicó
+            continue
+    return pendientes
+
+
+def _aplicar_pendientes(pendientes):
+    """Reintenta las invalidaciones pendientes. Devuelve los ids que siguen sin aplicar (vacío si se lograron)."""
+    ids = {uid for usuario_ids in pendientes.values() for uid in usuario_ids}
+    try:
+        subir_versiones(ids)
+    except Exception:
+        log_cache.warning("Siguen pendientes invalidaciones del caché de %d socio(s)", len(ids), exc_info=True)
+        return ids
+    for ruta in pendientes:
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+    return set()
+
+
+def _invalidar_o_dejar_pendiente(usuario_ids):
+    """Sube la versión de los socios; si el almacén falla, lo deja pendiente para todos los workers. Nunca lanza."""
+    try:
+        subir_versiones(usuario_ids)
+    except Exception:
+        log_cache.exception("No se pudo invalidar el caché de %d socio(s); queda pendiente", len(usuario_ids))
+        try:
+            _guardar_pendientes(usuario_ids)
+        except Exception:
+            log_cache.exception("Tampoco se pudo guardar la invalidación pendiente")
+
+
+@event.listens_for(Session, 'after_commit')
+def _aplicar_invalidaciones(sesion):
+    # El commit de la base ya se hizo: un error del caché no debe llegar al callback como si hubiera fallado
+    usuario_ids = sesion.info.pop('socios_invalidados', None)
+    if usuario_ids and CACHE_SOCIOS_ACTIVO:
+        _invalidar_o_dejar_pendiente(usuario_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_invalidaciones(sesion):
+    sesion.info.pop('socios_invalidados', None)
+
+
+# =========================================================
+# USO EN LAS PÁGINAS
+# =========================================================
+def cache_por_socio(pagina):
+    """
+    Decorador para el layout() de una página del socio: la página ya armada se guarda por socio y versión.
+    Solo se cachea el layout; los callbacks de la página siguen consultando la base.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envuelta():
+            if not CACHE_SOCIOS_ACTIVO or not current_user.is_authenticated:
+                return funcion()
+            pendientes = _leer_pendientes()
+            if pendientes:
+                sin_aplicar = _aplicar_pendientes(pendientes)
+                if current_user.id in sin_aplicar or ID_GLOBAL in sin_aplicar:
+                    return funcion() # Lo guardado puede estar viejo: se arma sin caché hasta que se aplique
+            version = version_socio(current_user.id) # Antes de leer la base (ver nota al inicio)
+            contenido = leer_pagina(pagina, current_user.id, version)
+            if contenido is not None:
+                with _candado:
+                    _estadisticas['aciertos'] += 1
+                return contenido
+
+            componente = funcion()
+            guardar_pagina(pagina, current_user.id, version, to_json_plotly(componente))
+            with _candado:
+                _estadisticas['fallos'] += 1
+            return componente
+        return envuelta
+    return decorador
+
+
+def iniciar_cache_socios(server):
+    """Al arrancar se descarta lo guardado: la base pudo cambiar con la app apagada (migrar_db.py, una restauración...)."""
+    if CACHE_SOCIOS_ACTIVO:
+        with server.app_context():
+            subir_versiones([ID_GLOBAL])
+
+
+def estadisticas_cache_socios():
+    """Aciertos/fallos de este proceso y páginas guardadas (compartidas) del caché por socio (para monitoreo)."""
+    with _candado:
+        estadisticas = dict(_estadisticas)
+    estadisticas['tamano'] = _conexion().execute("SELECT count(*) FROM paginas").fetchone()[0]
+    estadisticas['maximo'] = CACHE_SOCIOS_MAXIMO
+    return estadisticas
@@ -0,0 +1,319 @@
+import csv
+import hashlib
+import itertools
+import re
+import time
+from collections import defaultdict, deque, namedtuple
+from datetime import date, datetime
+from functools import lru_cache
+from sqlalchemy import select, update, bindparam, exists
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database.db import db
+from database.models import Usuario, Prestamo, Cuota, MovimientoBanco
+from database.resumen import registrar_pagos_en_bloque, primer_dia_mes, ESTADOS_POR_COBRAR
+from utils.texto import normalizar_texto
+
+# Líneas del extracto que se procesan por bloque (memoria constante sin importar el tamaño del archivo)
+TAMANO_BLOQUE = 1000
+
+# Nombres de columna aceptados en el extracto (sin tildes y en minúscula)
+COLUMNAS_EXTRACTO = {
+    'fecha': ['fecha', 'fecha transaccion', 'fecha movimiento', 'date'],
+    'monto': ['monto', 'valor', 'credito', 'abono', 'amount'],
+    'referencia': ['referencia', 'descripcion', 'concepto', 'detalle', 'description'],
+    'saldo': ['saldo', 'balance'],
+}
+FORMATOS_FECHA = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d']
+
+ResultadoConciliacion = namedtuple('ResultadoConciliacion',
+                                   ['lineas', 'conciliadas', 'por_revisar', 'repetidas', 'prestamos_finalizados', 'duracion_ms'])
+
+
+# =========================================================
+# LECTURA DEL EXTRACTO
+# =========================================================
+def leer_monto(texto):
+    """
+    '1.234.567,89', '1,234,567.89', '50000.5', '$ 50000' -> float (los números de Excel pasan directo). None si no es un número.
+    Con un solo tipo de separador: si aparece una vez y no lleva exactamente 3 dígitos después es el decimal
+    ('50000.5', '1234,56'); si se repite o lleva 3 dígitos son miles ('1.234.567', '50.000').
+    """
+    if isinstance(texto, (int, float)):
+        return float(texto)
+    texto = re.sub(r'[^\d,.\-]', '', str(texto or ''))
+    if not texto:
+        return None
+    if ',' in texto and '.' in texto:
+        decimal = ',' if texto.rfind(',') > texto.rfind('.') else '.'
+    elif ',' in texto or '.' in texto:
+        separador = ',' if ',' in texto else '.'
+        decimales = len(texto) - texto.rfind(separador) - 1
+        decimal = separador if texto.count(separador) == 1 and decimales != 3 else None
+    else:
+        decimal = None
+
+    miles = {',': '.', '.': ','}.get(decimal)
+    if decimal is None:
+        texto = texto.replace(',', '').replace('.', '')
+    else:
+        texto = texto.replace(miles, '').replace(decimal, '.')
+    try:
+        return float(texto)
+    except ValueError:
+        return None
+
+
+def leer_fecha(texto):
+    if isinstance(texto, datetime): # Celdas de fecha de Excel
+        return texto.date()
+    if isinstance(texto, date):
+        return texto
+    return _fecha_de_texto(str(texto or '').strip()[:10])
+
+
+@lru_cache(maxsize=1024) # Un extracto tiene pocas fechas distintas y strptime es lento
+def _fecha_de_texto(texto):
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def ubicar_columnas(encabezado, columnas, requeridas):
+    """
+    Posición de cada campo en el encabezado según sus nombres aceptados ({campo: [alias]}).
+    Los campos que no aparecen quedan en None; si falta uno requerido lanza ValueError.
+    """
+    encabezado = [normalizar_texto(c) for c in encabezado]
+    posiciones = {campo: next((encabezado.index(a) for a in alias if a in encabezado), None)
+                  for campo, alias in columnas.items()}
+    faltantes = [c for c in requeridas if posiciones[c] is None]
+    if faltantes:
+        raise ValueError(f"El archivo no tiene las columnas: {', '.join(faltantes)}")
+    return posiciones
+
+
+def leer_extracto(archivo):
+    """
+    Recorre el CSV del extracto línea por línea (generador: nunca carga el archivo completo).
+    Detecta el separador (, ; o tab) y las columnas por nombre. Entrega
+    (fecha, monto, referencia, saldo) por línea; fecha o monto quedan en None si no se pudieron leer.
+    """
+    primera = archivo.readline()
+    dialecto = csv.Sniffer().sniff(primera, delimiters=',;\t')
+    encabezado = next(csv.reader([primera], dialecto))
+    posiciones = ubicar_columnas(encabezado, COLUMNAS_EXTRACTO, ['fecha', 'monto', 'referencia'])
+
+    def valor(fila, campo):
+        i = posiciones[campo]
+        return fila[i] if i is not None and i < len(fila) else None
+
+    for fila in csv.reader(archivo, dialecto):
+        if not fila:
+            continue
+        yield (leer_fecha(valor(fila, 'fecha')), leer_monto(valor(fila, 'monto')),
+               (valor(fila, 'referencia') or '').strip(), valor(fila, 'saldo'))
+
+
+def _huella(fecha, monto, referencia, saldo, repeticion):
+    """
+    Identifica una línea del extracto. 'repeticion' cuenta las líneas idénticas anteriores en todo el archivo
+    (dos transferencias iguales el mismo día son dos pagos, no un duplicado).
+    """
+    clave = f"{fecha}|{round(monto * 100)}|{normalizar_texto(referencia)}|{saldo or ''}|{repeticion}"
+    return hashlib.sha1(clave.encode()).hexdigest()
+
+
+# =========================================================
+# ÍNDICES EN MEMORIA (Tamaño proporcional a socios y cuotas abiertas, no al extracto)
+# =========================================================
+def indice_socios():
+    """
+    Palabras que identifican a un socio en la referencia de la transferencia:
+    usuario, correo y teléfono (solo dígitos). Aparte, los nombres completos (de dos o más palabras)
+    por cantidad de palabras, para buscarlos como secuencia de palabras completas.
+    """
+    por_palabra, por_nombre = {}, defaultdict(dict)
+    for uid, username, email, telefono, nombre in db.session.execute(
+        select(Usuario.id, Usuario.username, Usuario.email, Usuario.telefono, Usuario.nombre_completo)
+        .where(Usuario.rol != 'admin')
+    ):
+        for palabra in (normalizar_texto(username), normalizar_texto(email)):
+            if palabra:
+                por_palabra[palabra] = uid
+        digitos = re.sub(r'\D', '', telefono or '')
+        if len(digitos) >= 7:
+            por_palabra[digitos] = uid
+        palabras_nombre = normalizar_texto(nombre).split()
+        if len(palabras_nombre) >= 2:
+            por_nombre[len(palabras_nombre)][' '.join(palabras_nombre)] = uid
+    return por_palabra, por_nombre
+
+
+def identificar_socio(referencia, por_palabra, por_nombre):
+    normalizada = normalizar_texto(referencia)
+    for palabra in re.split(r'[^\w@.]+', normalizada) + [re.sub(r'\D', '', normalizada)]:
+        if palabra in por_palabra:
+            return por_palabra[palabra]
+
+    # Nombre completo como palabras seguidas ('socio numero 1' no coincide con 'socio numero 12')
+    palabras = re.findall(r'\w+', normalizada)
+    for largo, nombres in por_nombre.items():
+        for i in range(len(palabras) - largo + 1):
+            uid = nombres.get(' '.join(palabras[i:i + largo]))
+            if uid:
+                return uid
+    return None
+
+
+def _indice_cuotas_abiertas():
+    """
+    Cuotas por cobrar de préstamos activos, agrupadas por (socio, valor en centavos).
+    Cada grupo es una cola ordenada por vencimiento: la primera es la más antigua.
+    """
+    indice = defaultdict(deque)
+    for cuota_id, prestamo_id, usuario_id, total, capital, interes, vencimiento, estado in db.session.execute(
+        select(Cuota.id, Cuota.prestamo_id, Prestamo.usuario_id, Cuota.monto_total, Cuota.monto_capital, Cuota.monto_interes,
+               Cuota.fecha_vencimiento, Cuota.estado)
+        .join(Prestamo, Cuota.prestamo_id == Prestamo.id)
+        .where(Prestamo.estado == 'Activo', Cuota.estado.in_(ESTADOS_POR_COBRAR))
+        .order_by(Cuota.fecha_vencimiento, Cuota.id)
+    ):
+        indice[(usuario_id, round(total * 100))].append((cuota_id, prestamo_id, total, capital or 0, interes or 0, vencimiento, estado))
+    return indice
+
+
+# =========================================================
+# CONCILIACIÓN
+# =========================================================
+def _guardar_bloque(bloque, indice, por_palabra, por_nombre, acumulado):
+    """Concilia un bloque de líneas nuevas: inserta los movimientos y marca las cuotas pagadas."""
+    huellas = [linea['huella'] for linea in bloque]
+    ya_cargadas = set(db.session.execute(
+        select(MovimientoBanco.huella).where(MovimientoBanco.huella.in_(huellas))
+    ).scalars())
+
+    movimientos, pagos = [], []
+    for linea in bloque:
+        if linea['huella'] in ya_cargadas:
+            acumulado['repetidas'] += 1
+            continue
+
+        usuario_id = identificar_socio(linea['referencia'], por_palabra, por_nombre)
+        cola = indice.get((usuario_id, round(linea['monto'] * 100))) if usuario_id else None
+        if cola:
+            cuota_id, prestamo_id, total, capital, interes, vencimiento, estado_cuota = cola.popleft()
+            pagos.append({'c_id': cuota_id, 'c_fecha': datetime.combine(linea['fecha'], datetime.min.time())})
+            acumulado['prestamos'].add(prestamo_id)
+            acumulado['usuarios'].add(usuario_id)
+            acumulado['capital'] += capital
+            acumulado['intereses'] += interes
+
+            # Resumen mensual: el pago va al mes del abono; si la cuota se pagó tarde sin estar en Mora, suma a la mora de su vencimiento
+            mes = acumulado['por_mes'][primer_dia_mes(linea['fecha'])]
+            mes['capital_recuperado'] += capital
+            mes['intereses_recaudados'] += interes
+            mes['cuotas_pagadas'] += 1
+            if estado_cuota == 'Pendiente' and linea['fecha'] > vencimiento:
+                mes_vencimiento = acumulado['por_mes'][primer_dia_mes(vencimiento)]
+                mes_vencimiento['mora'] += total
+                mes_vencimiento['cuotas_mora'] += 1
+            estado, motivo = 'Conciliado', None
+        else:
+            cuota_id = None
+            estado = 'Por revisar'
+            motivo = 'Socio no identificado' if not usuario_id else 'El valor no coincide con ninguna cuota pendiente'
+
+        acumulado['conciliadas' if cuota_id else 'por_revisar'] += 1
+        movimientos.append({**linea, 'usuario_id': usuario_id, 'cuota_id': cuota_id,
+                            'estado': estado, 'motivo': motivo, 'fecha_carga': acumulado['inicio']})
+
+    conexion = db.session.connection()
+    if movimientos:
+        conexion.execute(sqlite_insert(MovimientoBanco.__table__).on_conflict_do_nothing(index_elements=['huella']), movimientos)
+    if pagos:
+        conexion.execute(
+            update(Cuota.__table__).where(Cuota.__table__.c.id == bindparam('c_id'))
+            .values(estado='Pagado', fecha_pago=bindparam('c_fecha')),
+            pagos
+        )
+
+
+def conciliar_extracto(archivo, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Carga un extracto bancario (archivo de texto CSV) y paga las cuotas que se puedan identificar:
+    cada abono se asocia a un socio (por la referencia) y a su cuota abierta más antigua con ese mismo valor.
+    Lo que no concilia queda en movimientos_banco con estado 'Por revisar'.
+    El archivo se lee por bloques y todo se guarda en una sola transacción. Devuelve un ResultadoConciliacion.
+    """
+    reloj = time.perf_counter()
+    por_palabra, por_nombre = indice_socios()
+    indice = _indice_cuotas_abiertas()
+    acumulado = {'lineas': 0, 'conciliadas': 0, 'por_revisar': 0, 'repetidas': 0, 'capital': 0.0, 'intereses': 0.0,
+                 'prestamos': set(), 'usuarios': set(), 'inicio': datetime.utcnow(),
+                 'por_mes': defaultdict(lambda: defaultdict(float))}
+
+    try:
+        # Líneas idénticas vistas en todo el archivo (no se asume que el extracto venga ordenado por fecha)
+        repeticiones = defaultdict(int)
+        lineas = (l for l in leer_extracto(archivo) if l[0] and l[1] and l[1] > 0) # Solo abonos legibles
+        while True:
+            bloque = []
+            for fecha, monto, referencia, saldo in itertools.islice(lineas, tamano_bloque):
+                clave = (fecha, monto, referencia, saldo)
+                bloque.append({'huella': _huella(fecha, monto, referencia, saldo, repeticiones[clave]),
+                               'fecha': fecha, 'monto': monto, 'referencia': referencia[:200]})
+                repeticiones[clave] += 1
+            if not bloque:
+                break
+            acumulado['lineas'] += len(bloque)
+            _guardar_bloque(bloque, indice, por_palabra, por_nombre, acumulado)
+
+        # Préstamos que quedaron sin cuotas por cobrar
+        finalizados = []
+        if acumulado['prestamos']:
+            finalizados = db.session.execute(
+                update(Prestamo)
+                .where(Prestamo.id.in_(acumulado['prestamos']), Prestamo.estado == 'Activo',
+                       ~exists().where(Cuota.prestamo_id == Prestamo.id, Cuota.estado.in_(ESTADOS_POR_COBRAR)))
+                .values(estado='Pagado')
+                .returning(Prestamo.id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            registrar_pagos_en_bloque(acumulado['usuarios'], acumulado['capital'], acumulado['intereses'], finalizados,
+                                      por_mes=acumulado['por_mes'])
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return ResultadoConciliacion(acumulado['lineas'], acumulado['conciliadas'], acumulado['por_revisar'],
+                                 acumulado['repetidas'], len(finalizados), (time.perf_counter() - reloj) * 1000)
+
+
+# =========================================================
+# COLA DE REVISIÓN
+# =========================================================
+def movimientos_por_revisar(limite=500):
+    return db.session.execute(
+        select(MovimientoBanco, Usuario.nombre_completo)
+        .outerjoin(Usuario, MovimientoBanco.usuario_id == Usuario.id)
+        .where(MovimientoBanco.estado == 'Por revisar')
+        .order_by(MovimientoBanco.fecha, MovimientoBanco.id)
+        .limit(limite)
+    ).all()
+
+
+def cerrar_movimientos(movimiento_ids, estado):
+    """Saca movimientos de la cola de revisión ('Resuelto' o 'Descartado'). Hace commit. Devuelve cuántos cambiaron."""
+    cambiados = db.session.execute(
+        update(MovimientoBanco)
+        .where(MovimientoBanco.id.in_(list(movimiento_ids)), MovimientoBanco.estado == 'Por revisar')
+        .values(estado=estado)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return cambiados
@@ -1,4 +1,170 @@
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import has_request_context, request, g
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from utils.config import INSTRUMENTACION_SQL_ACTIVA, UMBRAL_CONSULTA_LENTA_MS, CONSULTAS_LENTAS_GUARDADAS
 
 # Inicializamos la instancia de SQLAlchemy
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+
+# =========================================================
+# CONEXIONES SQLITE
+# =========================================================
+def _pragmas_sqlite(conexion_dbapi, registro):
+    cursor = conexion_dbapi.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL") # Seguro en WAL: solo el último commit puede perderse si se va la luz
+    cursor.close()
+
+
+def configurar_sqlite(server):
+    """
+    Pone fondo.db en modo WAL (write-ahead log). Con el journal por defecto (rollback) una lectura larga,
+    como una exportación que se envía por partes durante varios segundos, tiene tomada la base y las
+    aprobaciones y pagos que llegan mientras tanto fallan con "database is locked". En WAL cada lectura
+    ve una foto de la base al empezar y no bloquea a las escrituras (ni ellas a la lectura); solo puede
+    haber un escritor a la vez, que espera el timeout de la conexión (5 s) si hay otro.
+    El modo queda guardado en el archivo; el evento lo asegura en cada conexión nueva.
+    """
+    with server.app_context():
+        motor = db.engine
+        if not event.contains(motor, 'connect', _pragmas_sqlite):
+            event.listen(motor, 'connect', _pragmas_sqlite)
+            motor.dispose() # Las conexiones que ya estaban abiertas se vuelven a abrir con los pragmas
+
+
+# =========================================================
+# INSTRUMENTACIÓN SQL (por petición y por callback de Dash)
+# =========================================================
+# Estadísticas de este proceso (cada worker lleva las suyas), por origen:
+# el callback de Dash (sus outputs), la ruta de Flask o el hilo si no hay petición (ej: tareas programadas)
+log_sql = logging.getLogger('fondo.sql')
+_candado = threading.Lock()
+_estadisticas = {}
+_lentas = deque(maxlen=CONSULTAS_LENTAS_GUARDADAS)
+_local = threading.local() # Evita contar (y volver a explicar) el propio EXPLAIN
+
+
+def _nombre_callback(output):
+    """'..tabla.data...tabla.page_count..' -> 'tabla.data, tabla.page_count'."""
+    return ', '.join(parte for parte in output.strip('.').split('...') if parte)
+
+
+def origen_peticion():
+    """Quién hace la consulta: el callback de Dash (sus outputs), la ruta de Flask o el hilo si no hay petición."""
+    if not has_request_context():
+        return f"hilo {threading.current_thread().name}"
+    if 'origen_sql' not in g:
+        origen = request.path
+        if request.path.endswith('_dash-update-component'):
+            cuerpo = request.get_json(silent=True) or {}
+            origen = f"callback {_nombre_callback(cuerpo.get('output', ''))}"
+        g.origen_sql = origen
+    return g.origen_sql
+
+
+def _fila(origen):
+    fila = _estadisticas.get(origen)
+    if fila is None:
+        fila = _estadisticas[origen] = {'origen': origen, 'peticiones': 0, 'sentencias': 0, 'tiempo_ms': 0.0,
+                                       'max_sentencias_peticion': 0, 'max_ms': 0.0, 'lentas': 0}
+    return fila
+
+
+def _antes(conexion, cursor, sentencia, parametros, contexto, executemany):
+    conexion.info.setdefault('inicio_sql', []).append(time.perf_counter())
+
+
+def _despues(conexion, cursor, sentencia, parametros, contexto, executemany):
+    duracion_ms = (time.perf_counter() - conexion.info['inicio_sql'].pop()) * 1000
+    if getattr(_local, 'explicando', False):
+        return
+    origen = origen_peticion()
+    lenta = duracion_ms >= UMBRAL_CONSULTA_LENTA_MS
+
+    with _candado:
+        fila = _fila(origen)
+        fila['sentencias'] += 1
+        fila['tiempo_ms'] += duracion_ms
+        fila['max_ms'] = max(fila['max_ms'], duracion_ms)
+        fila['lentas'] += lenta
+    if has_request_context():
+        g.sentencias_sql = g.get('sentencias_sql', 0) + 1
+
+    if lenta:
+        _registrar_lenta(conexion, sentencia, parametros, executemany, origen, duracion_ms)
+
+
+def _error(contexto):
+    # Si la sentencia falla no hay after_cursor_execute: se descarta su hora de inicio
+    if contexto.connection is not None and contexto.connection.info.get('inicio_sql'):
+        contexto.connection.info['inicio_sql'].pop()
+
+
+def _registrar_lenta(conexion, sentencia, parametros, executemany, origen, duracion_ms):
+    """Guarda la consulta lenta con sus parámetros y su EXPLAIN QUERY PLAN (no se explica un executemany)."""
+    plan = []
+    if not executemany:
+        _local.explicando = True
+        try:
+            plan = [fila[3] for fila in conexion.exec_driver_sql(f"EXPLAIN QUERY PLAN {sentencia}", parametros)]
+        except Exception as e:
+            plan = [f"(sin plan: {e})"]
+        finally:
+            _local.explicando = False
+    parametros_texto = f"{len(parametros)} filas" if executemany else repr(parametros)[:500]
+    with _candado:
+        _lentas.appendleft({'fecha': datetime.now(), 'origen': origen, 'duracion_ms': duracion_ms,
+                            'sql': sentencia, 'parametros': parametros_texto, 'plan': plan})
+    log_sql.warning("Consulta lenta (%.0f ms) en %s: %s | parámetros: %s | plan: %s",
+                    duracion_ms, origen, ' '.join(sentencia.split()), parametros_texto, '; '.join(plan))
+
+
+def _fin_peticion(excepcion=None):
+    # Una respuesta por partes (stream_with_context) pasa por aquí dos veces: la petición se cuenta una sola
+    sentencias = g.get('sentencias_sql', 0)
+    if sentencias:
+        with _candado:
+            fila = _fila(g.origen_sql)
+            if not g.get('peticion_contada'):
+                fila['peticiones'] += 1
+                g.peticion_contada = True
+            fila['max_sentencias_peticion'] = max(fila['max_sentencias_peticion'], sentencias)
+
+
+def instrumentar_sql(server):
+    """Engancha los eventos del motor de la app (una vez por proceso). Sin efecto si INSTRUMENTACION_SQL_ACTIVA es False."""
+    if not INSTRUMENTACION_SQL_ACTIVA:
+        return
+    with server.app_context():
+        motor = db.engine
+    if event.contains(motor, 'before_cursor_execute', _antes):
+        return
+    event.listen(motor, 'before_cursor_execute', _antes)
+    event.listen(motor, 'after_cursor_execute', _despues)
+    event.listen(motor, 'handle_error', _error)
+    server.teardown_request(_fin_peticion)
+
+
+def estadisticas_sql():
+    """Filas por origen, de la que más tiempo se ha llevado en la base a la que menos."""
+    with _candado:
+        filas = [dict(f) for f in _estadisticas.values()]
+    return sorted(filas, key=lambda f: f['tiempo_ms'], reverse=True)
+
+
+def consultas_lentas():
+    """Las últimas CONSULTAS_LENTAS_GUARDADAS consultas lentas, la más reciente primero."""
+    with _candado:
+        return list(_lentas)
+
+
+def reiniciar_estadisticas_sql():
+    with _candado:
+        _estadisticas.clear()
+        _lentas.clear()
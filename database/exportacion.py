@@ -0,0 +1,167 @@
+import csv
+import io
+from datetime import date, datetime, time, timedelta
+import pyarrow as pa
+import pyarrow.parquet as pq
+from flask import Response, request, abort, stream_with_context
+from flask_login import current_user
+from sqlalchemy import select, Integer, Float, Boolean, Date, DateTime
+from database.db import db
+from database.models import Dinero, Aporte, Prestamo, Cuota
+
+# Filas por lote: el cursor de SQLite entrega de a TAMANO_LOTE filas y cada lote se envía apenas está listo
+TAMANO_LOTE = 5000
+
+# Tablas exportables: nombre en la URL -> (modelo, columna para filtrar por fecha)
+TABLAS_EXPORTABLES = {
+    'aportes': (Aporte, Aporte.fecha_registro),
+    'prestamos': (Prestamo, Prestamo.fecha_solicitud),
+    'cuotas': (Cuota, Cuota.fecha_vencimiento),
+}
+
+
+# =========================================================
+# LECTURA POR LOTES
+# =========================================================
+def lotes_tabla(tabla, desde=None, hasta=None, tamano_lote=TAMANO_LOTE):
+    """
+    Filas de una tabla exportable en lotes de 'tamano_lote' (yield_per: nunca se carga la tabla completa).
+    desde/hasta: fechas (date) opcionales, ambas inclusive. Entrega (nombres de columnas, lote de filas).
+    La lectura es una sola transacción abierta hasta el último lote: el archivo sale completo con los datos
+    del momento en que empezó. No bloquea escrituras porque fondo.db está en modo WAL (ver configurar_sqlite);
+    con el journal por defecto de SQLite, las aprobaciones y pagos fallarían mientras dura la descarga.
+    """
+    modelo, columna_fecha = TABLAS_EXPORTABLES[tabla]
+    consulta = select(*modelo.__table__.columns).order_by(modelo.id)
+    con_hora = isinstance(columna_fecha.type, DateTime)
+    if desde:
+        consulta = consulta.where(columna_fecha >= (datetime.combine(desde, time.min) if con_hora else desde))
+    if hasta:
+        if con_hora:
+            consulta = consulta.where(columna_fecha < datetime.combine(hasta + timedelta(days=1), time.min)) # Todo el día 'hasta'
+        else:
+            consulta = consulta.where(columna_fecha <= hasta)
+
+    columnas = [c.name for c in modelo.__table__.columns]
+    resultado = db.session.execute(consulta.execution_options(yield_per=tamano_lote))
+    try:
+        for lote in resultado.partitions():
+            yield columnas, lote
+    finally:
+        resultado.close()
+
+
+# =========================================================
+# FORMATOS
+# =========================================================
+def exportar_csv(lotes):
+    """Texto CSV (encabezado y luego un bloque por lote). Las fechas salen en formato ISO."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    encabezado_enviado = False
+    for columnas, lote in lotes:
+        if not encabezado_enviado:
+            escritor.writerow(columnas)
+            encabezado_enviado = True
+        escritor.writerows(lote)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
+class _SalidaPorPartes:
+    """Archivo de solo escritura para pyarrow que se puede ir vaciando (lleva la posición él mismo)."""
+    closed = False
+
+    def __init__(self):
+        self.partes, self.posicion = [], 0
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vaciar(self):
+        datos, self.partes = b''.join(self.partes), []
+        return datos
+
+
+def _esquema_parquet(tabla):
+    tipos = []
+    for columna in TABLAS_EXPORTABLES[tabla][0].__table__.columns:
+        tipo = columna.type
+        if isinstance(tipo, (Dinero, Float)):
+            tipo_arrow = pa.float64() # Dinero se exporta en pesos
+        elif isinstance(tipo, Boolean):
+            tipo_arrow = pa.bool_()
+        elif isinstance(tipo, Integer):
+            tipo_arrow = pa.int64()
+        elif isinstance(tipo, DateTime):
+            tipo_arrow = pa.timestamp('us')
+        elif isinstance(tipo, Date):
+            tipo_arrow = pa.date32()
+        else:
+            tipo_arrow = pa.string()
+        tipos.append(pa.field(columna.name, tipo_arrow))
+    return pa.schema(tipos)
+
+
+def exportar_parquet(tabla, lotes):
+    """Archivo Parquet con un row group por lote; cada row group se envía apenas se escribe."""
+    esquema = _esquema_parquet(tabla)
+    salida = _SalidaPorPartes()
+    escritor = pq.ParquetWriter(salida, esquema)
+    for columnas, lote in lotes:
+        datos = {nombre: [fila[i] for fila in lote] for i, nombre in enumerate(columnas)}
+        escritor.write_table(pa.Table.from_pydict(datos, schema=esquema))
+        yield salida.vaciar()
+    escritor.close()
+    yield salida.vaciar()
+
+
+# =========================================================
+# RUTAS (Solo administradores)
+# =========================================================
+def _leer_fecha_parametro(nombre):
+    valor = request.args.get(nombre)
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        abort(400, f"'{nombre}' debe tener formato AAAA-MM-DD")
+
+
+def registrar_rutas_exportacion(server):
+    """
+    GET /admin/exportar/<tabla>.<csv|parquet>?desde=AAAA-MM-DD&hasta=AAAA-MM-DD
+    La respuesta se envía por partes (no se arma el archivo completo en memoria).
+    """
+    @server.route('/admin/exportar/<tabla>.<formato>')
+    def exportar_tabla(tabla, formato):
+        if not current_user.is_authenticated or current_user.rol != 'admin':
+            abort(403)
+        if tabla not in TABLAS_EXPORTABLES or formato not in ('csv', 'parquet'):
+            abort(404)
+
+        desde, hasta = _leer_fecha_parametro('desde'), _leer_fecha_parametro('hasta')
+        lotes = lotes_tabla(tabla, desde, hasta)
+        sufijo = f"_{desde or ''}_{hasta or ''}" if desde or hasta else ''
+        nombre = f"{tabla}{sufijo}.{formato}"
+
+        if formato == 'csv':
+            cuerpo, tipo = exportar_csv(lotes), 'text/csv; charset=utf-8'
+        else:
+            cuerpo, tipo = exportar_parquet(tabla, lotes), 'application/vnd.apache.parquet'
+
+        return Response(stream_with_context(cuerpo), mimetype=tipo,
+                        headers={'Content-Disposition': f'attachment; filename="{nombre}"'})
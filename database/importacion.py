@@ -0,0 +1,196 @@
+import csv
+import hashlib
+import io
+import itertools
+import time
+from collections import defaultdict, deque, namedtuple
+from datetime import datetime
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database.db import db
+from database.models import Aporte
+from database.resumen import registrar_aportes_aprobados
+from database.conciliacion import (normalizar_texto, leer_monto, leer_fecha, ubicar_columnas,
+                                   indice_socios, identificar_socio)
+
+# Filas del archivo por bloque (un SELECT de huellas y un INSERT por bloque)
+TAMANO_BLOQUE = 5000
+# Errores que se devuelven para mostrar (el resto solo se cuenta)
+MAXIMO_ERRORES = 50
+
+# Nombres de columna aceptados (sin tildes y en minúscula)
+COLUMNAS_APORTES = {
+    'socio': ['socio', 'usuario', 'documento', 'cedula', 'email', 'correo', 'telefono', 'nombre'],
+    'fecha': ['fecha', 'fecha deposito', 'fecha consignacion', 'date'],
+    'monto': ['monto', 'valor', 'credito', 'aporte', 'amount'],
+    'referencia': ['referencia', 'descripcion', 'concepto', 'detalle'],
+    'tipo': ['tipo'],
+}
+
+# errores: las primeras MAXIMO_ERRORES filas rechazadas como (número de fila, socio, motivo); rechazadas: el total
+ResultadoImportacion = namedtuple('ResultadoImportacion',
+                                  ['filas', 'creados', 'pendientes_aprobados', 'repetidos', 'rechazadas', 'errores', 'duracion_ms'])
+# Lo mínimo que necesita registrar_aportes_aprobados (la confirmación es la fecha del depósito: cuenta en su mes)
+Deposito = namedtuple('Deposito', ['usuario_id', 'monto', 'fecha_confirmacion'])
+
+
+# =========================================================
+# LECTURA (CSV o XLSX, fila por fila)
+# =========================================================
+def filas_csv(archivo):
+    primera = archivo.readline()
+    dialecto = csv.Sniffer().sniff(primera, delimiters=',;\t')
+    return csv.reader(itertools.chain([primera], archivo), dialecto)
+
+
+def filas_xlsx(archivo):
+    """Primera hoja del libro en modo solo lectura (openpyxl no carga todas las celdas a memoria)."""
+    from openpyxl import load_workbook
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        yield from libro.active.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def abrir_archivo(contenido, nombre):
+    """Filas de un archivo subido (bytes) según su extensión."""
+    if nombre.lower().endswith(('.xlsx', '.xlsm')):
+        return filas_xlsx(io.BytesIO(contenido))
+    try:
+        texto = contenido.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        texto = contenido.decode('latin-1')
+    return filas_csv(io.StringIO(texto, newline=''))
+
+
+def _huella(usuario_id, monto, fecha, referencia):
+    clave = f"{usuario_id}|{round(monto * 100)}|{fecha}|{normalizar_texto(referencia)}"
+    return hashlib.sha1(clave.encode()).hexdigest()
+
+
+def _indice_pendientes():
+    """Aportes que los socios ya reportaron y siguen pendientes, por (socio, centavos, fecha)."""
+    indice = defaultdict(deque)
+    for aporte_id, usuario_id, monto, fecha in db.session.execute(
+        select(Aporte.id, Aporte.usuario_id, Aporte.monto, Aporte.fecha_registro)
+        .where(Aporte.estado == 'Pendiente').order_by(Aporte.id)
+    ):
+        indice[(usuario_id, round(monto * 100), fecha.date())].append(aporte_id)
+    return indice
+
+
+# =========================================================
+# IMPORTACIÓN
+# =========================================================
+def _guardar_bloque(bloque, pendientes, acumulado):
+    """Descarta lo ya cargado, aprueba los pendientes que coinciden e inserta el resto en bloque."""
+    ya_cargadas = set(db.session.execute(
+        select(Aporte.huella).where(Aporte.huella.in_([f['huella'] for f in bloque]))
+    ).scalars())
+
+    nuevos, por_aprobar, aprobados = [], [], []
+    for fila in bloque:
+        if fila['huella'] in ya_cargadas:
+            acumulado['repetidos'] += 1
+            continue
+        ya_cargadas.add(fila['huella']) # Filas repetidas dentro del mismo archivo
+
+        cola = pendientes.get((fila['usuario_id'], round(fila['monto'] * 100), fila['fecha_registro'].date()))
+        if cola:
+            # El socio ya lo había reportado: se aprueba ese aporte en vez de crear otro
+            por_aprobar.append({'a_id': cola.popleft(), 'a_huella': fila['huella'], 'a_fecha': fila['fecha_confirmacion']})
+            aprobados.append(Deposito(fila['usuario_id'], fila['monto'], fila['fecha_confirmacion']))
+        else:
+            nuevos.append(fila)
+
+    conexion = db.session.connection()
+    if por_aprobar:
+        conexion.execute(
+            update(Aporte.__table__).where(Aporte.__table__.c.id == bindparam('a_id'), Aporte.__table__.c.estado == 'Pendiente')
+            .values(estado='Aprobado', huella=bindparam('a_huella'), fecha_confirmacion=bindparam('a_fecha')),
+            por_aprobar
+        )
+        acumulado['pendientes_aprobados'] += len(por_aprobar)
+    if nuevos:
+        # RETURNING: solo las filas que sí se insertaron (si otro proceso cargó la misma huella, no se suma)
+        insertados = conexion.execute(
+            sqlite_insert(Aporte.__table__).on_conflict_do_nothing(index_elements=['huella'])
+            .returning(Aporte.__table__.c.usuario_id, Aporte.__table__.c.monto, Aporte.__table__.c.fecha_confirmacion),
+            nuevos
+        ).all()
+        acumulado['creados'] += len(insertados)
+        aprobados += insertados
+
+    if aprobados:
+        registrar_aportes_aprobados(aprobados)
+
+
+def importar_aportes(filas, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Importa depósitos de aportes (filas de abrir_archivo / filas_csv / filas_xlsx; la primera es el encabezado)
+    como aportes Aprobados (confirmados en la fecha del depósito), por bloques y en una sola transacción.
+    Cada fila se identifica con un hash de (socio, monto, fecha, referencia): volver a subir el mismo
+    archivo no suma dos veces. Si el socio ya había reportado ese aporte (mismo valor y fecha, Pendiente),
+    se aprueba el suyo en vez de crear otro. Devuelve un ResultadoImportacion.
+    """
+    reloj = time.perf_counter()
+    filas = iter(filas)
+    posiciones = ubicar_columnas([c or '' for c in next(filas)], COLUMNAS_APORTES, ['socio', 'fecha', 'monto'])
+    por_palabra, por_nombre = indice_socios()
+    pendientes = _indice_pendientes()
+    acumulado = {'filas': 0, 'creados': 0, 'pendientes_aprobados': 0, 'repetidos': 0, 'rechazadas': 0,
+                 'errores': []}
+
+    def valor(fila, campo):
+        i = posiciones[campo]
+        return fila[i] if i is not None and i < len(fila) else None
+
+    socios = {} # Cada socio aparece muchas veces en el archivo: se identifica una sola vez
+
+    try:
+        numero = 1 # La fila 1 es el encabezado
+        while True:
+            bloque, leidas = [], 0
+            for fila in itertools.islice(filas, tamano_bloque):
+                numero += 1
+                leidas += 1
+                if not fila or not any(fila):
+                    continue
+                acumulado['filas'] += 1
+                socio, referencia = str(valor(fila, 'socio') or ''), str(valor(fila, 'referencia') or '').strip()
+                fecha, monto = leer_fecha(valor(fila, 'fecha')), leer_monto(valor(fila, 'monto'))
+                if socio not in socios:
+                    socios[socio] = identificar_socio(socio, por_palabra, por_nombre)
+                usuario_id = socios[socio]
+
+                motivo = ('Socio no encontrado' if not usuario_id else 'Fecha inválida' if not fecha
+                          else 'Monto inválido' if not monto or monto <= 0 else None)
+                if motivo:
+                    acumulado['rechazadas'] += 1
+                    if len(acumulado['errores']) < MAXIMO_ERRORES:
+                        acumulado['errores'].append((numero, socio, motivo))
+                    continue
+                bloque.append({
+                    'usuario_id': usuario_id,
+                    'monto': monto,
+                    'tipo': str(valor(fila, 'tipo') or 'Aporte Mensual'),
+                    'estado': 'Aprobado',
+                    'notas': referencia[:200] or 'Importado del banco',
+                    'fecha_registro': datetime.combine(fecha, datetime.min.time()),
+                    # El dinero entró ese día: un año de historia queda repartido en sus meses (resumen_mensual)
+                    'fecha_confirmacion': datetime.combine(fecha, datetime.min.time()),
+                    'huella': _huella(usuario_id, monto, fecha, referencia),
+                })
+            if not leidas:
+                break
+            if bloque:
+                _guardar_bloque(bloque, pendientes, acumulado)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return ResultadoImportacion(acumulado['filas'], acumulado['creados'], acumulado['pendientes_aprobados'],
+                                acumulado['repetidos'], acumulado['rechazadas'], acumulado['errores'],
+                                (time.perf_counter() - reloj) * 1000)
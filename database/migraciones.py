@@ -0,0 +1,340 @@
+from datetime import date, datetime
+from sqlalchemy import MetaData, select, update, func, create_engine, tuple_, or_, bindparam
+from sqlalchemy.schema import CreateTable
+from database.db import db
+from database.models import Dinero, Usuario, Aporte, Prestamo, Cuota, ResumenUsuario, TotalesFondo, ResumenMensual
+from database.resumen import (reconstruir_resumenes, reconstruir_totales_fondo, reconstruir_resumen_mensual,
+                              recalcular_resumen_mensual, ID_TOTALES, ESTADOS_POR_COBRAR)
+from database.queries import consulta_antiguedad_cartera
+from utils.texto import normalizar_texto
+
+# Filas que se copian por transacción al reconstruir una tabla
+TAMANO_LOTE = 5000
+
+
+def _columnas_actuales(conexion, tabla):
+    """Columnas que tiene hoy la tabla en SQLite: {nombre: tipo declarado}."""
+    return {fila[1]: fila[2].upper() for fila in conexion.exec_driver_sql(f"PRAGMA table_info({tabla})")}
+
+
+def _copia_de_metadata(tabla, nombre):
+    """Copia de la tabla del modelo con otro nombre (en una MetaData aparte para no ensuciar la de la app)."""
+    metadata = MetaData()
+    for t in db.metadata.sorted_tables:
+        t.to_metadata(metadata)
+    return tabla.to_metadata(metadata, name=nombre)
+
+
+# --- MIGRACIÓN 1: DINERO EN CENTAVOS ---
+def migrar_a_centavos(engine, tamano_lote=TAMANO_LOTE, log=print):
+    """
+    Convierte las columnas de dinero (FLOAT en pesos) a INTEGER en centavos.
+    SQLite no permite cambiar el tipo de una columna, así que cada tabla se copia
+    por lotes a una tabla nueva y al final se reemplaza en una sola transacción.
+    Si se interrumpe, al volver a correr continúa desde el último ID copiado.
+    """
+    for tabla in db.metadata.sorted_tables:
+        columnas_dinero = [c.name for c in tabla.columns if isinstance(c.type, Dinero)]
+        if not columnas_dinero:
+            continue
+
+        with engine.connect() as conexion:
+            actuales = _columnas_actuales(conexion, tabla.name)
+        if not actuales or all(actuales.get(c) == 'INTEGER' for c in columnas_dinero):
+            continue # No existe o ya está en centavos
+
+        temporal = f"{tabla.name}__centavos"
+        nueva = _copia_de_metadata(tabla, temporal)
+
+        # Expresión de copia por columna: dinero * 100 redondeado, el resto igual
+        destino, origen = [], []
+        for columna in tabla.columns:
+            destino.append(columna.name)
+            if columna.name not in actuales:
+                origen.append("NULL")
+            elif columna.name in columnas_dinero:
+                origen.append(f"CAST(ROUND({columna.name} * 100) AS INTEGER)")
+            else:
+                origen.append(columna.name)
+
+        with engine.begin() as conexion:
+            if not _columnas_actuales(conexion, temporal):
+                conexion.execute(CreateTable(nueva))
+            ultimo_id = conexion.exec_driver_sql(f"SELECT COALESCE(MAX(id), 0) FROM {temporal}").scalar()
+
+        copiadas = 0
+        while True:
+            with engine.begin() as conexion:
+                resultado = conexion.exec_driver_sql(
+                    f"INSERT INTO {temporal} ({', '.join(destino)}) "
+                    f"SELECT {', '.join(origen)} FROM {tabla.name} WHERE id > ? ORDER BY id LIMIT ?",
+                    (ultimo_id, tamano_lote)
+                )
+                if resultado.rowcount <= 0:
+                    break
+                copiadas += resultado.rowcount
+                ultimo_id = conexion.exec_driver_sql(f"SELECT MAX(id) FROM {temporal}").scalar()
+
+        with engine.begin() as conexion:
+            conexion.exec_driver_sql(f"DROP TABLE {tabla.name}")
+            conexion.exec_driver_sql(f"ALTER TABLE {temporal} RENAME TO {tabla.name}")
+
+        log(f"   {tabla.name}: {copiadas} filas pasadas a centavos ({', '.join(columnas_dinero)})")
+
+
+# --- MIGRACIÓN 2: COLUMNAS NUEVAS ---
+def agregar_columnas(engine, log=print):
+    """Agrega a las tablas existentes las columnas nuevas de los modelos (ALTER TABLE ADD COLUMN, quedan en NULL)."""
+    with engine.begin() as conexion:
+        for tabla in db.metadata.sorted_tables:
+            actuales = _columnas_actuales(conexion, tabla.name)
+            if not actuales:
+                continue # Tabla nueva: se crea completa más adelante
+            for columna in tabla.columns:
+                if columna.name not in actuales:
+                    tipo = columna.type.compile(dialect=engine.dialect)
+                    conexion.exec_driver_sql(f"ALTER TABLE {tabla.name} ADD COLUMN {columna.name} {tipo}")
+                    log(f"   {tabla.name}: columna {columna.name} agregada")
+
+
+# --- MIGRACIÓN 3: ÍNDICES COMPUESTOS ---
+def crear_indices(engine, log=print):
+    """Crea los índices declarados en los modelos que aún no existan (CREATE INDEX IF NOT EXISTS)."""
+    with engine.begin() as conexion:
+        for tabla in db.metadata.sorted_tables:
+            if not _columnas_actuales(conexion, tabla.name):
+                continue # Tabla nueva: se crea completa (con índices) más adelante
+            existentes = {fila[1] for fila in conexion.exec_driver_sql(f"PRAGMA index_list({tabla.name})")}
+            for indice in tabla.indexes:
+                if indice.name not in existentes:
+                    indice.create(conexion, checkfirst=True)
+                    log(f"   {tabla.name}: índice {indice.name} creado")
+
+
+# Índices que otro más ancho dejó sobrando: {tabla: [índices]}
+INDICES_REEMPLAZADOS = {
+    'cuotas': ['ix_cuotas_estado_vencimiento'], # Prefijo de ix_cuotas_cartera
+    'usuarios': ['ix_usuarios_nombre_minusculas', 'ix_usuarios_username_minusculas'], # lower() no quita tildes: ver nombre_busqueda
+}
+
+
+def borrar_indices_reemplazados(engine, log=print):
+    """Borra los índices de INDICES_REEMPLAZADOS (cada INSERT/UPDATE de cuotas los mantenía sin que nadie los usara)."""
+    with engine.begin() as conexion:
+        for tabla, indices in INDICES_REEMPLAZADOS.items():
+            existentes = {fila[1] for fila in conexion.exec_driver_sql(f"PRAGMA index_list({tabla})")}
+            for indice in indices:
+                if indice in existentes:
+                    conexion.exec_driver_sql(f"DROP INDEX {indice}")
+                    log(f"   {tabla}: índice {indice} borrado")
+
+
+# --- MIGRACIÓN 3B: VERSIÓN DE LOS TOTALES DEL FONDO ---
+def iniciar_version_totales(engine, log=print):
+    """La columna version de totales_fondo llega en NULL al agregarse: arranca en 0 (NULL + 1 seguiría en NULL)."""
+    with engine.begin() as conexion:
+        if 'version' in _columnas_actuales(conexion, 'totales_fondo'):
+            cambiadas = conexion.exec_driver_sql("UPDATE totales_fondo SET version = 0 WHERE version IS NULL").rowcount
+            if cambiadas:
+                log("   totales_fondo: versión iniciada en 0")
+
+
+# --- MIGRACIÓN 3C: NOMBRES PARA EL BUSCADOR ---
+def llenar_busqueda_usuarios(engine, log=print):
+    """nombre_busqueda y usuario_busqueda llegan en NULL al agregarse: se llenan con normalizar_texto (igual que el modelo)."""
+    usuarios = Usuario.__table__
+    with engine.begin() as conexion:
+        if 'nombre_busqueda' not in _columnas_actuales(conexion, 'usuarios'):
+            return
+        filas = conexion.execute(
+            select(usuarios.c.id, usuarios.c.nombre_completo, usuarios.c.username)
+            .where(or_(usuarios.c.nombre_busqueda.is_(None), usuarios.c.usuario_busqueda.is_(None)))
+        ).all()
+        if not filas:
+            return
+        conexion.execute(
+            update(usuarios).where(usuarios.c.id == bindparam('_id'))
+            .values(nombre_busqueda=bindparam('nombre'), usuario_busqueda=bindparam('usuario')),
+            [{'_id': f.id, 'nombre': normalizar_texto(f.nombre_completo), 'usuario': normalizar_texto(f.username)} for f in filas]
+        )
+    log(f"   usuarios: {len(filas)} nombres normalizados para el buscador")
+
+
+# --- MIGRACIÓN 4: TABLAS NUEVAS ---
+def crear_tablas(engine, log=print):
+    """
+    Crea las tablas de los modelos que aún no existan (multas, candados_tarea...), con sus índices.
+    Va antes de llenar los resúmenes: sus consultas de reconstrucción leen esas tablas.
+    """
+    with engine.connect() as conexion:
+        faltantes = [t for t in db.metadata.sorted_tables if not _columnas_actuales(conexion, t.name)]
+    db.metadata.create_all(engine, tables=faltantes)
+    for tabla in faltantes:
+        log(f"   {tabla.name}: creada")
+
+
+# --- MIGRACIÓN 5: TABLAS DE RESUMEN ---
+def _crear_y_llenar(tabla, reconstruir):
+    """
+    Paso genérico: si la tabla de resumen está vacía (recién creada, o una corrida anterior falló
+    antes de llenarla) la llena desde los datos crudos. Con datos no la toca: se mantiene por deltas.
+    """
+    def migracion(engine, log=print):
+        tabla.create(engine, checkfirst=True)
+        with engine.connect() as conexion:
+            vacia = conexion.execute(select(tabla).limit(1)).first() is None
+        if not vacia:
+            return
+        filas = reconstruir()
+        log(f"   {tabla.name}: llenada con {filas} filas")
+    return migracion
+
+
+# --- MIGRACIÓN 6: APORTES IMPORTADOS CONFIRMADOS EN LA FECHA DEL DEPÓSITO ---
+def corregir_confirmacion_importados(engine, log=print):
+    """
+    Los aportes importados del banco (con huella) quedaban confirmados a la hora de la importación:
+    en resumen_mensual todo un historial caía en un solo mes. Se pasan a la fecha del depósito y se
+    recalculan los meses afectados (los de antes y los de ahora). Va después de llenar resumen_mensual.
+    """
+    with engine.connect() as conexion:
+        if 'huella' not in _columnas_actuales(conexion, 'aportes'):
+            return
+        afectados = conexion.execute(
+            select(Aporte.fecha_confirmacion, Aporte.fecha_registro)
+            .where(Aporte.huella.isnot(None), Aporte.fecha_confirmacion.isnot(None),
+                   func.date(Aporte.fecha_confirmacion) != func.date(Aporte.fecha_registro))
+        ).all()
+    if not afectados:
+        return
+
+    db.session.execute(
+        update(Aporte).where(Aporte.huella.isnot(None), Aporte.fecha_confirmacion.isnot(None),
+                             func.date(Aporte.fecha_confirmacion) != func.date(Aporte.fecha_registro))
+        .values(fecha_confirmacion=Aporte.fecha_registro).execution_options(synchronize_session=False)
+    )
+    recalcular_resumen_mensual({fecha for fila in afectados for fecha in fila})
+    db.session.commit()
+    log(f"   aportes: {len(afectados)} importados pasados a la fecha del depósito")
+
+
+# Migraciones en orden. Cada una revisa el esquema actual, así que se pueden correr varias veces.
+MIGRACIONES = [
+    ('Dinero en centavos enteros', migrar_a_centavos),
+    ('Columnas nuevas', agregar_columnas),
+    ('Índices compuestos', crear_indices),
+    ('Índices reemplazados', borrar_indices_reemplazados),
+    ('Versión de los totales del fondo', iniciar_version_totales),
+    ('Nombres para el buscador', llenar_busqueda_usuarios),
+    ('Tablas nuevas', crear_tablas),
+    ('Resumen por socio', _crear_y_llenar(ResumenUsuario.__table__, reconstruir_resumenes)),
+    ('Totales del fondo', _crear_y_llenar(TotalesFondo.__table__, reconstruir_totales_fondo)),
+    ('Resumen mensual', _crear_y_llenar(ResumenMensual.__table__, reconstruir_resumen_mensual)),
+    ('Aportes importados en la fecha del depósito', corregir_confirmacion_importados),
+]
+
+
+def aplicar_migraciones(engine, log=print):
+    for nombre, migracion in MIGRACIONES:
+        log(f"▶ {nombre}")
+        migracion(engine, log=log)
+
+
+# --- VERIFICACIÓN DE PLANES DE CONSULTA ---
+def consultas_paginas():
+    """
+    Consultas filtradas que hacen las páginas (con parámetros de ejemplo). Los totales y saldos salen
+    de las tablas de resumen (resumen_usuario, totales_fondo, resumen_mensual), no de SUM sobre aportes o cuotas.
+    Los listados completos (ej: todos los usuarios) no se incluyen porque recorren la tabla a propósito.
+    """
+    hoy = date.today()
+    return [
+        ('home, mis_aportes: resumen del socio',
+         select(ResumenUsuario).where(ResumenUsuario.usuario_id == 1)),
+        ('admin_reportes: totales del fondo',
+         select(TotalesFondo).where(TotalesFondo.id == ID_TOTALES)),
+        ('caché de figuras: versión del fondo',
+         select(TotalesFondo.version).where(TotalesFondo.id == ID_TOTALES)),
+        ('admin_reportes: perfil 360 del socio',
+         select(Usuario, ResumenUsuario).outerjoin(ResumenUsuario, ResumenUsuario.usuario_id == Usuario.id)
+         .where(Usuario.id == 1)),
+        ('admin_aportes: cola de aportes',
+         select(Aporte, Usuario).join(Usuario, Aporte.usuario_id == Usuario.id).where(Aporte.estado == 'Pendiente')
+         .order_by(Aporte.id).limit(10)),
+        ('admin_aportes: cola por fecha (página siguiente)',
+         select(Aporte, Usuario).join(Usuario, Aporte.usuario_id == Usuario.id)
+         .where(Aporte.estado == 'Pendiente', tuple_(Aporte.fecha_registro, Aporte.id) > tuple_(datetime(2025, 1, 1), 100))
+         .order_by(Aporte.fecha_registro, Aporte.id).limit(10)),
+        ('admin_prestamos: solicitudes pendientes',
+         select(Prestamo, Usuario).join(Usuario, Prestamo.usuario_id == Usuario.id).where(Prestamo.estado == 'Pendiente')
+         .order_by(Prestamo.id).limit(10)),
+        ('admin_prestamos: solicitudes por fecha (página siguiente)',
+         select(Prestamo, Usuario).join(Usuario, Prestamo.usuario_id == Usuario.id)
+         .where(Prestamo.estado == 'Pendiente', tuple_(Prestamo.fecha_solicitud, Prestamo.id) > tuple_(datetime(2025, 1, 1), 100))
+         .order_by(Prestamo.fecha_solicitud, Prestamo.id).limit(10)),
+        ('admin_usuarios: página siguiente de usuarios',
+         select(Usuario).where(Usuario.id > 100).order_by(Usuario.id).limit(5)),
+        ('buscador de socios: prefijo del nombre o usuario',
+         select(Usuario.id).where(or_(Usuario.nombre_busqueda.between('ana', 'ana\uffff'),
+                                      Usuario.usuario_busqueda.between('ana', 'ana\uffff')))
+         .order_by(Usuario.nombre_busqueda).limit(20)),
+        ('admin_pagos: buscador de socios con préstamos activos',
+         select(Usuario.id).join(ResumenUsuario, ResumenUsuario.usuario_id == Usuario.id)
+         .where(ResumenUsuario.prestamos_activos > 0).order_by(Usuario.nombre_busqueda).limit(20)),
+        ('admin_panel: usuarios por activar',
+         select(Usuario).where(Usuario.activo == False).order_by(Usuario.id)),
+        ('admin_panel: solicitudes pendientes con socio',
+         select(Prestamo, Usuario.nombre_completo).outerjoin(Usuario, Prestamo.usuario_id == Usuario.id)
+         .where(Prestamo.estado == 'Pendiente').order_by(Prestamo.id)),
+        ('admin_pagos: cuotas por cobrar del socio',
+         select(Cuota).join(Prestamo, Cuota.prestamo_id == Prestamo.id)
+         .where(Prestamo.usuario_id == 1, Prestamo.estado == 'Activo', Cuota.estado.in_(ESTADOS_POR_COBRAR))
+         .order_by(Cuota.fecha_vencimiento, Cuota.id)),
+        ('admin_pagos: cuota con su préstamo',
+         select(Cuota, Prestamo).join(Prestamo, Cuota.prestamo_id == Prestamo.id).where(Cuota.id == 1)),
+        ('admin_pagos: cuotas por cobrar del préstamo',
+         select(func.count(Cuota.id)).where(Cuota.prestamo_id == 1, Cuota.estado.in_(ESTADOS_POR_COBRAR))),
+        ('admin_reportes: cartera activa',
+         select(Prestamo.monto_solicitado, Prestamo.tasa_interes, Prestamo.cuotas_totales,
+                select(func.count(Cuota.id)).where(Cuota.prestamo_id == Prestamo.id, Cuota.estado == 'Pagado')
+                .correlate(Prestamo).scalar_subquery())
+         .where(Prestamo.estado == 'Activo')),
+        ('admin_reportes: tendencias mensuales',
+         select(ResumenMensual).where(ResumenMensual.mes >= date(2025, 1, 1), ResumenMensual.mes <= date(2025, 12, 1))
+         .order_by(ResumenMensual.mes)),
+        ('admin_cartera: antigüedad de la cartera', consulta_antiguedad_cartera(hoy)),
+        ('mis_aportes: historial del socio',
+         select(Aporte).where(Aporte.usuario_id == 1).order_by(Aporte.id.desc()).limit(10)),
+        ('mis_prestamos: préstamos del socio',
+         select(Prestamo).where(Prestamo.usuario_id == 1).order_by(Prestamo.id)),
+        ('mis_prestamos: plan del préstamo',
+         select(Cuota).where(Cuota.prestamo_id.in_([1])).order_by(Cuota.numero_cuota)),
+        ('tarea de mora: cuotas vencidas',
+         select(Cuota.id).where(Cuota.estado == 'Pendiente', Cuota.fecha_vencimiento < hoy)),
+    ]
+
+
+def verificar_indices(engine=None, log=print):
+    """
+    Corre EXPLAIN QUERY PLAN sobre cada consulta de consultas_paginas() y reporta
+    las que recorren una tabla completa (SCAN sin índice). Devuelve la lista de fallas.
+    Por defecto se revisa una base vacía en memoria con el esquema de los modelos: sin
+    estadísticas SQLite planea como si las tablas fueran grandes, que es el caso que importa
+    (con pocas filas prefiere recorrer la tabla aunque exista el índice).
+    """
+    if engine is None:
+        engine = create_engine('sqlite://')
+        db.metadata.create_all(engine)
+
+    fallas = []
+    with engine.connect() as conexion:
+        for nombre, consulta in consultas_paginas():
+            sql = str(consulta.compile(engine, compile_kwargs={'literal_binds': True}))
+            plan = [fila[3] for fila in conexion.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+            recorridos = [paso for paso in plan if paso.startswith('SCAN') and 'INDEX' not in paso]
+            if recorridos:
+                fallas.append((nombre, recorridos))
+                log(f"❌ {nombre}: {'; '.join(recorridos)}")
+            else:
+                log(f"✅ {nombre}: {'; '.join(plan)}")
+    return fallas
@@ -1,11 +1,33 @@
 from database.db import db
 from flask_login import UserMixin
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from utils.texto import normalizar_texto
+
+# --- TIPO DINERO (Centavos enteros) ---
+# En la base de datos se guarda un INTEGER con centavos; en Python se sigue trabajando en pesos.
+# Así las sumas (db.func.sum) se hacen sobre enteros exactos y el redondeo ocurre una sola vez al guardar.
+class Dinero(db.TypeDecorator):
+    impl = db.Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int(round(float(value) * 100))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return value / 100
 
 # --- MODELO DE USUARIO ---
 class Usuario(UserMixin, db.Model):
     __tablename__ = 'usuarios'
+    __table_args__ = (
+        db.Index('ix_usuarios_activo', 'activo'), # Usuarios pendientes de activación
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
@@ -19,6 +41,10 @@ class Usuario(UserMixin, db.Model):
     
     # Estado del usuario (Para que el admin apruebe el ingreso)
     activo = db.Column(db.Boolean, default=False) 
+
+    # Nombre y usuario sin tildes ni mayúsculas para el buscador de socios (se llenan solos, ver _normalizar_busqueda)
+    nombre_busqueda = db.Column(db.String(100))
+    usuario_busqueda = db.Column(db.String(50))
     
     # Relaciones
     aportes = db.relationship('Aporte', backref='usuario', lazy=True)
@@ -30,28 +56,53 @@ class Usuario(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    @validates('nombre_completo', 'username')
+    def _normalizar_busqueda(self, campo, valor):
+        # lower() de SQLite solo cambia letras ASCII: 'án' no encontraría a 'Ángela'. Se guarda ya normalizado
+        if campo == 'nombre_completo':
+            self.nombre_busqueda = normalizar_texto(valor)
+        else:
+            self.usuario_busqueda = normalizar_texto(valor)
+        return valor
+
+# Buscador de socios: prefijo del nombre o del usuario, sin tildes ni mayúsculas
+db.Index('ix_usuarios_nombre_busqueda', Usuario.nombre_busqueda)
+db.Index('ix_usuarios_usuario_busqueda', Usuario.usuario_busqueda)
+
 # --- MODELO DE APORTES (Ahorros/Entradas) ---
 class Aporte(db.Model):
     __tablename__ = 'aportes'
+    __table_args__ = (
+        db.Index('ix_aportes_usuario_estado', 'usuario_id', 'estado'), # Ahorros de un socio
+        db.Index('ix_aportes_estado', 'estado'), # Cola de aprobación y total en caja
+        db.Index('ix_aportes_estado_fecha', 'estado', 'fecha_registro'), # Cola de aprobación ordenada por fecha (paginación por llave)
+        db.Index('ux_aportes_huella', 'huella', unique=True), # Importación: no cargar dos veces el mismo depósito
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
     fecha_registro = db.Column(db.DateTime, default=datetime.utcnow)
     fecha_confirmacion = db.Column(db.DateTime, nullable=True) # Cuando el admin aprueba
     
-    monto = db.Column(db.Float, nullable=False)
+    monto = db.Column(Dinero, nullable=False)
     tipo = db.Column(db.String(50), default='Aporte Mensual') # Aporte, Multa, Extra, etc.
     estado = db.Column(db.String(20), default='Pendiente') # Pendiente, Aprobado, Rechazado
     notas = db.Column(db.String(200))
+    huella = db.Column(db.String(40), nullable=True) # Hash de (socio, monto, fecha, referencia) en aportes importados
 
 # --- MODELO DE PRESTAMOS ---
 class Prestamo(db.Model):
     __tablename__ = 'prestamos'
+    __table_args__ = (
+        db.Index('ix_prestamos_usuario_estado', 'usuario_id', 'estado'), # Préstamos activos de un socio
+        db.Index('ix_prestamos_estado', 'estado'), # Solicitudes pendientes y cartera activa
+        db.Index('ix_prestamos_estado_fecha', 'estado', 'fecha_solicitud'), # Solicitudes ordenadas por fecha (paginación por llave)
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
     
-    monto_solicitado = db.Column(db.Float, nullable=False)
+    monto_solicitado = db.Column(Dinero, nullable=False)
     tasa_interes = db.Column(db.Float, nullable=False) # Ej: 0.05 para 5%
     cuotas_totales = db.Column(db.Integer, nullable=False)
     
@@ -66,6 +117,11 @@ class Prestamo(db.Model):
 # --- MODELO DE CUOTAS (Tabla de amortización) ---
 class Cuota(db.Model):
     __tablename__ = 'cuotas'
+    __table_args__ = (
+        db.Index('ix_cuotas_prestamo_estado_vencimiento', 'prestamo_id', 'estado', 'fecha_vencimiento'), # Próxima cuota / cuotas pendientes
+        # Cuotas vencidas, totales por estado y antigüedad de la cartera (cubre préstamo y valor: no lee la tabla)
+        db.Index('ix_cuotas_cartera', 'estado', 'fecha_vencimiento', 'prestamo_id', 'monto_total'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     prestamo_id = db.Column(db.Integer, db.ForeignKey('prestamos.id'), nullable=False)
@@ -73,9 +129,123 @@ class Cuota(db.Model):
     numero_cuota = db.Column(db.Integer, nullable=False)
     fecha_vencimiento = db.Column(db.Date, nullable=False)
     
-    monto_capital = db.Column(db.Float) # Parte que va al préstamo
-    monto_interes = db.Column(db.Float) # Ganancia del fondo
-    monto_total = db.Column(db.Float, nullable=False) # Lo que paga el usuario
+    monto_capital = db.Column(Dinero) # Parte que va al préstamo
+    monto_interes = db.Column(Dinero) # Ganancia del fondo
+    monto_total = db.Column(Dinero, nullable=False) # Lo que paga el usuario
     
     estado = db.Column(db.String(20), default='Pendiente') # Pendiente, Pagado, Mora
-    fecha_pago = db.Column(db.DateTime, nullable=True)
\ No newline at end of file
+    fecha_pago = db.Column(db.DateTime, nullable=True)
+# --- RESUMEN POR SOCIO (Se actualiza en la misma transacción de cada aprobación o pago) ---
+class ResumenUsuario(db.Model):
+    __tablename__ = 'resumen_usuario'
+    __table_args__ = (
+        db.Index('ix_resumen_usuario_prestamos_activos', 'prestamos_activos'), # Socios con deuda (admin_pagos)
+    )
+    
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), primary_key=True)
+    
+    ahorro_total = db.Column(Dinero, nullable=False, default=0) # Aportes aprobados
+    deuda_pendiente = db.Column(Dinero, nullable=False, default=0) # Cuotas Pendiente/Mora de préstamos activos
+    cuotas_mora = db.Column(db.Integer, nullable=False, default=0)
+    prestamos_activos = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Próxima cuota a pagar (copia para no consultar 'cuotas')
+    proxima_cuota_id = db.Column(db.Integer, nullable=True)
+    proxima_cuota_fecha = db.Column(db.Date, nullable=True)
+    proxima_cuota_monto = db.Column(Dinero, nullable=True)
+    proxima_cuota_estado = db.Column(db.String(20), nullable=True)
+    
+    actualizado = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# --- TOTALES DEL FONDO (Una sola fila, id=1, para las tarjetas del Dashboard) ---
+class TotalesFondo(db.Model):
+    __tablename__ = 'totales_fondo'
+    
+    id = db.Column(db.Integer, primary_key=True) # Siempre 1
+    
+    caja_ahorros = db.Column(Dinero, nullable=False, default=0) # Aportes aprobados
+    desembolsado_bruto = db.Column(Dinero, nullable=False, default=0) # Monto original de préstamos activos
+    capital_recuperado = db.Column(Dinero, nullable=False, default=0) # Capital pagado de préstamos activos
+    intereses_recaudados = db.Column(Dinero, nullable=False, default=0) # Intereses de cuotas pagadas
+    version = db.Column(db.Integer, nullable=False, default=0) # Sube con cada cambio (llave del caché de figuras del Dashboard)
+    
+    actualizado = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# --- RESUMEN MENSUAL (Una fila por mes, para las gráficas de tendencia del Dashboard) ---
+class ResumenMensual(db.Model):
+    __tablename__ = 'resumen_mensual'
+    
+    mes = db.Column(db.Date, primary_key=True) # Primer día del mes
+    
+    aportes = db.Column(Dinero, nullable=False, default=0) # Aportes aprobados (por mes de confirmación)
+    cantidad_aportes = db.Column(db.Integer, nullable=False, default=0)
+    desembolsos = db.Column(Dinero, nullable=False, default=0) # Préstamos aprobados (por mes de aprobación)
+    prestamos_desembolsados = db.Column(db.Integer, nullable=False, default=0)
+    capital_recuperado = db.Column(Dinero, nullable=False, default=0) # Cuotas pagadas (por mes de pago)
+    intereses_recaudados = db.Column(Dinero, nullable=False, default=0)
+    cuotas_pagadas = db.Column(db.Integer, nullable=False, default=0)
+    mora = db.Column(Dinero, nullable=False, default=0) # Cuotas que vencieron ese mes y cayeron en mora (pagadas tarde o aún en Mora)
+    cuotas_mora = db.Column(db.Integer, nullable=False, default=0)
+    multas = db.Column(Dinero, nullable=False, default=0) # Multas por mora causadas (por fecha de causación)
+    
+    actualizado = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# --- TAREAS PROGRAMADAS (Bitácora y candado compartido entre procesos) ---
+class EjecucionTarea(db.Model):
+    __tablename__ = 'ejecuciones_tarea'
+    __table_args__ = (
+        db.Index('ix_ejecuciones_tarea_tarea_inicio', 'tarea', 'inicio'), # Última ejecución de cada tarea
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    tarea = db.Column(db.String(50), nullable=False) # Ej: 'mora'
+    inicio = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    duracion_ms = db.Column(db.Float, nullable=False)
+    filas = db.Column(db.Integer, nullable=False, default=0) # Filas modificadas
+    origen = db.Column(db.String(50)) # 'programador', 'cli', ...
+
+class CandadoTarea(db.Model):
+    __tablename__ = 'candados_tarea'
+    
+    tarea = db.Column(db.String(50), primary_key=True)
+    bloqueado_hasta = db.Column(db.DateTime, nullable=False)
+    dueno = db.Column(db.String(50)) # host:pid del proceso que la está corriendo
+
+# --- MULTAS POR MORA (Causación de intereses de mora sobre cuotas vencidas) ---
+class Multa(db.Model):
+    __tablename__ = 'multas'
+    __table_args__ = (
+        db.UniqueConstraint('cuota_id', 'fecha_causacion', name='uq_multas_cuota_fecha'), # Una causación por cuota y fecha
+        db.Index('ix_multas_usuario_fecha', 'usuario_id', 'fecha_causacion'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    cuota_id = db.Column(db.Integer, db.ForeignKey('cuotas.id'), nullable=False)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    
+    fecha_causacion = db.Column(db.Date, nullable=False) # Día hasta el que se calculó
+    dias_mora = db.Column(db.Integer, nullable=False)
+    monto = db.Column(Dinero, nullable=False) # Lo causado en esta fecha (no el acumulado)
+    
+    estado = db.Column(db.String(20), default='Pendiente') # Pendiente, Pagado, Condonado
+
+# --- MOVIMIENTOS DEL EXTRACTO BANCARIO (Conciliación de pagos y cola de revisión) ---
+class MovimientoBanco(db.Model):
+    __tablename__ = 'movimientos_banco'
+    __table_args__ = (
+        db.Index('ix_movimientos_banco_estado', 'estado'), # Cola de revisión
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    huella = db.Column(db.String(40), unique=True, nullable=False) # Hash de la línea: subir dos veces el extracto no paga doble
+    
+    fecha = db.Column(db.Date, nullable=False)
+    monto = db.Column(Dinero, nullable=False)
+    referencia = db.Column(db.String(200))
+    
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True) # Socio identificado (si se pudo)
+    cuota_id = db.Column(db.Integer, db.ForeignKey('cuotas.id'), nullable=True) # Cuota que pagó (si concilió)
+    
+    estado = db.Column(db.String(20), nullable=False) # Conciliado, Por revisar, Resuelto, Descartado
+    motivo = db.Column(db.String(100)) # Por qué quedó en revisión
+    fecha_carga = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,178 @@
+import logging
+import time
+from collections import namedtuple
+from datetime import date, datetime
+import numpy as np
+from sqlalchemy import select, insert, update
+from database.db import db
+from database.models import Usuario, Aporte, Prestamo, Cuota
+from database.resumen import registrar_prestamos_aprobados, registrar_aportes_aprobados
+from database.cache_socios import invalidar_socios
+from utils.financiero import calcular_planes_lote, lote_a_filas_cuotas
+
+# Resultado de una operación de administración:
+# procesados = IDs que sí cambiaron, omitidos = IDs que ya no estaban pendientes,
+# filas = filas escritas en total, duracion_ms = tiempo de la transacción completa
+ResultadoOperacion = namedtuple('ResultadoOperacion', ['procesados', 'omitidos', 'filas', 'duracion_ms'])
+log_operaciones = logging.getLogger('fondo.operaciones')
+
+
+def _registrar_latencia(operacion, reloj, filas, origen):
+    """Milisegundos desde 'reloj' (se devuelven en el ResultadoOperacion); queda una línea en el log."""
+    duracion_ms = (time.perf_counter() - reloj) * 1000
+    log_operaciones.info("%s (%s): %d filas en %.1f ms", operacion, origen, filas, duracion_ms)
+    return duracion_ms
+
+
+# =========================================================
+# PRÉSTAMOS
+# =========================================================
+def aprobar_prestamos(prestamo_ids, fecha_inicio=None, origen='web'):
+    """
+    Aprueba préstamos pendientes y genera sus planes de pago en una sola transacción:
+    1. Un UPDATE ... RETURNING pasa a 'Activo' solo los que siguen 'Pendiente'
+       (si otro administrador ya los aprobó, quedan en omitidos).
+    2. Los planes de todos se calculan de una vez (calcular_planes_lote, en centavos).
+    3. Todas las cuotas se insertan con un solo INSERT en bloque.
+    4. Se actualizan el resumen del socio y los totales del fondo.
+    Hace commit (o rollback si algo falla). Devuelve un ResultadoOperacion.
+    """
+    prestamo_ids = list(prestamo_ids)
+    fecha_inicio = fecha_inicio or date.today()
+    inicio = datetime.utcnow()
+    reloj = time.perf_counter()
+    try:
+        aprobados = db.session.execute(
+            update(Prestamo)
+            .where(Prestamo.id.in_(prestamo_ids), Prestamo.estado == 'Pendiente')
+            .values(estado='Activo', fecha_aprobacion=inicio)
+            .returning(Prestamo.id, Prestamo.usuario_id, Prestamo.monto_solicitado,
+                       Prestamo.tasa_interes, Prestamo.cuotas_totales)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        filas = len(aprobados)
+        if aprobados:
+            ids, _, montos, tasas, cuotas = zip(*aprobados)
+            fechas = np.full(len(ids), np.datetime64(fecha_inicio, 'D'))
+            lote = calcular_planes_lote(montos, tasas, cuotas, fechas, en_centavos=True)
+
+            # Sobre la conexión de la sesión (misma transacción): executemany sin pasar por el ORM
+            db.session.connection().execute(insert(Cuota.__table__), lote_a_filas_cuotas(lote, ids))
+            filas += len(lote.numero)
+
+            totales = np.bincount(lote.prestamo, weights=lote.cuota, minlength=len(ids)) / 100
+            registrar_prestamos_aprobados(aprobados, totales.tolist(), fecha_aprobacion=inicio)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    duracion_ms = _registrar_latencia('aprobar_prestamos', reloj, filas, origen)
+
+    procesados = [p.id for p in aprobados]
+    omitidos = sorted(set(prestamo_ids) - set(procesados))
+    return ResultadoOperacion(procesados, omitidos, filas, duracion_ms)
+
+
+def aprobar_prestamo(prestamo_id, fecha_inicio=None, origen='web'):
+    return aprobar_prestamos([prestamo_id], fecha_inicio, origen)
+
+
+def rechazar_prestamos(prestamo_ids, origen='web'):
+    """Rechaza los préstamos que sigan pendientes (un solo UPDATE). Hace commit."""
+    prestamo_ids = list(prestamo_ids)
+    reloj = time.perf_counter()
+    try:
+        procesados = db.session.execute(
+            update(Prestamo)
+            .where(Prestamo.id.in_(prestamo_ids), Prestamo.estado == 'Pendiente')
+            .values(estado='Rechazado')
+            .returning(Prestamo.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        invalidar_socios(db.session.execute(select(Prestamo.usuario_id).where(Prestamo.id.in_(procesados)).distinct()).scalars())
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    duracion_ms = _registrar_latencia('rechazar_prestamos', reloj, len(procesados), origen)
+
+    omitidos = sorted(set(prestamo_ids) - set(procesados))
+    return ResultadoOperacion(procesados, omitidos, len(procesados), duracion_ms)
+
+
+# =========================================================
+# APORTES
+# =========================================================
+def aprobar_aportes(aporte_ids, origen='web'):
+    """Aprueba los aportes que sigan pendientes (un solo UPDATE) y suma al ahorro de cada socio. Hace commit."""
+    aporte_ids = list(aporte_ids)
+    inicio = datetime.utcnow()
+    reloj = time.perf_counter()
+    try:
+        aprobados = db.session.execute(
+            update(Aporte)
+            .where(Aporte.id.in_(aporte_ids), Aporte.estado == 'Pendiente')
+            .values(estado='Aprobado', fecha_confirmacion=inicio)
+            .returning(Aporte.id, Aporte.usuario_id, Aporte.monto)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if aprobados:
+            registrar_aportes_aprobados(aprobados, fecha_confirmacion=inicio)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    duracion_ms = _registrar_latencia('aprobar_aportes', reloj, len(aprobados), origen)
+
+    procesados = [a.id for a in aprobados]
+    omitidos = sorted(set(aporte_ids) - set(procesados))
+    return ResultadoOperacion(procesados, omitidos, len(procesados), duracion_ms)
+
+
+def rechazar_aportes(aporte_ids, origen='web'):
+    """Rechaza los aportes que sigan pendientes (un solo UPDATE; el ahorro no cambia). Hace commit."""
+    aporte_ids = list(aporte_ids)
+    reloj = time.perf_counter()
+    try:
+        procesados = db.session.execute(
+            update(Aporte)
+            .where(Aporte.id.in_(aporte_ids), Aporte.estado == 'Pendiente')
+            .values(estado='Rechazado')
+            .returning(Aporte.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    duracion_ms = _registrar_latencia('rechazar_aportes', reloj, len(procesados), origen)
+
+    omitidos = sorted(set(aporte_ids) - set(procesados))
+    return ResultadoOperacion(procesados, omitidos, len(procesados), duracion_ms)
+
+
+# =========================================================
+# USUARIOS
+# =========================================================
+def activar_usuarios(usuario_ids, origen='web'):
+    """Activa los usuarios que sigan inactivos (un solo UPDATE). Hace commit."""
+    usuario_ids = list(usuario_ids)
+    reloj = time.perf_counter()
+    try:
+        procesados = db.session.execute(
+            update(Usuario)
+            .where(Usuario.id.in_(usuario_ids), Usuario.activo == False)
+            .values(activo=True)
+            .returning(Usuario.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    duracion_ms = _registrar_latencia('activar_usuarios', reloj, len(procesados), origen)
+
+    omitidos = sorted(set(usuario_ids) - set(procesados))
+    return ResultadoOperacion(procesados, omitidos, len(procesados), duracion_ms)
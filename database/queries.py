@@ -0,0 +1,193 @@
+from contextlib import contextmanager
+from datetime import date, timedelta
+from sqlalchemy import select, event, func, case, and_
+from sqlalchemy.orm import selectinload, joinedload
+from database.db import db
+from database.models import Usuario, Prestamo, Cuota, Aporte, ResumenUsuario
+from database.resumen import (ESTADOS_POR_COBRAR, obtener_resumen, obtener_totales_fondo, obtener_resumen_mensual,
+                              version_fondo)
+
+# Consultas que usan las páginas, con nombre y un número fijo de sentencias SQL
+# (nunca una consulta por fila: los datos relacionados van en el mismo JOIN o en un selectinload).
+
+
+# =========================================================
+# ADMINISTRACIÓN
+# =========================================================
+def usuarios_por_activar():
+    """Usuarios con activo = False. 1 consulta."""
+    return db.session.execute(select(Usuario).where(Usuario.activo == False).order_by(Usuario.id)).scalars().all()
+
+
+def prestamos_pendientes_con_socio():
+    """[(Prestamo, nombre del socio)] de las solicitudes pendientes. 1 consulta."""
+    return db.session.execute(
+        select(Prestamo, Usuario.nombre_completo)
+        .outerjoin(Usuario, Prestamo.usuario_id == Usuario.id)
+        .where(Prestamo.estado == 'Pendiente')
+        .order_by(Prestamo.id)
+    ).all()
+
+
+def prestamos_activos_con_pagadas():
+    """[(monto, tasa, plazo, cuotas pagadas)] de los préstamos activos, para el saldo en forma cerrada. 1 consulta."""
+    pagadas = select(func.count(Cuota.id)).where(Cuota.prestamo_id == Prestamo.id, Cuota.estado == 'Pagado') \
+        .correlate(Prestamo).scalar_subquery()
+    return db.session.execute(
+        select(Prestamo.monto_solicitado, Prestamo.tasa_interes, Prestamo.cuotas_totales, pagadas)
+        .where(Prestamo.estado == 'Activo')
+    ).all()
+
+
+def perfil_socio(usuario_id):
+    """(Usuario, ResumenUsuario o None) del socio, o None si no existe. 1 consulta."""
+    return db.session.execute(
+        select(Usuario, ResumenUsuario)
+        .outerjoin(ResumenUsuario, ResumenUsuario.usuario_id == Usuario.id)
+        .where(Usuario.id == usuario_id)
+    ).first()
+
+
+def movimientos_de_socio(usuario_id):
+    """(préstamos, aportes) del socio para el editor de administración. 2 consultas."""
+    prestamos = db.session.execute(select(Prestamo).where(Prestamo.usuario_id == usuario_id).order_by(Prestamo.id)).scalars().all()
+    aportes = db.session.execute(select(Aporte).where(Aporte.usuario_id == usuario_id).order_by(Aporte.id)).scalars().all()
+    return prestamos, aportes
+
+
+# =========================================================
+# PAGOS
+# =========================================================
+def cuotas_por_cobrar(usuario_id):
+    """Cuotas Pendientes o en Mora de los préstamos activos del socio, por vencimiento. 1 consulta."""
+    return db.session.execute(
+        select(Cuota).join(Prestamo, Cuota.prestamo_id == Prestamo.id)
+        .where(Prestamo.usuario_id == usuario_id, Prestamo.estado == 'Activo', Cuota.estado.in_(ESTADOS_POR_COBRAR))
+        .order_by(Cuota.fecha_vencimiento, Cuota.id)
+    ).scalars().all()
+
+
+def cuota_con_prestamo(cuota_id):
+    """La cuota con su préstamo ya cargado (cuota.prestamo no hace otra consulta). 1 consulta."""
+    return db.session.execute(
+        select(Cuota).options(joinedload(Cuota.prestamo)).where(Cuota.id == cuota_id)
+    ).scalar_one_or_none()
+
+
+def cuotas_por_cobrar_del_prestamo(prestamo_id):
+    """Cuántas cuotas le quedan por cobrar al préstamo. 1 consulta."""
+    return db.session.execute(
+        select(func.count(Cuota.id)).where(Cuota.prestamo_id == prestamo_id, Cuota.estado.in_(ESTADOS_POR_COBRAR))
+    ).scalar()
+
+
+# =========================================================
+# CARTERA: ANTIGÜEDAD DE LA DEUDA
+# =========================================================
+# (columna, etiqueta, días de atraso desde, hasta); None = sin límite. Días de atraso = hoy - fecha de vencimiento.
+TRAMOS_CARTERA = [
+    ('al_dia', 'Al día', None, 0),
+    ('dias_1_30', '1-30 días', 1, 30),
+    ('dias_31_60', '31-60 días', 31, 60),
+    ('dias_61_90', '61-90 días', 61, 90),
+    ('dias_90_mas', 'Más de 90 días', 91, None),
+]
+
+
+def consulta_antiguedad_cartera(hoy):
+    """
+    SELECT con la deuda por cobrar de cada socio repartida en TRAMOS_CARTERA: un solo GROUP BY sobre las cuotas
+    Pendientes o en Mora de préstamos activos. Los tramos se comparan contra fecha_vencimiento (fechas
+    calculadas aquí), así la consulta solo lee ix_cuotas_cartera: las cuotas ya pagadas no se tocan.
+    """
+    dinero = Cuota.__table__.c.monto_total.type # Las sumas se leen como Dinero (centavos -> pesos)
+
+    def tramo(desde, hasta):
+        condiciones = []
+        if desde is not None:
+            condiciones.append(Cuota.fecha_vencimiento <= hoy - timedelta(days=desde))
+        if hasta is not None:
+            condiciones.append(Cuota.fecha_vencimiento >= hoy - timedelta(days=hasta))
+        return func.sum(case((and_(*condiciones), Cuota.monto_total), else_=0), type_=dinero)
+
+    return (
+        select(Usuario.id.label('usuario_id'), Usuario.nombre_completo, Usuario.username,
+               *[tramo(desde, hasta).label(columna) for columna, _, desde, hasta in TRAMOS_CARTERA],
+               func.sum(Cuota.monto_total, type_=dinero).label('total'),
+               func.count(case((Cuota.fecha_vencimiento < hoy, 1))).label('cuotas_vencidas'),
+               func.min(Cuota.fecha_vencimiento).label('vencimiento_mas_antiguo'))
+        .select_from(Cuota)
+        .join(Prestamo, Cuota.prestamo_id == Prestamo.id)
+        .join(Usuario, Prestamo.usuario_id == Usuario.id)
+        .where(Cuota.estado.in_(ESTADOS_POR_COBRAR), Prestamo.estado == 'Activo')
+        .group_by(Usuario.id, Usuario.nombre_completo, Usuario.username)
+        .order_by(func.min(Cuota.fecha_vencimiento), Usuario.id)
+    )
+
+
+def antiguedad_cartera(hoy=None):
+    """Una fila por socio con deuda (tramos, total, cuotas vencidas, vencimiento más antiguo), la deuda más vieja primero. 1 consulta."""
+    return db.session.execute(consulta_antiguedad_cartera(hoy or date.today())).all()
+
+
+# =========================================================
+# SOCIO
+# =========================================================
+def prestamos_de_socio(usuario_id):
+    """Préstamos del socio, del más antiguo al más reciente. 1 consulta."""
+    return db.session.execute(select(Prestamo).where(Prestamo.usuario_id == usuario_id).order_by(Prestamo.id)).scalars().all()
+
+
+def prestamo_con_plan(prestamo_id, usuario_id=None):
+    """
+    (Prestamo, cuotas ordenadas por número) o (None, []) si no existe o no es del socio 'usuario_id'.
+    El plan se trae con selectinload: 2 consultas sin importar cuántas cuotas tenga.
+    """
+    consulta = select(Prestamo).options(selectinload(Prestamo.plan_pagos)).where(Prestamo.id == prestamo_id)
+    if usuario_id is not None:
+        consulta = consulta.where(Prestamo.usuario_id == usuario_id)
+    prestamo = db.session.execute(consulta).scalar_one_or_none()
+    if prestamo is None:
+        return None, []
+    return prestamo, sorted(prestamo.plan_pagos, key=lambda c: c.numero_cuota)
+
+
+# =========================================================
+# VERIFICACIÓN: SENTENCIAS POR CONSULTA
+# =========================================================
+@contextmanager
+def contar_sentencias():
+    """Lista que se va llenando con cada sentencia SQL que se ejecuta dentro del bloque."""
+    sentencias = []
+
+    def anotar(conexion, cursor, sentencia, parametros, contexto, executemany):
+        sentencias.append(sentencia)
+
+    event.listen(db.engine, 'before_cursor_execute', anotar)
+    try:
+        yield sentencias
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', anotar)
+
+
+# Cada consulta que usan las páginas: (nombre, función, argumentos, sentencias esperadas).
+# 'argumentos' nombra lo que recibe la función ('usuario', 'prestamo', 'cuota'); tests/test_consultas.py
+# la corre sin datos y con muchas filas y revisa que haga siempre las mismas sentencias (sin N+1).
+CONSULTAS_POR_PAGINA = [
+    ('admin_panel: usuarios por activar', usuarios_por_activar, (), 1),
+    ('admin_panel: préstamos pendientes', prestamos_pendientes_con_socio, (), 1),
+    ('admin_reportes: totales del fondo', obtener_totales_fondo, (), 1),
+    ('admin_reportes: tendencias mensuales', obtener_resumen_mensual, (), 1),
+    ('admin_reportes: cartera activa', prestamos_activos_con_pagadas, (), 1),
+    ('admin_reportes: perfil 360', perfil_socio, ('usuario',), 1),
+    ('caché de figuras: versión del fondo', version_fondo, (), 1),
+    ('home, mis_aportes: resumen del socio', obtener_resumen, ('usuario',), 1),
+    ('admin_usuarios: editor del socio', movimientos_de_socio, ('usuario',), 2),
+    ('admin_pagos: cuotas por cobrar', cuotas_por_cobrar, ('usuario',), 1),
+    # La página lee cuota.prestamo: se incluye para que una carga perezosa se note
+    ('admin_pagos: cuota y préstamo', lambda c: getattr(cuota_con_prestamo(c), 'prestamo', None), ('cuota',), 1),
+    ('admin_cartera: antigüedad de la cartera', antiguedad_cartera, (), 1),
+    ('admin_pagos: cuotas restantes', cuotas_por_cobrar_del_prestamo, ('prestamo',), 1),
+    ('mis_prestamos: préstamos del socio', prestamos_de_socio, ('usuario',), 1),
+    ('mis_prestamos: plan del préstamo', prestamo_con_plan, ('prestamo',), 2),
+]
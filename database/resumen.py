@@ -0,0 +1,457 @@
+from collections import defaultdict
+from datetime import date, datetime
+from sqlalchemy import select, insert, update, delete, func, case, and_, or_, literal, union_all
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database.db import db
+from database.models import Usuario, Aporte, Prestamo, Cuota, Multa, ResumenUsuario, TotalesFondo, ResumenMensual
+from database.cache_socios import invalidar_socios, invalidar_todos
+
+# Estados de cuota que todavía se deben
+ESTADOS_POR_COBRAR = ['Pendiente', 'Mora']
+
+# La fila única de totales_fondo
+ID_TOTALES = 1
+COLUMNAS_TOTALES = ['caja_ahorros', 'desembolsado_bruto', 'capital_recuperado', 'intereses_recaudados']
+
+# Estados de un préstamo que ya fue desembolsado
+ESTADOS_DESEMBOLSADOS = ['Activo', 'Pagado', 'Vencido']
+
+COLUMNAS_MENSUALES = ['aportes', 'cantidad_aportes', 'desembolsos', 'prestamos_desembolsados', 'capital_recuperado',
+                      'intereses_recaudados', 'cuotas_pagadas', 'mora', 'cuotas_mora', 'multas']
+
+COLUMNAS_RESUMEN = ['usuario_id', 'ahorro_total', 'deuda_pendiente', 'cuotas_mora', 'prestamos_activos',
+                    'proxima_cuota_id', 'proxima_cuota_fecha', 'proxima_cuota_monto', 'proxima_cuota_estado']
+
+
+# =========================================================
+# LECTURA
+# =========================================================
+def obtener_resumen(usuario_id):
+    """Fila de resumen del socio (una búsqueda por llave primaria). None si aún no tiene movimientos."""
+    return db.session.get(ResumenUsuario, usuario_id)
+
+
+def obtener_totales_fondo():
+    """Totales del fondo para el Dashboard (búsqueda por llave primaria). None si la tabla está vacía."""
+    return db.session.get(TotalesFondo, ID_TOTALES)
+
+
+def obtener_resumen_mensual(desde=None, hasta=None):
+    """Filas de resumen_mensual entre dos fechas (meses completos, ambas opcionales), de la más antigua a la más reciente."""
+    consulta = select(ResumenMensual).order_by(ResumenMensual.mes)
+    if desde:
+        consulta = consulta.where(ResumenMensual.mes >= primer_dia_mes(desde))
+    if hasta:
+        consulta = consulta.where(ResumenMensual.mes <= primer_dia_mes(hasta))
+    return db.session.execute(consulta).scalars().all()
+
+
+def version_fondo():
+    """Versión de los totales del fondo (sube con cada aprobación, pago, mora, multa o recálculo). 0 si la tabla está vacía."""
+    return db.session.execute(select(TotalesFondo.version).where(TotalesFondo.id == ID_TOTALES)).scalar() or 0
+
+
+# =========================================================
+# ACTUALIZACIÓN INCREMENTAL (No hace commit: va en la transacción de quien llama)
+# =========================================================
+def _sumar_en(modelo, llave, **deltas):
+    """Suma deltas a las columnas de una fila de resumen (UPSERT: crea la fila si no existe)."""
+    columna_llave, valor_llave = llave
+    sentencia = sqlite_insert(modelo).values({columna_llave: valor_llave, 'actualizado': datetime.utcnow(), **deltas})
+    cambios = {col: getattr(modelo, col) + getattr(sentencia.excluded, col) for col in deltas}
+    cambios['actualizado'] = sentencia.excluded.actualizado
+    db.session.execute(sentencia.on_conflict_do_update(index_elements=[columna_llave], set_=cambios))
+
+
+def _sumar(usuario_id, **deltas):
+    invalidar_socios([usuario_id])
+    _sumar_en(ResumenUsuario, ('usuario_id', usuario_id), **deltas)
+
+
+def _sumar_por_socio(filas):
+    """
+    Como _sumar, pero para muchos socios con un solo executemany (la sentencia se compila una vez).
+    filas: [{'usuario_id': ..., columna: delta, ...}] todas con las mismas llaves.
+    """
+    if not filas:
+        return
+    invalidar_socios(fila['usuario_id'] for fila in filas)
+    sentencia = sqlite_insert(ResumenUsuario)
+    cambios = {col: getattr(ResumenUsuario, col) + getattr(sentencia.excluded, col) for col in filas[0] if col != 'usuario_id'}
+    cambios['actualizado'] = sentencia.excluded.actualizado
+    ahora = datetime.utcnow()
+    db.session.execute(sentencia.on_conflict_do_update(index_elements=['usuario_id'], set_=cambios),
+                       [{**fila, 'actualizado': ahora} for fila in filas])
+
+
+def _sumar_fondo(**deltas):
+    _sumar_en(TotalesFondo, ('id', ID_TOTALES), version=1, **deltas)
+
+
+def primer_dia_mes(fecha):
+    return date(fecha.year, fecha.month, 1)
+
+
+def _sumar_mes(fecha, **deltas):
+    """Suma deltas a la fila del mes de 'fecha' en resumen_mensual."""
+    _sumar_en(ResumenMensual, ('mes', primer_dia_mes(fecha)), **deltas)
+
+
+def _sumar_meses(por_mes):
+    """por_mes: {fecha: {columna: delta}} (ej: un extracto con pagos de varios meses). Un UPSERT por mes."""
+    for mes, deltas in por_mes.items():
+        _sumar_mes(mes, **{col: round(valor, 2) for col, valor in deltas.items()})
+
+
+def refrescar_proxima_cuota(usuario_id):
+    """Vuelve a buscar la próxima cuota por cobrar del socio (consulta indexada de una fila)."""
+    invalidar_socios([usuario_id])
+    proxima = db.session.execute(
+        select(Cuota.id, Cuota.fecha_vencimiento, Cuota.monto_total, Cuota.estado)
+        .join(Prestamo, Cuota.prestamo_id == Prestamo.id)
+        .where(Prestamo.usuario_id == usuario_id, Prestamo.estado == 'Activo', Cuota.estado.in_(ESTADOS_POR_COBRAR))
+        .order_by(Cuota.fecha_vencimiento, Cuota.id)
+        .limit(1)
+    ).first()
+
+    db.session.execute(
+        update(ResumenUsuario)
+        .where(ResumenUsuario.usuario_id == usuario_id)
+        .values(
+            proxima_cuota_id=proxima.id if proxima else None,
+            proxima_cuota_fecha=proxima.fecha_vencimiento if proxima else None,
+            proxima_cuota_monto=proxima.monto_total if proxima else None,
+            proxima_cuota_estado=proxima.estado if proxima else None,
+            actualizado=datetime.utcnow()
+        )
+    )
+
+
+def registrar_cambio_aporte(aporte, estado_anterior):
+    """Llamar después de cambiar el estado de un aporte (aprobar/rechazar)."""
+    mes = aporte.fecha_confirmacion or aporte.fecha_registro
+    if aporte.estado == 'Aprobado' and estado_anterior != 'Aprobado':
+        _sumar(aporte.usuario_id, ahorro_total=aporte.monto)
+        _sumar_fondo(caja_ahorros=aporte.monto)
+        _sumar_mes(mes, aportes=aporte.monto, cantidad_aportes=1)
+    elif aporte.estado != 'Aprobado' and estado_anterior == 'Aprobado':
+        _sumar(aporte.usuario_id, ahorro_total=-aporte.monto)
+        _sumar_fondo(caja_ahorros=-aporte.monto)
+        _sumar_mes(mes, aportes=-aporte.monto, cantidad_aportes=-1)
+
+
+def registrar_aportes_aprobados(aportes, fecha_confirmacion=None):
+    """
+    Versión en bloque de registrar_cambio_aporte para aportes que pasan de Pendiente a Aprobado:
+    un solo UPSERT para todos los socios, uno para el fondo y uno por mes de confirmación.
+    aportes: filas con usuario_id y monto. Si traen fecha_confirmacion (ej: depósitos importados, que se
+    confirman con la fecha del banco) cada una cuenta en su mes; si no, todas en el de 'fecha_confirmacion'.
+    """
+    general = fecha_confirmacion or datetime.utcnow()
+    por_socio = defaultdict(float)
+    por_mes = defaultdict(lambda: defaultdict(float))
+    for aporte in aportes:
+        por_socio[aporte.usuario_id] += aporte.monto
+        mes = primer_dia_mes(getattr(aporte, 'fecha_confirmacion', None) or general)
+        por_mes[mes]['aportes'] += aporte.monto
+        por_mes[mes]['cantidad_aportes'] += 1
+
+    _sumar_por_socio([{'usuario_id': uid, 'ahorro_total': round(ahorro, 2)} for uid, ahorro in por_socio.items()])
+    _sumar_fondo(caja_ahorros=round(sum(por_socio.values()), 2))
+    _sumar_meses(por_mes)
+
+
+def registrar_prestamo_aprobado(prestamo, total_cuotas):
+    """Llamar después de aprobar un préstamo e insertar su plan. total_cuotas: suma de monto_total."""
+    _sumar(prestamo.usuario_id, deuda_pendiente=total_cuotas, prestamos_activos=1)
+    _sumar_fondo(desembolsado_bruto=prestamo.monto_solicitado)
+    _sumar_mes(prestamo.fecha_aprobacion or datetime.utcnow(), desembolsos=prestamo.monto_solicitado, prestamos_desembolsados=1)
+    refrescar_proxima_cuota(prestamo.usuario_id)
+
+
+def registrar_prestamos_aprobados(prestamos, totales_cuotas, fecha_aprobacion=None):
+    """
+    Versión en bloque de registrar_prestamo_aprobado para aprobaciones masivas:
+    agrupa por socio: un UPSERT para todos los socios, la próxima cuota de cada uno y una sentencia para el fondo.
+    prestamos: filas con usuario_id y monto_solicitado; totales_cuotas: suma de monto_total de cada uno.
+    """
+    por_socio = defaultdict(lambda: [0.0, 0])
+    for prestamo, total in zip(prestamos, totales_cuotas):
+        por_socio[prestamo.usuario_id][0] += total
+        por_socio[prestamo.usuario_id][1] += 1
+
+    _sumar_por_socio([{'usuario_id': uid, 'deuda_pendiente': round(deuda, 2), 'prestamos_activos': cantidad}
+                      for uid, (deuda, cantidad) in por_socio.items()])
+    for usuario_id in por_socio:
+        refrescar_proxima_cuota(usuario_id)
+    desembolsado = round(sum(p.monto_solicitado for p in prestamos), 2)
+    _sumar_fondo(desembolsado_bruto=desembolsado)
+    _sumar_mes(fecha_aprobacion or datetime.utcnow(), desembolsos=desembolsado, prestamos_desembolsados=len(prestamos))
+
+
+def registrar_pago_cuota(prestamo, cuota, estado_anterior, prestamo_finalizado):
+    """Llamar después de marcar una cuota como pagada."""
+    _sumar(prestamo.usuario_id,
+           deuda_pendiente=-cuota.monto_total,
+           cuotas_mora=-1 if estado_anterior == 'Mora' else 0,
+           prestamos_activos=-1 if prestamo_finalizado else 0)
+
+    # La cartera solo cuenta préstamos activos: al terminar de pagar, el préstamo sale
+    # del desembolsado y su capital (ya completo) sale de lo recuperado.
+    capital_finalizado = prestamo.monto_solicitado if prestamo_finalizado else 0
+    _sumar_fondo(capital_recuperado=(cuota.monto_capital or 0) - capital_finalizado,
+                 desembolsado_bruto=-capital_finalizado,
+                 intereses_recaudados=cuota.monto_interes or 0)
+
+    fecha_pago = cuota.fecha_pago or datetime.utcnow()
+    _sumar_mes(fecha_pago, capital_recuperado=cuota.monto_capital or 0, intereses_recaudados=cuota.monto_interes or 0, cuotas_pagadas=1)
+    if estado_anterior == 'Pendiente' and fecha_pago.date() > cuota.fecha_vencimiento:
+        # Pagada tarde sin haber pasado por el barrido de Mora: cuenta en la mora de su mes de vencimiento
+        _sumar_mes(cuota.fecha_vencimiento, mora=cuota.monto_total, cuotas_mora=1)
+    refrescar_proxima_cuota(prestamo.usuario_id)
+
+
+def registrar_pagos_en_bloque(usuario_ids, capital, intereses, prestamos_finalizados, por_mes=None):
+    """
+    Versión en bloque de registrar_pago_cuota (ej: conciliación de un extracto):
+    capital e intereses son la suma de las cuotas pagadas, prestamos_finalizados los IDs
+    que quedaron en 'Pagado'. El resumen de los socios afectados se recalcula completo.
+    por_mes: deltas de resumen_mensual por mes ({fecha: {columna: delta}}, ver _sumar_meses).
+    """
+    capital_finalizado = 0
+    if prestamos_finalizados:
+        capital_finalizado = db.session.execute(
+            select(func.coalesce(func.sum(Prestamo.monto_solicitado), 0)).where(Prestamo.id.in_(prestamos_finalizados))
+        ).scalar()
+    _sumar_fondo(capital_recuperado=round(capital - capital_finalizado, 2),
+                 desembolsado_bruto=-capital_finalizado,
+                 intereses_recaudados=round(intereses, 2))
+    _sumar_meses(por_mes or {})
+    recalcular_resumen_usuario(usuario_ids)
+
+
+def registrar_mora(cuotas):
+    """Llamar después de pasar cuotas a 'Mora'. cuotas: filas con fecha_vencimiento y monto_total."""
+    por_mes = defaultdict(lambda: {'mora': 0.0, 'cuotas_mora': 0})
+    for cuota in cuotas:
+        mes = por_mes[primer_dia_mes(cuota.fecha_vencimiento)]
+        mes['mora'] += cuota.monto_total
+        mes['cuotas_mora'] += 1
+    _sumar_meses(por_mes)
+    _sumar_fondo() # Solo sube la versión (las gráficas de tendencia cambian)
+
+
+def registrar_multas(montos, fecha_causacion):
+    """Llamar después de insertar multas causadas en 'fecha_causacion'. montos: lo causado en cada multa nueva."""
+    if montos:
+        _sumar_mes(fecha_causacion, multas=round(sum(montos), 2))
+        _sumar_fondo() # Solo sube la versión
+
+
+# =========================================================
+# RECÁLCULO DESDE CERO
+# =========================================================
+def consulta_resumenes(usuario_ids=None):
+    """
+    SELECT que calcula el resumen desde las tablas crudas (mismas columnas que COLUMNAS_RESUMEN).
+    usuario_ids: limitar a estos socios (None = todos).
+    """
+    ahorros = select(Aporte.usuario_id, func.sum(Aporte.monto).label('total')) \
+        .where(Aporte.estado == 'Aprobado').group_by(Aporte.usuario_id)
+
+    por_cobrar = select(
+        Prestamo.usuario_id,
+        func.sum(Cuota.monto_total).label('deuda'),
+        func.sum(case((Cuota.estado == 'Mora', 1), else_=0)).label('mora')
+    ).join(Cuota, Cuota.prestamo_id == Prestamo.id) \
+        .where(Prestamo.estado == 'Activo', Cuota.estado.in_(ESTADOS_POR_COBRAR)).group_by(Prestamo.usuario_id)
+
+    activos = select(Prestamo.usuario_id, func.count(Prestamo.id).label('activos')) \
+        .where(Prestamo.estado == 'Activo').group_by(Prestamo.usuario_id)
+
+    proximas = select(
+        Prestamo.usuario_id, Cuota.id, Cuota.fecha_vencimiento, Cuota.monto_total, Cuota.estado,
+        func.row_number().over(partition_by=Prestamo.usuario_id, order_by=(Cuota.fecha_vencimiento, Cuota.id)).label('orden')
+    ).join(Cuota, Cuota.prestamo_id == Prestamo.id) \
+        .where(Prestamo.estado == 'Activo', Cuota.estado.in_(ESTADOS_POR_COBRAR))
+
+    if usuario_ids is not None:
+        ahorros = ahorros.where(Aporte.usuario_id.in_(usuario_ids))
+        por_cobrar = por_cobrar.where(Prestamo.usuario_id.in_(usuario_ids))
+        activos = activos.where(Prestamo.usuario_id.in_(usuario_ids))
+        proximas = proximas.where(Prestamo.usuario_id.in_(usuario_ids))
+
+    ahorros, por_cobrar, activos, proximas = ahorros.subquery(), por_cobrar.subquery(), activos.subquery(), proximas.subquery()
+
+    consulta = select(
+        Usuario.id,
+        func.coalesce(ahorros.c.total, 0),
+        func.coalesce(por_cobrar.c.deuda, 0),
+        func.coalesce(por_cobrar.c.mora, 0),
+        func.coalesce(activos.c.activos, 0),
+        proximas.c.id, proximas.c.fecha_vencimiento, proximas.c.monto_total, proximas.c.estado
+    ).outerjoin(ahorros, ahorros.c.usuario_id == Usuario.id) \
+        .outerjoin(por_cobrar, por_cobrar.c.usuario_id == Usuario.id) \
+        .outerjoin(activos, activos.c.usuario_id == Usuario.id) \
+        .outerjoin(proximas, and_(proximas.c.usuario_id == Usuario.id, proximas.c.orden == 1))
+
+    if usuario_ids is not None:
+        consulta = consulta.where(Usuario.id.in_(usuario_ids))
+    return consulta
+
+
+def recalcular_resumen_usuario(usuario_ids):
+    """Recalcula desde cero el resumen de algunos socios (ej: después de una edición manual). Sin commit."""
+    usuario_ids = list(usuario_ids)
+    invalidar_socios(usuario_ids)
+    db.session.execute(delete(ResumenUsuario).where(ResumenUsuario.usuario_id.in_(usuario_ids)))
+    db.session.execute(insert(ResumenUsuario).from_select(COLUMNAS_RESUMEN, consulta_resumenes(usuario_ids)))
+
+
+def reconstruir_resumenes():
+    """Borra y recalcula la tabla completa en una sola transacción. Devuelve cuántas filas quedaron."""
+    invalidar_todos()
+    db.session.execute(delete(ResumenUsuario))
+    resultado = db.session.execute(insert(ResumenUsuario).from_select(COLUMNAS_RESUMEN, consulta_resumenes()))
+    db.session.commit()
+    return resultado.rowcount
+
+
+def verificar_resumenes():
+    """Compara la tabla contra un cálculo fresco. Devuelve lista de (usuario_id, guardado, esperado)."""
+    esperado = {fila[0]: tuple(fila) for fila in db.session.execute(consulta_resumenes())}
+    guardado = {
+        fila[0]: tuple(fila)
+        for fila in db.session.execute(select(*[getattr(ResumenUsuario, c) for c in COLUMNAS_RESUMEN]))
+    }
+    vacio = lambda uid: (uid, 0, 0, 0, 0, None, None, None, None)
+    diferencias = []
+    for usuario_id in sorted(set(esperado) | set(guardado)):
+        fila_guardada = guardado.get(usuario_id, vacio(usuario_id))
+        fila_esperada = esperado.get(usuario_id, vacio(usuario_id))
+        if fila_guardada != fila_esperada:
+            diferencias.append((usuario_id, fila_guardada, fila_esperada))
+    return diferencias
+
+
+# =========================================================
+# TOTALES DEL FONDO: RECÁLCULO Y CONCILIACIÓN
+# =========================================================
+def calcular_totales_crudos():
+    """Los cuatro agregados sobre las tablas crudas (lo que antes corría el Dashboard en cada visita)."""
+    caja = db.session.query(func.sum(Aporte.monto)).filter(Aporte.estado == 'Aprobado').scalar() or 0
+    desembolsado = db.session.query(func.sum(Prestamo.monto_solicitado)).filter(Prestamo.estado == 'Activo').scalar() or 0
+    recuperado = db.session.query(func.sum(Cuota.monto_capital)).join(Prestamo).filter(
+        Prestamo.estado == 'Activo',
+        Cuota.estado == 'Pagado'
+    ).scalar() or 0
+    intereses = db.session.query(func.sum(Cuota.monto_interes)).filter(Cuota.estado == 'Pagado').scalar() or 0
+    return dict(zip(COLUMNAS_TOTALES, [caja, desembolsado, recuperado, intereses]))
+
+
+def recalcular_totales_fondo():
+    """Reescribe la fila de totales con los agregados crudos. Sin commit."""
+    valores = calcular_totales_crudos()
+    sentencia = sqlite_insert(TotalesFondo).values(id=ID_TOTALES, version=1, actualizado=datetime.utcnow(), **valores)
+    db.session.execute(sentencia.on_conflict_do_update(
+        index_elements=['id'],
+        set_={**{col: getattr(sentencia.excluded, col) for col in COLUMNAS_TOTALES + ['actualizado']},
+              'version': TotalesFondo.version + 1}
+    ))
+
+
+def reconstruir_totales_fondo():
+    recalcular_totales_fondo()
+    db.session.commit()
+    return 1
+
+
+def conciliar_totales_fondo():
+    """Compara la fila de totales contra los agregados crudos. Devuelve {columna: (guardado, crudo)} con las diferencias."""
+    crudos = calcular_totales_crudos()
+    totales = obtener_totales_fondo()
+    diferencias = {}
+    for columna, valor_crudo in crudos.items():
+        guardado = getattr(totales, columna) if totales else 0
+        if round(guardado - valor_crudo, 2) != 0:
+            diferencias[columna] = (guardado, valor_crudo)
+    return diferencias
+
+
+# =========================================================
+# RESUMEN MENSUAL: RECÁLCULO Y VERIFICACIÓN
+# =========================================================
+def _rango_mes(mes):
+    """[inicio, fin) del mes como datetime (sirve para columnas Date y DateTime)."""
+    siguiente = date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+    return datetime(mes.year, mes.month, 1), datetime(siguiente.year, siguiente.month, 1)
+
+
+def consulta_resumen_mensual(meses=None):
+    """
+    SELECT que calcula resumen_mensual desde las tablas crudas en una pasada: un UNION ALL con un
+    renglón por movimiento (fecha y aporte a cada columna) y un solo GROUP BY por mes.
+    Las mismas reglas que los registrar_*: aportes por confirmación, desembolsos por aprobación,
+    pagos por fecha de pago, mora por vencimiento (cuotas en Mora o pagadas después de vencer),
+    multas por causación. meses: limitar a estos meses (primer día de cada uno; None = todos).
+    """
+    def parte(fecha, condicion, **valores):
+        columnas = [func.date(fecha, 'start of month').label('mes')]
+        columnas += [valores.get(col, literal(0)).label(col) for col in COLUMNAS_MENSUALES]
+        consulta = select(*columnas).where(condicion, fecha.isnot(None))
+        if meses is not None:
+            consulta = consulta.where(or_(*[and_(fecha >= inicio, fecha < fin) for inicio, fin in map(_rango_mes, meses)]))
+        return consulta
+
+    uno = literal(1)
+    movimientos = union_all(
+        parte(func.coalesce(Aporte.fecha_confirmacion, Aporte.fecha_registro), Aporte.estado == 'Aprobado',
+              aportes=Aporte.monto, cantidad_aportes=uno),
+        parte(func.coalesce(Prestamo.fecha_aprobacion, Prestamo.fecha_solicitud), Prestamo.estado.in_(ESTADOS_DESEMBOLSADOS),
+              desembolsos=Prestamo.monto_solicitado, prestamos_desembolsados=uno),
+        parte(Cuota.fecha_pago, Cuota.estado == 'Pagado',
+              capital_recuperado=func.coalesce(Cuota.monto_capital, 0), intereses_recaudados=func.coalesce(Cuota.monto_interes, 0),
+              cuotas_pagadas=uno),
+        parte(Cuota.fecha_vencimiento,
+              or_(Cuota.estado == 'Mora', and_(Cuota.estado == 'Pagado', func.date(Cuota.fecha_pago) > Cuota.fecha_vencimiento)),
+              mora=Cuota.monto_total, cuotas_mora=uno),
+        parte(Multa.fecha_causacion, Multa.monto.isnot(None), multas=Multa.monto),
+    ).subquery()
+
+    # type_: las sumas de dinero se leen como Dinero (centavos -> pesos), igual que la tabla
+    tipos = ResumenMensual.__table__.c
+    return select(movimientos.c.mes, *[func.sum(movimientos.c[col], type_=tipos[col].type) for col in COLUMNAS_MENSUALES]) \
+        .group_by(movimientos.c.mes).order_by(movimientos.c.mes)
+
+
+def recalcular_resumen_mensual(meses=None):
+    """Recalcula desde cero algunos meses (None = toda la tabla, ej: después de una edición manual). Sin commit."""
+    borrar = delete(ResumenMensual)
+    if meses is not None:
+        meses = sorted({primer_dia_mes(m) for m in meses})
+        if not meses:
+            return 0
+        borrar = borrar.where(ResumenMensual.mes.in_(meses))
+    db.session.execute(borrar)
+    resultado = db.session.execute(insert(ResumenMensual).from_select(['mes'] + COLUMNAS_MENSUALES, consulta_resumen_mensual(meses)))
+    _sumar_fondo() # Solo sube la versión
+    return resultado.rowcount
+
+
+def reconstruir_resumen_mensual():
+    """Backfill: borra y recalcula la tabla completa en una sola transacción. Devuelve cuántos meses quedaron."""
+    filas = recalcular_resumen_mensual()
+    db.session.commit()
+    return filas
+
+
+def verificar_resumen_mensual():
+    """Compara la tabla contra un cálculo fresco. Devuelve lista de (mes, guardado, esperado)."""
+    esperado = {date.fromisoformat(fila[0]): tuple(round(v or 0, 2) for v in fila[1:])
+                for fila in db.session.execute(consulta_resumen_mensual())}
+    guardado = {r.mes: tuple(round(getattr(r, col) or 0, 2) for col in COLUMNAS_MENSUALES)
+                for r in obtener_resumen_mensual()}
+    vacio = tuple(0 for _ in COLUMNAS_MENSUALES)
+    return [(mes, guardado.get(mes, vacio), esperado.get(mes, vacio))
+            for mes in sorted(set(esperado) | set(guardado))
+            if guardado.get(mes, vacio) != esperado.get(mes, vacio)]
@@ -0,0 +1,199 @@
+import os
+import socket
+import threading
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database.db import db
+from database.models import Cuota, Prestamo, Multa, EjecucionTarea, CandadoTarea
+from database.resumen import recalcular_resumen_usuario, registrar_mora, registrar_multas, ESTADOS_POR_COBRAR
+from utils.financiero import calcular_multas_mora
+from utils.config import PROGRAMADOR_TAREAS_ACTIVO, INTERVALO_TAREAS_MINUTOS
+
+# Tiempo máximo que una tarea puede retener el candado (si el proceso muere, se libera solo)
+DURACION_CANDADO = timedelta(minutes=10)
+
+
+# =========================================================
+# TAREAS
+# =========================================================
+def barrer_mora(hoy=None):
+    """
+    Marca como 'Mora' toda cuota Pendiente vencida con un solo UPDATE
+    (usa el índice ix_cuotas_cartera). Luego recalcula el resumen
+    de los socios afectados y suma la mora del mes de vencimiento. No hace commit. Devuelve cuántas cuotas cambiaron.
+    """
+    hoy = hoy or date.today()
+    cambiadas = db.session.execute(
+        update(Cuota)
+        .where(Cuota.estado == 'Pendiente', Cuota.fecha_vencimiento < hoy)
+        .values(estado='Mora')
+        .returning(Cuota.prestamo_id, Cuota.fecha_vencimiento, Cuota.monto_total)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    if cambiadas:
+        usuarios = db.session.execute(
+            select(Prestamo.usuario_id).where(Prestamo.id.in_({c.prestamo_id for c in cambiadas})).distinct()
+        ).scalars().all()
+        recalcular_resumen_usuario(usuarios)
+        registrar_mora(cambiadas)
+    return len(cambiadas)
+
+
+def causar_multas(fecha=None):
+    """
+    Causa la multa por mora de todas las cuotas vencidas y sin pagar hasta 'fecha'.
+    Una consulta trae las cuotas vencidas con lo ya causado, el cálculo es vectorizado
+    y todo se inserta en bloque (ON CONFLICT DO NOTHING sobre cuota+fecha: correrla dos
+    veces el mismo día no cobra doble). Lo ya causado suma todas las fechas, también las
+    posteriores a 'fecha': correrla para un día anterior no vuelve a cobrar.
+    No hace commit. Devuelve cuántas multas se crearon.
+    """
+    fecha = fecha or date.today()
+    causado = select(Multa.cuota_id, func.sum(Multa.monto).label('total')).group_by(Multa.cuota_id).subquery()
+
+    vencidas = db.session.execute(
+        select(Cuota.id, Prestamo.usuario_id, Cuota.fecha_vencimiento, Cuota.monto_total,
+               func.coalesce(causado.c.total, 0))
+        .join(Prestamo, Cuota.prestamo_id == Prestamo.id)
+        .outerjoin(causado, causado.c.cuota_id == Cuota.id)
+        .where(Cuota.estado.in_(ESTADOS_POR_COBRAR), Cuota.fecha_vencimiento < fecha)
+    ).all()
+    if not vencidas:
+        return 0
+
+    cuota_ids, usuario_ids, vencimientos, montos, ya_causado = zip(*vencidas)
+    dias_vencidos = (np.datetime64(fecha, 'D') - np.array(vencimientos, dtype='datetime64[D]')).astype(np.int64)
+    multas, dias = calcular_multas_mora(montos, dias_vencidos, ya_causado)
+
+    por_causar = np.flatnonzero(multas > 0)
+    if len(por_causar) == 0:
+        return 0
+    filas = [{
+        'cuota_id': cuota_ids[i],
+        'usuario_id': usuario_ids[i],
+        'fecha_causacion': fecha,
+        'dias_mora': int(dias[i]),
+        'monto': float(multas[i]),
+        'estado': 'Pendiente'
+    } for i in por_causar.tolist()]
+
+    # Sobre la conexión de la sesión (misma transacción); RETURNING: solo las que sí se insertaron
+    montos = db.session.connection().execute(
+        sqlite_insert(Multa.__table__).on_conflict_do_nothing(index_elements=['cuota_id', 'fecha_causacion'])
+        .returning(Multa.__table__.c.monto),
+        filas
+    ).scalars().all()
+    registrar_multas(montos, fecha)
+    return len(montos)
+
+
+# Tareas que corre el programador: nombre -> función (cada una devuelve filas modificadas)
+TAREAS = {
+    'mora': barrer_mora,
+    'multas': causar_multas,
+}
+
+
+# =========================================================
+# EJECUCIÓN CON CANDADO Y BITÁCORA
+# =========================================================
+def _identificador_proceso():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _tomar_candado(tarea):
+    """Intenta tomar el candado de la tarea (UPSERT condicional). True si este proceso lo obtuvo."""
+    ahora = datetime.utcnow()
+    sentencia = sqlite_insert(CandadoTarea).values(
+        tarea=tarea, bloqueado_hasta=ahora + DURACION_CANDADO, dueno=_identificador_proceso()
+    )
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=['tarea'],
+        set_={'bloqueado_hasta': sentencia.excluded.bloqueado_hasta, 'dueno': sentencia.excluded.dueno},
+        where=CandadoTarea.bloqueado_hasta < ahora
+    )
+    tomado = db.session.execute(sentencia).rowcount == 1
+    db.session.commit()
+    return tomado
+
+
+def _soltar_candado(tarea):
+    db.session.execute(
+        update(CandadoTarea)
+        .where(CandadoTarea.tarea == tarea, CandadoTarea.dueno == _identificador_proceso())
+        .values(bloqueado_hasta=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+def ultima_ejecucion(tarea):
+    return db.session.execute(
+        select(EjecucionTarea).where(EjecucionTarea.tarea == tarea).order_by(EjecucionTarea.inicio.desc()).limit(1)
+    ).scalar_one_or_none()
+
+
+def ejecutar_tarea(tarea, origen='cli', intervalo=None, **kwargs):
+    """
+    Corre una tarea de TAREAS en su propia transacción y deja registro en ejecuciones_tarea.
+    Si otro proceso la está corriendo, o si se pasa 'intervalo' y la última ejecución es más
+    reciente que eso, no hace nada y devuelve None. Si corre, devuelve la EjecucionTarea.
+    """
+    if not _tomar_candado(tarea):
+        return None
+    try:
+        anterior = ultima_ejecucion(tarea)
+        if intervalo and anterior and datetime.utcnow() - anterior.inicio < intervalo:
+            return None
+
+        inicio = datetime.utcnow()
+        reloj = time.perf_counter()
+        filas = TAREAS[tarea](**kwargs)
+        ejecucion = EjecucionTarea(
+            tarea=tarea, inicio=inicio, origen=origen,
+            duracion_ms=(time.perf_counter() - reloj) * 1000, filas=filas
+        )
+        db.session.add(ejecucion)
+        db.session.commit()
+        return ejecucion
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        _soltar_candado(tarea)
+
+
+# =========================================================
+# PROGRAMADOR DENTRO DEL PROCESO
+# =========================================================
+def _ciclo_programador(server, intervalo):
+    while True:
+        for tarea in TAREAS:
+            with server.app_context():
+                try:
+                    ejecucion = ejecutar_tarea(tarea, origen='programador', intervalo=intervalo)
+                    if ejecucion:
+                        print(f"⏱️ Tarea '{tarea}': {ejecucion.filas} filas en {ejecucion.duracion_ms:.1f} ms")
+                except Exception as e:
+                    print(f"⚠️ Tarea '{tarea}' falló: {e}")
+                finally:
+                    db.session.remove()
+        # Revisamos con más frecuencia que el intervalo; el candado y la bitácora evitan repeticiones
+        time.sleep(min(intervalo.total_seconds(), 300))
+
+
+def iniciar_programador(server):
+    """Arranca el hilo de tareas programadas (uno por proceso; el candado coordina entre workers)."""
+    if not PROGRAMADOR_TAREAS_ACTIVO:
+        return None
+    hilo = threading.Thread(
+        target=_ciclo_programador,
+        args=(server, timedelta(minutes=INTERVALO_TAREAS_MINUTOS)),
+        name="programador-tareas",
+        daemon=True
+    )
+    hilo.start()
+    return hilo
@@ -4,14 +4,26 @@ import dash_bootstrap_components as dbc
 
 # Importaciones del sistema
 from app import app, server
+from database.tareas import iniciar_programador
+from database.exportacion import registrar_rutas_exportacion
+from utils.metricas import registrar_rutas_metricas, medir_layout
+from utils.perfilador import registrar_perfilador
+from database.cache_socios import iniciar_cache_socios, estadisticas_cache_socios
+from components.cache_figuras import estadisticas_cache_figuras
 
 # Importamos TODAS las páginas (incluyendo la nueva admin_usuarios y perfil_usuario)
 from pages import (
     login, registro, home, prestamo, mis_prestamos, 
     mis_aportes, perfil_usuario,
-    admin_reportes, admin_pagos, admin_aportes, admin_usuarios,admin_prestamos
+    admin_reportes, admin_pagos, admin_aportes, admin_usuarios,admin_prestamos,
+    admin_conciliacion, admin_sql, admin_cartera
 )
 
+# Latencia de armar cada página (las que tienen layout como función), para /metrics
+for pagina in (home, prestamo, mis_prestamos, mis_aportes, perfil_usuario, admin_reportes, admin_pagos,
+               admin_aportes, admin_usuarios, admin_prestamos, admin_conciliacion, admin_sql, admin_cartera):
+    pagina.layout = medir_layout(pagina.__name__.rsplit('.', 1)[-1], pagina.layout)
+
 # Layout base (Contenedor principal)
 app.layout = html.Div([
     dcc.Location(id="url", refresh=True),
@@ -58,6 +70,9 @@ def display_page(pathname):
             if pathname == "/admin_prestamos": return admin_prestamos.layout() # <--- Tu nueva página
             if pathname == "/admin_pagos": return admin_pagos.layout()
             if pathname == "/admin_aportes": return admin_aportes.layout()
+            if pathname == "/admin_conciliacion": return admin_conciliacion.layout()
+            if pathname == "/admin_cartera": return admin_cartera.layout()
+            if pathname == "/admin_sql": return admin_sql.layout()
 
         # --- LÓGICA DE USUARIO ESTÁNDAR ---
         else:
@@ -82,6 +97,23 @@ def display_page(pathname):
     # 4. SI NO ESTÁ AUTENTICADO Y QUIERE ENTRAR A OTRA COSA -> LOGIN
     return login.layout
 
+# Tareas programadas (barrido de Mora) en segundo plano
+iniciar_programador(server)
+
+# Descargas para el contador: /admin/exportar/<tabla>.<csv|parquet>
+registrar_rutas_exportacion(server)
+
+# Monitoreo: /metrics (Prometheus) y /healthz (balanceador)
+registrar_rutas_metricas(server, caches={'simulaciones': prestamo.estadisticas_cache_simulacion,
+                                          'paginas_socio': estadisticas_cache_socios,
+                                          'figuras_dashboard': estadisticas_cache_figuras})
+
+# Caché por socio de home, mis_aportes y mis_prestamos (instance/cache_socios.db)
+iniciar_cache_socios(server)
+
+# Perfilador por muestreo que se arma desde /admin_sql (perfiles en instance/perfiles/)
+registrar_perfilador(server)
+
 if __name__ == "__main__":
     # IMPORTANTE: host='0.0.0.0' abre las puertas a la red
     app.run(host='0.0.0.0', port=8050, debug=False)
\ No newline at end of file
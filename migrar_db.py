@@ -0,0 +1,15 @@
+# Actualiza una base de datos existente (instance/fondo.db) al esquema actual sin recrearla.
+# Uso: python migrar_db.py              -> aplica migraciones pendientes
+#      python migrar_db.py --verificar  -> revisa con EXPLAIN que cada consulta de las páginas use índice
+#                                          (sobre el esquema de los modelos; con --bd revisa instance/fondo.db)
+import sys
+from app import server, db
+from database.migraciones import aplicar_migraciones, verificar_indices
+
+with server.app_context():
+    if '--verificar' in sys.argv:
+        fallas = verificar_indices(db.engine if '--bd' in sys.argv else None)
+        sys.exit(1 if fallas else 0)
+
+    aplicar_migraciones(db.engine)
+    print("✅ Migraciones aplicadas.")
@@ -1,35 +1,44 @@
+import base64
 import dash
-from dash import dcc, html, Input, Output, State, callback, dash_table
+from dash import dcc, html, Input, Output, State, callback
 import dash_bootstrap_components as dbc
+from sqlalchemy import select
 from database.models import Usuario, Aporte
-from database.db import db
+from database.operaciones import aprobar_aportes, rechazar_aportes
 from components.navbar import crear_navbar
-from datetime import datetime
+from components.reporte_lote import crear_reporte_lote
+from database.importacion import importar_aportes, abrir_archivo
+from components.tabla_servidor import ColumnaServidor, crear_tabla_servidor, registrar_tabla_servidor, id_version
 
-# --- FUNCION PARA CARGAR DATOS ---
-def cargar_aportes_pendientes():
-    # Hacemos un JOIN implícito para obtener el nombre del usuario
-    # Buscamos solo los que dicen 'Pendiente'
-    pendientes = db.session.query(Aporte, Usuario).join(Usuario, Aporte.usuario_id == Usuario.id).filter(Aporte.estado == 'Pendiente').all()
-    
-    data = []
-    for aporte, usuario in pendientes:
-        data.append({
-            'ID': aporte.id,
-            'Usuario': usuario.nombre_completo,
-            'Fecha': aporte.fecha_registro.strftime('%Y-%m-%d'),
-            'Tipo': aporte.tipo,
-            'Monto': aporte.monto, # Mantenemos numero para ordenar
-            'Monto ($)': f"${aporte.monto:,.0f}", # Texto bonito
-            'Nota': aporte.notas
-        })
-    return data
+# --- TABLA DE PENDIENTES (paginada, ordenada y filtrada en el servidor) ---
+COLUMNAS_PENDIENTES = [
+    ColumnaServidor('ID', 'ID', Aporte.id, 'numero'),
+    ColumnaServidor('Usuario', 'Usuario', Usuario.nombre_completo, 'texto'),
+    ColumnaServidor('Fecha', 'Fecha', Aporte.fecha_registro, 'fecha'),
+    ColumnaServidor('Tipo', 'Tipo', Aporte.tipo, 'texto'),
+    ColumnaServidor('Monto ($)', 'Monto', Aporte.monto, 'numero'),
+    ColumnaServidor('Nota', 'Nota', Aporte.notas, 'texto'),
+]
+
+def consultar_aportes_pendientes():
+    # Solo los que dicen 'Pendiente' (índice por estado) con el nombre del socio
+    return (select(Aporte.fecha_registro, Aporte.tipo, Aporte.monto, Aporte.notas, Usuario.nombre_completo)
+            .join_from(Aporte, Usuario, Aporte.usuario_id == Usuario.id)
+            .where(Aporte.estado == 'Pendiente'))
+
+def fila_aporte(r):
+    return {
+        'ID': r._llave,
+        'Usuario': r.nombre_completo,
+        'Fecha': r.fecha_registro.strftime('%Y-%m-%d'),
+        'Tipo': r.tipo,
+        'Monto': r.monto, # Mantenemos numero para ordenar
+        'Monto ($)': f"${r.monto:,.0f}", # Texto bonito
+        'Nota': r.notas
+    }
 
 # --- LAYOUT DINÁMICO ---
 def layout():
-    # Cargamos los datos al abrir la página
-    data_inicial = cargar_aportes_pendientes()
-
     return html.Div([
         crear_navbar(),
         dbc.Container([
@@ -40,49 +49,60 @@ def layout():
                     dbc.Card([
                         dbc.CardHeader("Solicitudes de Aporte Pendientes"),
                         dbc.CardBody([
-                            html.P("Selecciona una fila para aprobar o rechazar el ingreso del dinero.", className="text-muted"),
+                            html.P("Selecciona una o varias filas para aprobar o rechazar el ingreso del dinero.", className="text-muted"),
                             
-                            dash_table.DataTable(
-                                id='tabla-aportes-pendientes',
-                                columns=[
-                                    {'name': 'ID', 'id': 'ID'},
-                                    {'name': 'Usuario', 'id': 'Usuario'},
-                                    {'name': 'Fecha', 'id': 'Fecha'},
-                                    {'name': 'Tipo', 'id': 'Tipo'},
-                                    {'name': 'Monto', 'id': 'Monto ($)'},
-                                    {'name': 'Nota', 'id': 'Nota'},
-                                ],
-                                data=data_inicial,
-                                row_selectable='single', # Solo uno a la vez para evitar errores
+                            crear_tabla_servidor(
+                                'tabla-aportes-pendientes', COLUMNAS_PENDIENTES, page_size=10,
+                                row_selectable='multi', # Varios a la vez (se procesan en una sola transacción)
+                                selected_rows=[],
                                 style_table={'overflowX': 'auto'},
                                 style_cell={'textAlign': 'center', 'padding': '10px'},
-                                style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'},
-                                page_size=10
+                                style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'}
                             ),
                             
                             html.Div([
-                                dbc.Button("✅ Aprobar Ingreso", id="btn-aprobar-aporte", color="success", className="me-3"),
-                                dbc.Button("❌ Rechazar", id="btn-rechazar-aporte", color="danger")
+                                dbc.Button("✅ Aprobar Seleccionados", id="btn-aprobar-aporte", color="success", className="me-3"),
+                                dbc.Button("❌ Rechazar Seleccionados", id="btn-rechazar-aporte", color="danger")
                             ], className="mt-3 d-flex justify-content-end"),
                             
                             html.Div(id="msg-admin-aporte", className="mt-3")
                         ])
                     ], className="shadow")
                 ], width=12)
-            ])
+            ]),
+            
+            dbc.Card([
+                dbc.CardHeader("Importar Aportes del Banco (CSV o Excel)"),
+                dbc.CardBody([
+                    html.P("Columnas: socio (usuario, correo, teléfono o nombre), fecha, valor y referencia (opcional: tipo). "
+                           "Se guardan como aprobados. Subir dos veces el mismo archivo no duplica nada, y si el socio "
+                           "ya había reportado el aporte, se aprueba el suyo.", className="text-muted"),
+                    dcc.Upload(
+                        id="upload-aportes",
+                        children=html.Div(["Arrastra el archivo aquí o ", html.A("selecciónalo")]),
+                        accept=".csv,.txt,.xlsx",
+                        className="border border-2 rounded text-center p-4",
+                        style={'borderStyle': 'dashed', 'cursor': 'pointer'}
+                    ),
+                    dcc.Loading(html.Div(id="msg-importar-aportes", className="mt-3"))
+                ])
+            ], className="shadow mt-4")
         ])
     ])
 
 # --- CALLBACKS ---
+registrar_tabla_servidor('tabla-aportes-pendientes', consultar_aportes_pendientes, COLUMNAS_PENDIENTES, Aporte.id, fila_aporte)
+
 @callback(
     [Output("msg-admin-aporte", "children"), 
-     Output("tabla-aportes-pendientes", "data")], # Actualizamos la tabla después de la acción
+     Output(id_version("tabla-aportes-pendientes"), "data")], # Recarga la página de la tabla (y limpia la selección)
     [Input("btn-aprobar-aporte", "n_clicks"),
      Input("btn-rechazar-aporte", "n_clicks")],
     [State("tabla-aportes-pendientes", "selected_rows"),
-     State("tabla-aportes-pendientes", "data")]
+     State("tabla-aportes-pendientes", "data"),
+     State(id_version("tabla-aportes-pendientes"), "data")]
 )
-def gestionar_aporte(btn_aprob, btn_rech, selected_rows, data):
+def gestionar_aporte(btn_aprob, btn_rech, selected_rows, data, version):
     ctx = dash.callback_context
     if not ctx.triggered or not selected_rows:
         return dash.no_update, dash.no_update
@@ -90,28 +110,54 @@ def gestionar_aporte(btn_aprob, btn_rech, selected_rows, data):
     # Identificar qué botón se oprimió
     button_id = ctx.triggered[0]['prop_id'].split('.')[0]
     
-    # Obtener ID del aporte seleccionado
-    row_idx = selected_rows[0]
-    aporte_id = data[row_idx]['ID']
+    # IDs de todas las filas seleccionadas
+    seleccion = [data[i] for i in selected_rows]
+    aporte_ids = [fila['ID'] for fila in seleccion]
+    etiquetas = {fila['ID']: f"{fila['Usuario']} {fila['Monto ($)']}" for fila in seleccion}
     
     try:
-        aporte = Aporte.query.get(aporte_id)
-        
+        # Todo el lote en un solo UPDATE y un solo commit (incluye el resumen de cada socio)
         if button_id == "btn-aprobar-aporte":
-            aporte.estado = 'Aprobado'
-            aporte.fecha_confirmacion = datetime.utcnow()
-            mensaje = dbc.Alert(f"Aporte de {aporte.monto:,.0f} aprobado exitosamente.", color="success")
+            mensaje = crear_reporte_lote(aprobar_aportes(aporte_ids), "Aprobado", etiquetas)
             
         elif button_id == "btn-rechazar-aporte":
-            aporte.estado = 'Rechazado'
-            mensaje = dbc.Alert("Aporte rechazado.", color="warning")
-            
-        db.session.commit()
+            mensaje = crear_reporte_lote(rechazar_aportes(aporte_ids), "Rechazado", etiquetas)
         
-        # Recargar la tabla para que desaparezca el procesado
-        nueva_data = cargar_aportes_pendientes()
-        return mensaje, nueva_data
+        # Recargar la tabla una sola vez para que desaparezcan los procesados
+        return mensaje, (version or 0) + 1
 
     except Exception as e:
-        db.session.rollback()
-        return dbc.Alert(f"Error: {str(e)}", color="danger"), dash.no_update
\ No newline at end of file
+        return dbc.Alert(f"Error: {str(e)}", color="danger"), dash.no_update
+
+
+@callback(
+    [Output("msg-importar-aportes", "children"), Output(id_version("tabla-aportes-pendientes"), "data", allow_duplicate=True)],
+    Input("upload-aportes", "contents"),
+    State("upload-aportes", "filename"),
+    State(id_version("tabla-aportes-pendientes"), "data"),
+    prevent_initial_call=True
+)
+def importar_archivo_aportes(contents, filename, version):
+    if not contents:
+        return dash.no_update, dash.no_update
+    
+    try:
+        contenido = base64.b64decode(contents.split(',', 1)[1])
+        r = importar_aportes(abrir_archivo(contenido, filename))
+    except Exception as e:
+        return dbc.Alert(f"No se pudo importar {filename}: {str(e)}", color="danger"), dash.no_update
+    
+    detalle = [
+        html.Li(f"✅ {r.creados} aportes nuevos aprobados"),
+        html.Li(f"🔗 {r.pendientes_aprobados} aportes que los socios ya habían reportado, ahora aprobados"),
+        html.Li(f"↩️ {r.repetidos} filas ya importadas antes (ignoradas)"),
+    ]
+    if r.rechazadas:
+        detalle.append(html.Li(f"❌ {r.rechazadas} filas con errores: " +
+                               "; ".join(f"fila {n} ({socio or 'sin socio'}): {motivo}" for n, socio, motivo in r.errores[:10])))
+    msg = dbc.Alert([
+        html.Strong(f"{filename}: {r.filas} filas en {r.duracion_ms:,.0f} ms"),
+        html.Ul(detalle, className="mb-0 mt-2")
+    ], color="success" if not r.rechazadas else "warning")
+    # Los pendientes que se aprobaron salen de la tabla
+    return msg, (version or 0) + 1
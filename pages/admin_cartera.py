@@ -0,0 +1,142 @@
+from datetime import date
+from dash import html, dcc, Input, Output, callback, dash_table
+from dash.dash_table.Format import Format, Group, Scheme, Symbol
+import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
+from database.queries import TRAMOS_CARTERA, antiguedad_cartera, cuotas_por_cobrar
+from components.navbar import crear_navbar
+
+COLORES_TRAMOS = ['#198754', '#ffc107', '#fd7e14', '#dc3545', '#6f1d1b']
+FORMATO_PESOS = Format(precision=0, scheme=Scheme.fixed, group=Group.yes, symbol=Symbol.yes)
+
+# --- CÁLCULOS (sobre las filas por socio: una sola consulta a la base) ---
+def tramo_de(dias_atraso):
+    """Etiqueta del tramo de TRAMOS_CARTERA en que cae una cuota con esos días de atraso."""
+    for _, etiqueta, desde, hasta in TRAMOS_CARTERA:
+        if (desde is None or dias_atraso >= desde) and (hasta is None or dias_atraso <= hasta):
+            return etiqueta
+
+def filas_tabla(socios, hoy):
+    return [{
+        'id': s.usuario_id,
+        'Socio': s.nombre_completo,
+        'Usuario': s.username,
+        **{etiqueta: getattr(s, columna) for columna, etiqueta, _, _ in TRAMOS_CARTERA},
+        'Total': s.total,
+        'Cuotas vencidas': s.cuotas_vencidas,
+        'Días de atraso': max((hoy - s.vencimiento_mas_antiguo).days, 0),
+    } for s in socios]
+
+def crear_tarjetas(socios):
+    tarjetas = []
+    for (columna, etiqueta, _, _), color in zip(TRAMOS_CARTERA, COLORES_TRAMOS):
+        monto = sum(getattr(s, columna) for s in socios)
+        cantidad = sum(1 for s in socios if getattr(s, columna))
+        tarjetas.append(dbc.Col(dbc.Card(dbc.CardBody([
+            html.H6(etiqueta, className="text-muted"),
+            html.H4(f"${monto:,.0f}", style={'color': color}),
+            html.Small(f"{cantidad} socio(s)", className="text-muted")
+        ]), className="shadow-sm border-0 text-center"), md=True))
+    return dbc.Row(tarjetas, className="mb-4 g-3")
+
+def figura_tramos(socios):
+    etiquetas = [etiqueta for _, etiqueta, _, _ in TRAMOS_CARTERA]
+    montos = [sum(getattr(s, columna) for s in socios) for columna, _, _, _ in TRAMOS_CARTERA]
+    figura = go.Figure(go.Bar(x=etiquetas, y=montos, marker_color=COLORES_TRAMOS,
+                              hovertemplate="%{x}: $%{y:,.0f}<extra></extra>"))
+    figura.update_layout(title="Deuda por días de atraso", yaxis_tickprefix="$", margin=dict(t=50, b=20, l=20, r=20))
+    return figura
+
+# --- LAYOUT ---
+def layout():
+    hoy = date.today()
+    socios = antiguedad_cartera(hoy)
+    columnas_dinero = [etiqueta for _, etiqueta, _, _ in TRAMOS_CARTERA] + ['Total']
+
+    return html.Div([
+        crear_navbar(),
+        dbc.Container([
+            html.H2("⏳ Antigüedad de la Cartera", className="mb-2 text-danger"),
+            html.P(f"Cuotas por cobrar de préstamos activos según sus días de atraso al {hoy:%Y-%m-%d}.", className="text-muted mb-4"),
+
+            crear_tarjetas(socios),
+
+            dbc.Row([
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardHeader("Deuda por socio (la más vieja primero)"),
+                        dbc.CardBody([
+                            dash_table.DataTable(
+                                id='tabla-cartera',
+                                columns=[{'name': 'Socio', 'id': 'Socio'}, {'name': 'Usuario', 'id': 'Usuario'}]
+                                        + [{'name': c, 'id': c, 'type': 'numeric', 'format': FORMATO_PESOS} for c in columnas_dinero]
+                                        + [{'name': c, 'id': c, 'type': 'numeric'} for c in ['Cuotas vencidas', 'Días de atraso']],
+                                data=filas_tabla(socios, hoy),
+                                row_selectable='single',
+                                sort_action='native',
+                                filter_action='native',
+                                style_table={'overflowX': 'auto'},
+                                style_cell={'textAlign': 'center', 'padding': '6px'},
+                                style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'},
+                                style_data_conditional=[{
+                                    'if': {'filter_query': '{Días de atraso} > 90'},
+                                    'backgroundColor': '#f8d7da'
+                                }],
+                                page_size=15
+                            ),
+                            html.Div("No hay cuotas por cobrar en préstamos activos." if not socios else "",
+                                     className="text-muted text-center mt-2")
+                        ])
+                    ], className="shadow-sm h-100")
+                ], width=12, lg=8),
+
+                dbc.Col([
+                    dbc.Card(dbc.CardBody(dcc.Graph(figure=figura_tramos(socios))), className="shadow-sm h-100")
+                ], width=12, lg=4),
+            ], className="mb-4"),
+
+            dbc.Card([
+                dbc.CardHeader("🔍 Detalle del socio"),
+                dbc.CardBody(html.Div(id="detalle-cartera-socio"))
+            ], className="shadow-sm")
+        ], fluid=True, className="py-3")
+    ])
+
+# --- CALLBACKS ---
+@callback(
+    Output("detalle-cartera-socio", "children"),
+    Input("tabla-cartera", "selected_row_ids")
+)
+def mostrar_detalle_socio(seleccion):
+    if not seleccion:
+        return html.Div("Selecciona un socio en la tabla para ver sus cuotas.", className="text-center text-muted")
+
+    # Las cuotas por cobrar del socio (la misma consulta de Registrar Pagos)
+    hoy = date.today()
+    cuotas = cuotas_por_cobrar(seleccion[0])
+    if not cuotas:
+        return html.Div("El socio ya no tiene cuotas por cobrar.", className="text-center text-muted")
+
+    data = []
+    for c in cuotas:
+        dias = (hoy - c.fecha_vencimiento).days
+        data.append({
+            'Préstamo #': c.prestamo_id,
+            'Cuota #': c.numero_cuota,
+            'Vence': c.fecha_vencimiento,
+            'Días de atraso': max(dias, 0),
+            'Tramo': tramo_de(dias),
+            'Valor Total': c.monto_total,
+            'Estado': c.estado
+        })
+
+    return dash_table.DataTable(
+        columns=[{'name': i, 'id': i} for i in ['Préstamo #', 'Cuota #', 'Vence', 'Días de atraso', 'Tramo']]
+                + [{'name': 'Valor Total', 'id': 'Valor Total', 'type': 'numeric', 'format': FORMATO_PESOS},
+                   {'name': 'Estado', 'id': 'Estado'}],
+        data=data,
+        style_table={'overflowX': 'auto'},
+        style_cell={'textAlign': 'center'},
+        style_data_conditional=[{'if': {'filter_query': '{Estado} = "Mora"'}, 'color': '#dc3545', 'fontWeight': 'bold'}],
+        page_size=12
+    )
@@ -0,0 +1,119 @@
+import base64
+import io
+import dash
+from dash import dcc, html, Input, Output, State, callback, dash_table
+import dash_bootstrap_components as dbc
+from database.conciliacion import conciliar_extracto, movimientos_por_revisar, cerrar_movimientos
+from components.navbar import crear_navbar
+
+# --- CARGAR COLA DE REVISIÓN ---
+def cargar_por_revisar():
+    data = []
+    for movimiento, nombre in movimientos_por_revisar():
+        data.append({
+            'ID': movimiento.id,
+            'Fecha': movimiento.fecha.strftime('%Y-%m-%d'),
+            'Valor': f"${movimiento.monto:,.2f}",
+            'Referencia': movimiento.referencia,
+            'Socio': nombre or '—',
+            'Motivo': movimiento.motivo
+        })
+    return data
+
+def layout():
+    return html.Div([
+        crear_navbar(),
+        dbc.Container([
+            html.H2("🏦 Conciliación Bancaria", className="mb-4 text-primary"),
+            
+            dbc.Card([
+                dbc.CardHeader("1. Cargar Extracto (CSV)"),
+                dbc.CardBody([
+                    html.P("Columnas requeridas: fecha, valor (o monto/crédito) y referencia (o descripción). "
+                           "Cada abono se cruza con la cuota pendiente más antigua del socio por el mismo valor.",
+                           className="text-muted"),
+                    dcc.Upload(
+                        id="upload-extracto",
+                        children=html.Div(["Arrastra el archivo aquí o ", html.A("selecciónalo")]),
+                        accept=".csv,.txt",
+                        className="border border-2 rounded text-center p-4",
+                        style={'borderStyle': 'dashed', 'cursor': 'pointer'}
+                    ),
+                    dcc.Loading(html.Div(id="msg-extracto", className="mt-3"))
+                ])
+            ], className="shadow mb-4"),
+            
+            dbc.Card([
+                dbc.CardHeader("2. Movimientos por Revisar"),
+                dbc.CardBody([
+                    html.P("Abonos que no se pudieron asociar a una cuota. Registra el pago a mano en "
+                           "'Registrar Pagos' y márcalo como resuelto, o descártalo si no es un pago del fondo.",
+                           className="text-muted"),
+                    dash_table.DataTable(
+                        id='tabla-por-revisar',
+                        columns=[{'name': i, 'id': i} for i in ['ID', 'Fecha', 'Valor', 'Referencia', 'Socio', 'Motivo']],
+                        data=cargar_por_revisar(),
+                        row_selectable='multi',
+                        selected_rows=[],
+                        style_table={'overflowX': 'auto'},
+                        style_cell={'textAlign': 'left', 'padding': '8px'},
+                        style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'},
+                        page_size=15
+                    ),
+                    html.Div([
+                        dbc.Button("✅ Marcar Resueltos", id="btn-resolver-movimiento", color="success", className="me-3"),
+                        dbc.Button("🗑️ Descartar", id="btn-descartar-movimiento", color="secondary")
+                    ], className="mt-3 d-flex justify-content-end"),
+                    html.Div(id="msg-revision", className="mt-3")
+                ])
+            ], className="shadow")
+        ])
+    ])
+
+# --- CALLBACKS ---
+@callback(
+    [Output("msg-extracto", "children"), Output("tabla-por-revisar", "data", allow_duplicate=True)],
+    Input("upload-extracto", "contents"),
+    State("upload-extracto", "filename"),
+    prevent_initial_call=True
+)
+def cargar_extracto(contents, filename):
+    if not contents:
+        return dash.no_update, dash.no_update
+    
+    crudo = base64.b64decode(contents.split(',', 1)[1])
+    try:
+        texto = crudo.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        texto = crudo.decode('latin-1') # Exportaciones de bancos en Excel viejo
+    
+    try:
+        r = conciliar_extracto(io.StringIO(texto, newline=''))
+    except Exception as e:
+        return dbc.Alert(f"No se pudo procesar {filename}: {str(e)}", color="danger"), dash.no_update
+    
+    msg = dbc.Alert([
+        html.Strong(f"{filename}: {r.lineas} abonos leídos en {r.duracion_ms:,.0f} ms"),
+        html.Ul([
+            html.Li(f"✅ {r.conciliadas} cuotas pagadas ({r.prestamos_finalizados} préstamos finalizados)"),
+            html.Li(f"🔎 {r.por_revisar} movimientos enviados a revisión"),
+            html.Li(f"↩️ {r.repetidas} líneas ya cargadas antes (ignoradas)"),
+        ], className="mb-0 mt-2")
+    ], color="success" if not r.por_revisar else "warning")
+    return msg, cargar_por_revisar()
+
+@callback(
+    [Output("msg-revision", "children"), Output("tabla-por-revisar", "data"), Output("tabla-por-revisar", "selected_rows")],
+    [Input("btn-resolver-movimiento", "n_clicks"), Input("btn-descartar-movimiento", "n_clicks")],
+    [State("tabla-por-revisar", "selected_rows"), State("tabla-por-revisar", "data")],
+    prevent_initial_call=True
+)
+def revisar_movimientos(btn_resolver, btn_descartar, selected, data):
+    ctx = dash.callback_context
+    if not ctx.triggered or not selected:
+        return dash.no_update, dash.no_update, dash.no_update
+    
+    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
+    estado = 'Resuelto' if button_id == "btn-resolver-movimiento" else 'Descartado'
+    cambiados = cerrar_movimientos([data[i]['ID'] for i in selected], estado)
+    return dbc.Alert(f"{cambiados} movimientos marcados como {estado.lower()}s.", color="info"), cargar_por_revisar(), []
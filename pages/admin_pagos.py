@@ -1,22 +1,15 @@
 import dash
 from dash import dcc, html, Input, Output, State, callback, dash_table
 import dash_bootstrap_components as dbc
-from database.models import Usuario, Prestamo, Cuota
 from database.db import db
+from database.resumen import registrar_pago_cuota
+from database.queries import cuotas_por_cobrar, cuota_con_prestamo, cuotas_por_cobrar_del_prestamo
 from components.navbar import crear_navbar
+from components.buscador_socios import crear_buscador_socios, registrar_buscador_socios
 from datetime import datetime
 
 # --- LAYOUT DINÁMICO ---
 def layout():
-    # Buscar usuarios que tengan al menos un préstamo ACTIVO
-    usuarios = Usuario.query.all()
-    opciones_usuarios = []
-    
-    for u in usuarios:
-        tiene_activos = any(p.estado == 'Activo' for p in u.prestamos)
-        if tiene_activos:
-            opciones_usuarios.append({'label': u.nombre_completo, 'value': u.id})
-
     # Definimos las columnas fijas de una vez
     columnas_tabla = [{"name": i, "id": i} for i in ['ID Cuota', 'Préstamo #', 'Cuota #', 'Vence', 'Valor Total', 'Estado']]
 
@@ -31,10 +24,10 @@ def layout():
                         dbc.CardHeader("1. Seleccionar Deudor"),
                         dbc.CardBody([
                             dbc.Label("Buscar Usuario:"),
-                            dcc.Dropdown(
-                                id="filtro-usuario-pago",
-                                options=opciones_usuarios,
-                                placeholder="Selecciona un usuario...",
+                            # Solo socios con préstamos activos; las opciones llegan mientras se escribe
+                            crear_buscador_socios(
+                                "filtro-usuario-pago",
+                                placeholder="Escribe el nombre del deudor...",
                                 className="mb-3"
                             ),
                         ])
@@ -74,6 +67,7 @@ def layout():
     ])
 
 # --- CALLBACKS ---
+registrar_buscador_socios("filtro-usuario-pago", solo_con_prestamos=True)
 
 # 1. Cargar datos EN la tabla existente (Ya no creamos la tabla, solo inyectamos DATA)
 @callback(
@@ -86,21 +80,11 @@ def cargar_deuda_usuario(usuario_id):
     if not usuario_id:
         return [], "Selecciona un usuario arriba.", True
     
-    # Buscar préstamos activos del usuario
-    prestamos = Prestamo.query.filter_by(usuario_id=usuario_id, estado='Activo').all()
-    ids_prestamos = [p.id for p in prestamos]
-    
-    if not ids_prestamos:
-        return [], "Este usuario no tiene préstamos activos.", True
-    
-    # Buscar cuotas pendientes
-    cuotas = Cuota.query.filter(
-        Cuota.prestamo_id.in_(ids_prestamos),
-        Cuota.estado.in_(['Pendiente', 'Mora'])
-    ).order_by(Cuota.fecha_vencimiento).all()
+    # Cuotas pendientes de sus préstamos activos (una sola consulta con JOIN)
+    cuotas = cuotas_por_cobrar(usuario_id)
     
     if not cuotas:
-        return [], "¡El usuario está al día! No hay cuotas pendientes.", True
+        return [], "¡El usuario está al día! No tiene cuotas pendientes en préstamos activos.", True
 
     # Crear data para la tabla
     data = []
@@ -134,24 +118,26 @@ def registrar_pago(n_clicks, selected_rows, data):
     
     try:
         # 1. Marcar cuota como pagada
-        cuota = Cuota.query.get(cuota_id)
+        cuota = cuota_con_prestamo(cuota_id) # Trae también su préstamo
         if not cuota:
              return dbc.Alert("Error: Cuota no encontrada.", color="danger"), dash.no_update
              
+        estado_anterior = cuota.estado
         cuota.estado = 'Pagado'
         cuota.fecha_pago = datetime.utcnow()
         
-        db.session.commit()
-        
-        # 2. Verificar si el préstamo se terminó de pagar
-        prestamo = Prestamo.query.get(cuota.prestamo_id)
-        cuotas_pendientes = Cuota.query.filter_by(prestamo_id=prestamo.id, estado='Pendiente').count()
+        # 2. Verificar si el préstamo se terminó de pagar (las cuotas en Mora también cuentan como deuda)
+        prestamo = cuota.prestamo
+        cuotas_pendientes = cuotas_por_cobrar_del_prestamo(prestamo.id)
         
         msg_extra = ""
         if cuotas_pendientes == 0:
             prestamo.estado = 'Pagado'
-            db.session.commit()
             msg_extra = " ¡PRÉSTAMO FINALIZADO! 🥳"
+        
+        # 3. Resumen del socio y un solo commit para todo el pago
+        registrar_pago_cuota(prestamo, cuota, estado_anterior, prestamo_finalizado=cuotas_pendientes == 0)
+        db.session.commit()
 
         # Retornamos alerta y NULL en el dropdown para resetear la vista
         return dbc.Alert(f"Pago de ${cuota.monto_total:,.2f} registrado.{msg_extra}", color="success"), None
@@ -1,33 +1,41 @@
 import dash
-from dash import dcc, html, Input, Output, State, callback, dash_table
+from dash import dcc, html, Input, Output, State, callback
 import dash_bootstrap_components as dbc
-from database.models import Usuario, Prestamo, Cuota
-from database.db import db
+from sqlalchemy import select
+from database.models import Usuario, Prestamo
+from database.operaciones import aprobar_prestamos, rechazar_prestamos
 from components.navbar import crear_navbar
-from utils.financiero import calcular_plan_pagos # Importamos tu fórmula financiera
-from datetime import datetime
+from components.reporte_lote import crear_reporte_lote
+from components.tabla_servidor import ColumnaServidor, crear_tabla_servidor, registrar_tabla_servidor, id_version
 
-# --- CARGAR SOLICITUDES PENDIENTES ---
-def cargar_solicitudes():
-    # Buscamos préstamos con estado 'Pendiente' y sus usuarios
-    pendientes = db.session.query(Prestamo, Usuario).join(Usuario, Prestamo.usuario_id == Usuario.id).filter(Prestamo.estado == 'Pendiente').all()
-    
-    data = []
-    for p, u in pendientes:
-        data.append({
-            'ID': p.id,
-            'Usuario': u.nombre_completo,
-            'Fecha': p.fecha_solicitud.strftime('%Y-%m-%d'),
-            'Monto': f"${p.monto_solicitado:,.0f}",
-            'Monto_Raw': p.monto_solicitado, # Para cálculos
-            'Cuotas': p.cuotas_totales,
-            'Tasa': p.tasa_interes
-        })
-    return data
+# --- SOLICITUDES PENDIENTES (paginadas, ordenadas y filtradas en el servidor) ---
+COLUMNAS_SOLICITUDES = [
+    ColumnaServidor('ID', 'ID', Prestamo.id, 'numero'),
+    ColumnaServidor('Usuario', 'Solicitante', Usuario.nombre_completo, 'texto'),
+    ColumnaServidor('Fecha', 'Fecha', Prestamo.fecha_solicitud, 'fecha'),
+    ColumnaServidor('Monto', 'Monto', Prestamo.monto_solicitado, 'numero'),
+    ColumnaServidor('Cuotas', 'Plazo (Meses)', Prestamo.cuotas_totales, 'numero'),
+]
 
-def layout():
-    data = cargar_solicitudes()
+def consultar_solicitudes():
+    # Préstamos con estado 'Pendiente' y el nombre del socio
+    return (select(Prestamo.fecha_solicitud, Prestamo.monto_solicitado, Prestamo.cuotas_totales,
+                   Prestamo.tasa_interes, Usuario.nombre_completo)
+            .join_from(Prestamo, Usuario, Prestamo.usuario_id == Usuario.id)
+            .where(Prestamo.estado == 'Pendiente'))
 
+def fila_solicitud(r):
+    return {
+        'ID': r._llave,
+        'Usuario': r.nombre_completo,
+        'Fecha': r.fecha_solicitud.strftime('%Y-%m-%d'),
+        'Monto': f"${r.monto_solicitado:,.0f}",
+        'Monto_Raw': r.monto_solicitado, # Para cálculos
+        'Cuotas': r.cuotas_totales,
+        'Tasa': r.tasa_interes
+    }
+
+def layout():
     return html.Div([
         crear_navbar(),
         dbc.Container([
@@ -36,26 +44,18 @@ def layout():
             dbc.Card([
                 dbc.CardHeader("Solicitudes Pendientes de Aprobación"),
                 dbc.CardBody([
-                    dash_table.DataTable(
-                        id='tabla-solicitudes',
-                        columns=[
-                            {'name': 'ID', 'id': 'ID'},
-                            {'name': 'Solicitante', 'id': 'Usuario'},
-                            {'name': 'Fecha', 'id': 'Fecha'},
-                            {'name': 'Monto', 'id': 'Monto'},
-                            {'name': 'Plazo (Meses)', 'id': 'Cuotas'},
-                        ],
-                        data=data,
-                        row_selectable='single',
+                    crear_tabla_servidor(
+                        'tabla-solicitudes', COLUMNAS_SOLICITUDES, page_size=10,
+                        row_selectable='multi',
+                        selected_rows=[],
                         style_table={'overflowX': 'auto'},
                         style_cell={'textAlign': 'center', 'padding': '10px'},
-                        style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'},
-                        page_size=10
+                        style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'}
                     ),
                     
                     html.Div([
-                        dbc.Button("✅ Aprobar Crédito y Generar Pagos", id="btn-aprobar-prestamo", color="success", className="me-3"),
-                        dbc.Button("❌ Rechazar Solicitud", id="btn-rechazar-prestamo", color="danger")
+                        dbc.Button("✅ Aprobar Seleccionados y Generar Pagos", id="btn-aprobar-prestamo", color="success", className="me-3"),
+                        dbc.Button("❌ Rechazar Seleccionados", id="btn-rechazar-prestamo", color="danger")
                     ], className="mt-4 d-flex justify-content-end"),
                     
                     html.Div(id="msg-gestion-prestamo", className="mt-3")
@@ -64,61 +64,38 @@ def layout():
         ])
     ])
 
-# --- CALLBACK DE APROBACIÓN ---
+# --- CALLBACKS ---
+registrar_tabla_servidor('tabla-solicitudes', consultar_solicitudes, COLUMNAS_SOLICITUDES, Prestamo.id, fila_solicitud)
+
 @callback(
     [Output("msg-gestion-prestamo", "children"),
-     Output("tabla-solicitudes", "data")],
+     Output(id_version("tabla-solicitudes"), "data")], # Recarga la página de la tabla (y limpia la selección)
     [Input("btn-aprobar-prestamo", "n_clicks"),
      Input("btn-rechazar-prestamo", "n_clicks")],
     [State("tabla-solicitudes", "selected_rows"),
-     State("tabla-solicitudes", "data")]
+     State("tabla-solicitudes", "data"),
+     State(id_version("tabla-solicitudes"), "data")]
 )
-def procesar_solicitud(btn_ok, btn_cancel, selected, data):
+def procesar_solicitud(btn_ok, btn_cancel, selected, data, version):
     ctx = dash.callback_context
     if not ctx.triggered or not selected:
         return dash.no_update, dash.no_update
     
     button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    row_idx = selected[0]
     
-    prestamo_id = data[row_idx]['ID']
-    monto = data[row_idx]['Monto_Raw']
-    cuotas = data[row_idx]['Cuotas']
-    tasa = data[row_idx]['Tasa']
+    seleccion = [data[i] for i in selected]
+    prestamo_ids = [fila['ID'] for fila in seleccion]
+    etiquetas = {fila['ID']: f"Préstamo #{fila['ID']} ({fila['Usuario']}, {fila['Monto']})" for fila in seleccion}
     
     try:
-        prestamo = Prestamo.query.get(prestamo_id)
-        
         if button_id == "btn-aprobar-prestamo":
-            # 1. Actualizar estado del préstamo
-            prestamo.estado = 'Activo'
-            prestamo.fecha_aprobacion = datetime.utcnow()
-            
-            # 2. GENERAR TABLA DE AMORTIZACIÓN (Cuotas)
-            # Usamos tu función financiera
-            df_plan = calcular_plan_pagos(monto, tasa, cuotas)
-            
-            for index, row in df_plan.iterrows():
-                nueva_cuota = Cuota(
-                    prestamo_id=prestamo.id,
-                    numero_cuota=int(row['Cuota #']),
-                    fecha_vencimiento=row['Fecha Pago'],
-                    monto_capital=row['Abono Capital'],
-                    monto_interes=row['Interés'],
-                    monto_total=row['Valor Cuota'],
-                    estado='Pendiente'
-                )
-                db.session.add(nueva_cuota)
-            
-            msg = dbc.Alert(f"Préstamo #{prestamo.id} APROBADO. Se generaron {cuotas} cuotas de cobro.", color="success")
+            # Aprobación + planes de pago (inserción en bloque) + resumen de los socios en una sola transacción
+            msg = crear_reporte_lote(aprobar_prestamos(prestamo_ids), "Aprobado y plan de pagos generado", etiquetas)
 
         elif button_id == "btn-rechazar-prestamo":
-            prestamo.estado = 'Rechazado'
-            msg = dbc.Alert("Solicitud rechazada.", color="warning")
+            msg = crear_reporte_lote(rechazar_prestamos(prestamo_ids), "Rechazado", etiquetas)
             
-        db.session.commit()
-        return msg, cargar_solicitudes()
+        return msg, (version or 0) + 1
 
     except Exception as e:
-        db.session.rollback()
         return dbc.Alert(f"Error técnico: {str(e)}", color="danger"), dash.no_update
\ No newline at end of file
@@ -1,59 +1,126 @@
 import dash
 from dash import dcc, html, Input, Output, callback
 import dash_bootstrap_components as dbc
-import plotly.express as px
-import pandas as pd
-from database.models import Usuario, Prestamo, Aporte, Cuota
-from database.db import db
+import plotly.graph_objects as go
+from datetime import date
+from database.resumen import obtener_totales_fondo, obtener_resumen_mensual
+from database.queries import perfil_socio, prestamos_activos_con_pagadas
+from database.exportacion import TABLAS_EXPORTABLES
 from components.navbar import crear_navbar
+from components.cache_figuras import cache_por_version_fondo
+from components.buscador_socios import crear_buscador_socios, registrar_buscador_socios
+from utils.financiero import saldo_pendiente, intereses_restantes
 
-# --- LAYOUT ---
-def layout():
-    # =========================================================
-    # 1. CÁLCULO DE DATOS GLOBALES (KPIs)
-    # =========================================================
+FORMATOS_EXPORTACION = ['csv', 'parquet']
+# Meses que muestran las tendencias al abrir el Dashboard
+MESES_TENDENCIA = 12
+
+# --- KPIs Y GRÁFICA (solo se arman cuando cambian los totales del fondo) ---
+def figura_balance(total_ahorrado, cartera_activa_real):
+    """Dona de activos con go.Figure directo (sin DataFrame ni Plotly Express)."""
+    return go.Figure(
+        go.Pie(
+            labels=["Capital en Caja", "Cartera Activa"],
+            values=[total_ahorrado, cartera_activa_real],
+            hole=0.4,
+            marker_colors=['#28a745', '#dc3545']
+        ),
+        # Ajuste importante: Márgenes pequeños para que no ocupe tanto espacio
+        layout=dict(title='Distribución de Activos', margin=dict(t=30, b=0, l=0, r=0))
+    )
+
+@cache_por_version_fondo('dashboard')
+def bloques_dashboard():
+    """{'kpis': fila de tarjetas, 'balance': figura} a partir de la fila de totales del fondo y de los préstamos activos."""
+    # Caja, desembolsado e intereses salen de la fila de totales del fondo (se actualiza con cada aprobación y pago)
+    totales = obtener_totales_fondo()
     
     # A. Total Ahorrado
-    total_ahorrado = db.session.query(db.func.sum(Aporte.monto)).filter(Aporte.estado == 'Aprobado').scalar() or 0
-    
-    # B. Cartera Activa REAL
-    total_prestado_bruto = db.session.query(db.func.sum(Prestamo.monto_solicitado)).filter(Prestamo.estado == 'Activo').scalar() or 0
+    total_ahorrado = totales.caja_ahorros if totales else 0
     
-    capital_recuperado = db.session.query(db.func.sum(Cuota.monto_capital)).join(Prestamo).filter(
-        Prestamo.estado == 'Activo',
-        Cuota.estado == 'Pagado'
-    ).scalar() or 0
-
-    cartera_activa_real = total_prestado_bruto - capital_recuperado
+    # B. Cartera Activa REAL (saldo de cada préstamo en forma cerrada, sin recorrer sus cuotas)
+    total_prestado_bruto = totales.desembolsado_bruto if totales else 0
+    activos = prestamos_activos_con_pagadas()
+    montos, tasas, plazos, pagadas = zip(*activos) if activos else ((), (), (), ())
+    cartera_activa_real = float(saldo_pendiente(montos, tasas, plazos, pagadas).sum()) if activos else 0
+    intereses_por_cobrar = float(intereses_restantes(montos, tasas, plazos, pagadas).sum()) if activos else 0
 
     # C. Intereses Recaudados
-    total_intereses = db.session.query(db.func.sum(Cuota.monto_interes)).filter(Cuota.estado == 'Pagado').scalar() or 0
-    
-    # =========================================================
-    # 2. PREPARACIÓN DE GRÁFICAS
-    # =========================================================
-    
-    df_balance = pd.DataFrame({
-        "Concepto": ["Capital en Caja", "Cartera Activa"],
-        "Monto": [total_ahorrado, cartera_activa_real]
-    })
-    
-    fig_balance = px.pie(
-        df_balance, 
-        values='Monto', 
-        names='Concepto', 
-        title='Distribución de Activos', 
-        hole=0.4, 
-        color_discrete_sequence=['#28a745', '#dc3545']
-    )
-    # Ajuste importante: Márgenes pequeños para que no ocupe tanto espacio
-    fig_balance.update_layout(margin=dict(t=30, b=0, l=0, r=0))
+    total_intereses = totales.intereses_recaudados if totales else 0
+
+    kpis = dbc.Row([
+        dbc.Col(dbc.Card([
+            dbc.CardBody([
+                html.H6("Total en Caja (Ahorros)"), 
+                html.H3(f"${total_ahorrado:,.0f}", className="text-success")
+            ])
+        ], className="shadow-sm border-success h-100"), width=12, lg=4, className="mb-3"),
+        
+        dbc.Col(dbc.Card([
+            dbc.CardBody([
+                html.H6("Cartera Activa (Saldo Real)"), 
+                html.H3(f"${cartera_activa_real:,.0f}", className="text-danger"),
+                html.Small(f"Desembolsado orig: ${total_prestado_bruto:,.0f} · Intereses por cobrar: ${intereses_por_cobrar:,.0f}",
+                           className="text-muted")
+            ])
+        ], className="shadow-sm border-danger h-100"), width=12, lg=4, className="mb-3"),
+
+        dbc.Col(dbc.Card([
+            dbc.CardBody([
+                html.H6("Intereses Recaudados"), 
+                html.H3(f"${total_intereses:,.0f}", className="text-primary"),
+                html.Small("Ganancia neta", className="text-muted")
+            ])
+        ], className="shadow-sm border-primary h-100"), width=12, lg=4, className="mb-3"),
+    ])
+    return {'kpis': kpis, 'balance': figura_balance(total_ahorrado, cartera_activa_real)}
+
+# --- TENDENCIAS MENSUALES (leídas de resumen_mensual, una fila por mes) ---
+def _figura_mensual(titulo, series):
+    """series: [(go.Bar o go.Scatter), ...] con x = meses."""
+    return go.Figure(series, layout=dict(
+        title=titulo, barmode='group', hovermode='x unified',
+        margin=dict(t=40, b=0, l=0, r=0),
+        legend=dict(orientation='h', y=-0.2),
+        xaxis=dict(tickformat='%b %Y', dtick='M1'),
+        yaxis=dict(tickprefix='$', separatethousands=True)
+    ))
+
+def inicio_tendencia(hoy=None):
+    """Primer día del mes de hace MESES_TENDENCIA - 1 meses (el rango incluye el mes en curso)."""
+    hoy = hoy or date.today()
+    indice = hoy.year * 12 + hoy.month - 1 - (MESES_TENDENCIA - 1)
+    return date(indice // 12, indice % 12 + 1, 1)
 
-    usuarios = Usuario.query.all()
-    opts_users = [{'label': u.nombre_completo, 'value': u.id} for u in usuarios]
+@cache_por_version_fondo('tendencias')
+def figuras_tendencias(desde, hasta):
+    """{'flujos', 'recaudo', 'mora'}: figuras mes a mes entre dos fechas ISO (AAAA-MM-DD, opcionales)."""
+    filas = obtener_resumen_mensual(date.fromisoformat(desde) if desde else None, date.fromisoformat(hasta) if hasta else None)
+    meses = [f.mes for f in filas]
+    columna = lambda nombre: [getattr(f, nombre) for f in filas]
+    return {
+        'flujos': _figura_mensual("Aportes vs. Desembolsos", [
+            go.Bar(x=meses, y=columna('aportes'), name="Aportes aprobados", marker_color='#28a745'),
+            go.Bar(x=meses, y=columna('desembolsos'), name="Préstamos desembolsados", marker_color='#dc3545'),
+        ]),
+        'recaudo': _figura_mensual("Recaudo de Cartera", [
+            go.Bar(x=meses, y=columna('capital_recuperado'), name="Capital recuperado", marker_color='#17a2b8'),
+            go.Bar(x=meses, y=columna('intereses_recaudados'), name="Intereses recaudados", marker_color='#007bff'),
+        ]),
+        'mora': _figura_mensual("Mora por Mes de Vencimiento", [
+            go.Bar(x=meses, y=columna('mora'), name="Cuotas en mora o pagadas tarde", marker_color='#fd7e14',
+                   customdata=columna('cuotas_mora'), hovertemplate="$%{y:,.0f} (%{customdata} cuotas)"),
+            go.Scatter(x=meses, y=columna('multas'), name="Multas causadas", mode='lines+markers', line_color='#6f42c1'),
+        ]),
+    }
+
+# --- LAYOUT ---
+def layout():
+    # KPIs y gráfica ya serializados (se arman de nuevo solo si cambió la versión de los totales)
+    bloques = bloques_dashboard()
 
     # =========================================================
-    # 3. ESTRUCTURA VISUAL
+    # ESTRUCTURA VISUAL
     # =========================================================
     return html.Div([
         crear_navbar(),
@@ -61,30 +128,7 @@ def layout():
             html.H2("📊 Dashboard Gerencial FONAMIG", className="text-primary mb-4"),
             
             # --- FILA DE TARJETAS (KPIs) ---
-            dbc.Row([
-                dbc.Col(dbc.Card([
-                    dbc.CardBody([
-                        html.H6("Total en Caja (Ahorros)"), 
-                        html.H3(f"${total_ahorrado:,.0f}", className="text-success")
-                    ])
-                ], className="shadow-sm border-success h-100"), width=12, lg=4, className="mb-3"),
-                
-                dbc.Col(dbc.Card([
-                    dbc.CardBody([
-                        html.H6("Cartera Activa (Saldo Real)"), 
-                        html.H3(f"${cartera_activa_real:,.0f}", className="text-danger"),
-                        html.Small(f"Desembolsado orig: ${total_prestado_bruto:,.0f}", className="text-muted")
-                    ])
-                ], className="shadow-sm border-danger h-100"), width=12, lg=4, className="mb-3"),
-
-                dbc.Col(dbc.Card([
-                    dbc.CardBody([
-                        html.H6("Intereses Recaudados"), 
-                        html.H3(f"${total_intereses:,.0f}", className="text-primary"),
-                        html.Small("Ganancia neta", className="text-muted")
-                    ])
-                ], className="shadow-sm border-primary h-100"), width=12, lg=4, className="mb-3"),
-            ]),
+            bloques['kpis'],
 
             html.Hr(),
 
@@ -96,7 +140,7 @@ def layout():
                         dbc.CardHeader("Visión General de Activos"),
                         dbc.CardBody(
                             dcc.Graph(
-                                figure=fig_balance, 
+                                figure=bloques['balance'], 
                                 config={'displayModeBar': False},
                                 style={'height': '350px'} # <--- ESTO EVITA QUE CAIGA INFINITAMENTE
                             )
@@ -109,17 +153,64 @@ def layout():
                         dbc.CardHeader("🔍 Inspección Detallada por Usuario"),
                         dbc.CardBody([
                             html.Label("Selecciona un usuario para analizar su riesgo:"),
-                            dcc.Dropdown(id="filtro-user-360", options=opts_users, placeholder="Buscar socio...", className="mb-3"),
+                            crear_buscador_socios("filtro-user-360", placeholder="Buscar socio...", className="mb-3"),
                             
                             html.Div(id="resultado-user-360", className="p-3 border rounded bg-light", children="Selecciona a alguien de la lista...")
                         ])
                     ], className="shadow-sm h-100")
                 ], width=12, lg=6)
-            ])
+            ]),
+
+            # --- TENDENCIAS MENSUALES ---
+            dbc.Card([
+                dbc.CardHeader("📈 Tendencias Mensuales"),
+                dbc.CardBody([
+                    html.Label("Rango de meses:", className="me-3"),
+                    dcc.DatePickerRange(
+                        id="rango-tendencias", display_format='YYYY-MM-DD', className="mb-3",
+                        start_date=inicio_tendencia(),
+                        end_date=date.today()
+                    ),
+                    dbc.Row([
+                        dbc.Col(dcc.Graph(id="graf-tendencia-flujos", config={'displayModeBar': False}, style={'height': '320px'}), width=12, lg=4),
+                        dbc.Col(dcc.Graph(id="graf-tendencia-recaudo", config={'displayModeBar': False}, style={'height': '320px'}), width=12, lg=4),
+                        dbc.Col(dcc.Graph(id="graf-tendencia-mora", config={'displayModeBar': False}, style={'height': '320px'}), width=12, lg=4),
+                    ])
+                ])
+            ], className="shadow-sm mt-4"),
+
+            # --- EXPORTACIÓN PARA EL CONTADOR ---
+            dbc.Card([
+                dbc.CardHeader("📤 Exportar Historial Contable"),
+                dbc.CardBody([
+                    html.Label("Rango de fechas (opcional):", className="me-3"),
+                    dcc.DatePickerRange(id="rango-exportacion", display_format='YYYY-MM-DD', clearable=True, className="mb-3"),
+                    html.Div([
+                        dbc.ButtonGroup([
+                            dbc.Button(f"{tabla.capitalize()} ({formato.upper()})", id=f"btn-exportar-{tabla}-{formato}",
+                                       href=f"/admin/exportar/{tabla}.{formato}", external_link=True,
+                                       color="secondary", outline=True, size="sm")
+                            for formato in FORMATOS_EXPORTACION
+                        ], className="me-3 mb-2")
+                        for tabla in TABLAS_EXPORTABLES
+                    ])
+                ])
+            ], className="shadow-sm mt-4")
         ], fluid=True, className="py-3")
     ])
 
-# --- CALLBACK (Sin cambios, solo se incluye para que el archivo funcione completo) ---
+# --- CALLBACKS ---
+registrar_buscador_socios("filtro-user-360")
+
+@callback(
+    [Output("graf-tendencia-flujos", "figure"), Output("graf-tendencia-recaudo", "figure"), Output("graf-tendencia-mora", "figure")],
+    [Input("rango-tendencias", "start_date"), Input("rango-tendencias", "end_date")]
+)
+def actualizar_tendencias(desde, hasta):
+    # Ya serializadas mientras no cambie la versión del fondo (mismo rango = mismo resultado)
+    figuras = figuras_tendencias(desde[:10] if desde else None, hasta[:10] if hasta else None)
+    return figuras['flujos'], figuras['recaudo'], figuras['mora']
+
 @callback(
     Output("resultado-user-360", "children"),
     Input("filtro-user-360", "value")
@@ -128,17 +219,15 @@ def mostrar_perfil_360(user_id):
     if not user_id:
         return html.Div("Selecciona un usuario para ver sus estadísticas.", className="text-center text-muted mt-5")
 
-    user = Usuario.query.get(user_id)
-    ahorros = db.session.query(db.func.sum(Aporte.monto)).filter_by(usuario_id=user_id, estado='Aprobado').scalar() or 0
-    
-    deuda = 0
-    cuotas_mora = 0
-    prestamos = Prestamo.query.filter_by(usuario_id=user_id, estado='Activo').all()
+    # Usuario y su resumen en una sola consulta
+    perfil = perfil_socio(user_id)
+    if not perfil:
+        return html.Div("El socio ya no existe.", className="text-center text-muted mt-5")
+    user, resumen = perfil
     
-    for p in prestamos:
-        pendientes = Cuota.query.filter(Cuota.prestamo_id == p.id, Cuota.estado.in_(['Pendiente', 'Mora'])).all()
-        deuda += sum(c.monto_total for c in pendientes)
-        cuotas_mora += sum(1 for c in pendientes if c.estado == 'Mora')
+    ahorros = resumen.ahorro_total if resumen else 0
+    deuda = resumen.deuda_pendiente if resumen else 0
+    cuotas_mora = resumen.cuotas_mora if resumen else 0
 
     color_estado = "success" if cuotas_mora == 0 else "danger"
     estado_texto = "Excelente Cliente (Al día)" if cuotas_mora == 0 else f"⚠️ ATENCIÓN: Tiene {cuotas_mora} cuotas en Mora"
@@ -170,4 +259,14 @@ def mostrar_perfil_360(user_id):
             html.Small("Email de contacto:", className="fw-bold"),
             html.Span(f" {user.email}", className="d-block")
         ], className="text-muted small")
-    ])
\ No newline at end of file
+    ])
+
+# --- ENLACES DE EXPORTACIÓN CON EL RANGO DE FECHAS ---
+@callback(
+    [Output(f"btn-exportar-{tabla}-{formato}", "href") for tabla in TABLAS_EXPORTABLES for formato in FORMATOS_EXPORTACION],
+    [Input("rango-exportacion", "start_date"), Input("rango-exportacion", "end_date")]
+)
+def actualizar_enlaces_exportacion(desde, hasta):
+    parametros = "&".join(f"{nombre}={valor[:10]}" for nombre, valor in (("desde", desde), ("hasta", hasta)) if valor)
+    sufijo = f"?{parametros}" if parametros else ""
+    return [f"/admin/exportar/{tabla}.{formato}{sufijo}" for tabla in TABLAS_EXPORTABLES for formato in FORMATOS_EXPORTACION]
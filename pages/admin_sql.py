@@ -0,0 +1,140 @@
+import dash
+from dash import html, dcc, Input, Output, State, callback, dash_table
+import dash_bootstrap_components as dbc
+from database.db import estadisticas_sql, consultas_lentas, reiniciar_estadisticas_sql
+from components.navbar import crear_navbar
+from utils.config import UMBRAL_CONSULTA_LENTA_MS
+from utils.perfilador import activar_perfilador, desactivar_perfilador, estado_perfilador, perfiles_guardados
+
+# --- CARGAR ESTADÍSTICAS (de este proceso) ---
+def cargar_estadisticas():
+    data = []
+    for f in estadisticas_sql():
+        peticiones = f['peticiones'] or 1
+        data.append({
+            'Origen': f['origen'],
+            'Peticiones': f['peticiones'],
+            'Sentencias': f['sentencias'],
+            'Sentencias / petición': round(f['sentencias'] / peticiones, 1),
+            'Máx. por petición': f['max_sentencias_peticion'],
+            'Tiempo total (ms)': round(f['tiempo_ms'], 1),
+            'ms / petición': round(f['tiempo_ms'] / peticiones, 1),
+            'Más lenta (ms)': round(f['max_ms'], 1),
+            'Lentas': f['lentas'],
+        })
+    return data
+
+def crear_lista_lentas():
+    lentas = consultas_lentas()
+    if not lentas:
+        return html.P(f"Ninguna consulta ha tardado más de {UMBRAL_CONSULTA_LENTA_MS} ms.", className="text-muted")
+    return html.Div([
+        html.Details([
+            html.Summary(f"{c['fecha']:%Y-%m-%d %H:%M:%S} · {c['duracion_ms']:,.0f} ms · {c['origen']}"),
+            html.Pre(c['sql'], className="small bg-light p-2 mt-2"),
+            html.Div([html.B("Parámetros: "), html.Code(c['parametros'])], className="small"),
+            html.Div([html.B("Plan: "), html.Ul([html.Li(paso) for paso in c['plan']], className="mb-0")], className="small")
+        ], className="mb-2 border-bottom pb-2")
+        for c in lentas
+    ])
+
+def crear_estado_perfilador():
+    estado = estado_perfilador()
+    if not estado:
+        return dbc.Badge("Apagado", color="secondary")
+    filtro = f" que coincidan con «{estado['filtro']}»" if estado['filtro'] else ""
+    return dbc.Badge(f"Armado: faltan {estado['restantes']} petición(es){filtro}", color="warning", text_color="dark")
+
+def crear_lista_perfiles():
+    perfiles = perfiles_guardados()
+    if not perfiles:
+        return html.P("Todavía no hay perfiles guardados.", className="text-muted")
+    return html.Ul([
+        html.Li([
+            html.A(p['nombre'], href=f"/admin/perfiles/{p['nombre']}", target="_blank"),
+            html.Span(f" · {p['fecha']:%Y-%m-%d %H:%M:%S} · {p['kb']:,.0f} KB", className="text-muted small")
+        ]) for p in perfiles
+    ], className="mb-0")
+
+def layout():
+    return html.Div([
+        crear_navbar(),
+        dbc.Container([
+            html.H2("🧪 Rendimiento SQL", className="mb-4 text-primary"),
+
+            dbc.Card([
+                dbc.CardHeader("Sentencias y tiempo en la base por callback o ruta"),
+                dbc.CardBody([
+                    html.P("Cuenta desde que arrancó este proceso del servidor (cada worker lleva la suya). "
+                           "Un callback con muchas sentencias por petición suele ser una consulta por fila.",
+                           className="text-muted"),
+                    dash_table.DataTable(
+                        id='tabla-estadisticas-sql',
+                        columns=[{'name': i, 'id': i} for i in ['Origen', 'Peticiones', 'Sentencias', 'Sentencias / petición',
+                                                               'Máx. por petición', 'Tiempo total (ms)', 'ms / petición',
+                                                               'Más lenta (ms)', 'Lentas']],
+                        data=cargar_estadisticas(),
+                        sort_action='native',
+                        style_table={'overflowX': 'auto'},
+                        style_cell={'textAlign': 'left', 'padding': '8px', 'maxWidth': '420px',
+                                    'overflow': 'hidden', 'textOverflow': 'ellipsis'},
+                        style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'},
+                        page_size=15
+                    ),
+                    html.Div([
+                        dbc.Button("🔄 Actualizar", id="btn-actualizar-sql", color="primary", className="me-3"),
+                        dbc.Button("🗑️ Reiniciar", id="btn-reiniciar-sql", color="secondary", outline=True)
+                    ], className="mt-3 d-flex justify-content-end")
+                ])
+            ], className="shadow mb-4"),
+
+            dbc.Card([
+                dbc.CardHeader(f"Consultas lentas (más de {UMBRAL_CONSULTA_LENTA_MS} ms)"),
+                dbc.CardBody(html.Div(id="lista-consultas-lentas", children=crear_lista_lentas()))
+            ], className="shadow mb-4"),
+
+            dbc.Card([
+                dbc.CardHeader("Perfilador por muestreo"),
+                dbc.CardBody([
+                    html.P("Toma la pila de las próximas peticiones que coincidan (layout, figuras, SQL y JSON) y guarda "
+                           "un archivo para abrir en speedscope.app. Filtro: ruta, id de callback o página, "
+                           "ej: /admin_reportes o grafico-. Vacío = cualquier petición. Solo este proceso del servidor.",
+                           className="text-muted"),
+                    dbc.Row([
+                        dbc.Col([dbc.Label("Peticiones"), dbc.Input(id="input-perfil-peticiones", type="number", min=1, max=100, value=5)], md=2),
+                        dbc.Col([dbc.Label("Filtro"), dbc.Input(id="input-perfil-filtro", type="text", placeholder="/admin_reportes")], md=6),
+                        dbc.Col([
+                            dbc.Button("▶️ Armar", id="btn-activar-perfil", color="warning", className="me-2"),
+                            dbc.Button("⏹️ Apagar", id="btn-desactivar-perfil", color="secondary", outline=True)
+                        ], md=4, className="d-flex align-items-end")
+                    ], className="mb-3"),
+                    html.Div(id="estado-perfilador", children=crear_estado_perfilador(), className="mb-3"),
+                    html.Div(id="lista-perfiles", children=crear_lista_perfiles())
+                ])
+            ], className="shadow")
+        ])
+    ])
+
+# --- CALLBACKS ---
+@callback(
+    [Output("tabla-estadisticas-sql", "data"), Output("lista-consultas-lentas", "children")],
+    [Input("btn-actualizar-sql", "n_clicks"), Input("btn-reiniciar-sql", "n_clicks")],
+    prevent_initial_call=True
+)
+def actualizar_estadisticas(btn_actualizar, btn_reiniciar):
+    if dash.callback_context.triggered_id == "btn-reiniciar-sql":
+        reiniciar_estadisticas_sql()
+    return cargar_estadisticas(), crear_lista_lentas()
+
+@callback(
+    [Output("estado-perfilador", "children"), Output("lista-perfiles", "children")],
+    [Input("btn-activar-perfil", "n_clicks"), Input("btn-desactivar-perfil", "n_clicks"), Input("btn-actualizar-sql", "n_clicks")],
+    [State("input-perfil-peticiones", "value"), State("input-perfil-filtro", "value")],
+    prevent_initial_call=True
+)
+def controlar_perfilador(btn_activar, btn_desactivar, btn_actualizar, peticiones, filtro):
+    if dash.callback_context.triggered_id == "btn-activar-perfil":
+        activar_perfilador(peticiones or 5, filtro)
+    elif dash.callback_context.triggered_id == "btn-desactivar-perfil":
+        desactivar_perfilador()
+    return crear_estado_perfilador(), crear_lista_perfiles()
@@ -1,21 +1,25 @@
 import dash
 from dash import dcc, html, Input, Output, State, callback, dash_table
 import dash_bootstrap_components as dbc
+from sqlalchemy import select, case
 from database.models import Usuario, Prestamo, Aporte
 from database.db import db
+from database.cache_socios import invalidar_socios
+from database.resumen import recalcular_resumen_usuario, recalcular_totales_fondo, recalcular_resumen_mensual
+from database.queries import movimientos_de_socio
 from components.navbar import crear_navbar
+from components.tabla_servidor import ColumnaServidor, crear_tabla_servidor, registrar_tabla_servidor, id_version
 
-def layout():
-    # Cargar usuarios
-    usuarios = Usuario.query.all()
-    data_users = [{
-        'ID': u.id,
-        'Usuario': u.username,
-        'Nombre': u.nombre_completo,
-        'Rol': u.rol,
-        'Activo': 'SI' if u.activo else 'NO'
-    } for u in usuarios]
+# Tabla maestra paginada en el servidor (solo viaja la página visible)
+COLUMNAS_USUARIOS = [
+    ColumnaServidor('ID', 'ID', Usuario.id, 'numero'),
+    ColumnaServidor('Usuario', 'Usuario', Usuario.username, 'texto'),
+    ColumnaServidor('Nombre', 'Nombre', Usuario.nombre_completo, 'texto'),
+    ColumnaServidor('Rol', 'Rol', Usuario.rol, 'texto'),
+    ColumnaServidor('Activo', 'Activo', case((Usuario.activo == True, 'SI'), else_='NO'), 'texto'),
+]
 
+def layout():
     return html.Div([
         crear_navbar(),
         dbc.Container([
@@ -25,21 +29,11 @@ def layout():
             dbc.Card([
                 dbc.CardHeader("1. Selecciona un Usuario para Administrarlo"),
                 dbc.CardBody([
-                    dash_table.DataTable(
-                        id='master-table-users',
-                        columns=[
-                            {'name': 'ID', 'id': 'ID'},
-                            {'name': 'Usuario', 'id': 'Usuario'},
-                            {'name': 'Nombre', 'id': 'Nombre'},
-                            {'name': 'Rol', 'id': 'Rol'},
-                            {'name': 'Activo', 'id': 'Activo'},
-                        ],
-                        data=data_users,
+                    crear_tabla_servidor(
+                        'master-table-users', COLUMNAS_USUARIOS, page_size=5,
                         row_selectable='single',
-                        filter_action="native",
                         style_table={'overflowX': 'auto'},
-                        style_cell={'textAlign': 'left'},
-                        page_size=5
+                        style_cell={'textAlign': 'left'}
                     ),
                     html.Div([
                         dbc.Button("Activar", id="btn-quick-active", size="sm", color="success", className="me-2"),
@@ -125,6 +119,14 @@ def layout():
         ])
     ])
 
+# --- CALLBACK 0: PÁGINA DE LA TABLA MAESTRA ---
+registrar_tabla_servidor(
+    'master-table-users',
+    lambda: select(Usuario.username, Usuario.nombre_completo, Usuario.rol, Usuario.activo),
+    COLUMNAS_USUARIOS, Usuario.id,
+    lambda u: {'ID': u._llave, 'Usuario': u.username, 'Nombre': u.nombre_completo, 'Rol': u.rol, 'Activo': 'SI' if u.activo else 'NO'}
+)
+
 # --- CALLBACK 1: CARGAR DATOS ---
 @callback(
     [Output("editor-prestamos", "data"), Output("editor-aportes", "data"), Output("msg-god-mode", "children")],
@@ -138,10 +140,8 @@ def cargar_datos_usuario(selected_rows, data_users):
     row_idx = selected_rows[0]
     user_id = data_users[row_idx]['ID']
     
-    prestamos = Prestamo.query.filter_by(usuario_id=user_id).all()
+    prestamos, aportes = movimientos_de_socio(user_id)
     data_p = [{'id': p.id, 'monto_solicitado': p.monto_solicitado, 'cuotas_totales': p.cuotas_totales, 'estado': p.estado} for p in prestamos]
-
-    aportes = Aporte.query.filter_by(usuario_id=user_id).all()
     data_a = [{'id': a.id, 'monto': a.monto, 'tipo': a.tipo, 'estado': a.estado} for a in aportes]
     
     return data_p, data_a, f"Editando a: {data_users[row_idx]['Nombre']}"
@@ -181,6 +181,10 @@ def guardar_prestamos_editados(n_clicks, rows_tabla, selected_rows, data_users):
                 p_db.cuotas_totales = int(row['cuotas_totales'])
                 p_db.estado = row['estado']
         
+        # Edición libre: el resumen del socio, los totales del fondo y el resumen mensual se recalculan completos
+        recalcular_resumen_usuario([user_id])
+        recalcular_totales_fondo()
+        recalcular_resumen_mensual()
         db.session.commit()
         return "✅ Cambios Guardados (Actualizado/Borrado)"
     except Exception as e:
@@ -217,19 +221,22 @@ def guardar_aportes_editados(n_clicks, rows_tabla, selected_rows, data_users):
                 a_db.tipo = row['tipo']
                 a_db.estado = row['estado']
         
+        recalcular_resumen_usuario([user_id])
+        recalcular_totales_fondo()
+        recalcular_resumen_mensual()
         db.session.commit()
         return "✅ Cambios Guardados"
     except Exception as e:
         db.session.rollback()
         return f"Error: {str(e)}"
     
-# --- CALLBACK 4: ACCIONES RÁPIDAS (Se mantiene igual) ---
+# --- CALLBACK 4: ACCIONES RÁPIDAS (recarga la página actual de la tabla) ---
 @callback(
-    Output("master-table-users", "data"),
+    Output(id_version("master-table-users"), "data"),
     [Input("btn-quick-active", "n_clicks"), Input("btn-quick-block", "n_clicks"), Input("btn-quick-admin", "n_clicks")],
-    [State("master-table-users", "selected_rows"), State("master-table-users", "data")]
+    [State("master-table-users", "selected_rows"), State("master-table-users", "data"), State(id_version("master-table-users"), "data")]
 )
-def acciones_rapidas(btn_act, btn_block, btn_adm, selected, data):
+def acciones_rapidas(btn_act, btn_block, btn_adm, selected, data, version):
     ctx = dash.callback_context
     if not ctx.triggered or not selected: return dash.no_update
     
@@ -242,8 +249,8 @@ def acciones_rapidas(btn_act, btn_block, btn_adm, selected, data):
         elif trigger == "btn-quick-block": usuario.activo = False
         elif trigger == "btn-quick-admin": usuario.rol = 'admin'
         
+        invalidar_socios([user_id]) # El rol cambia el menú de sus páginas
         db.session.commit()
-        nuevos_users = Usuario.query.all()
-        return [{'ID': u.id, 'Usuario': u.username, 'Nombre': u.nombre_completo, 'Rol': u.rol, 'Activo': 'SI' if u.activo else 'NO'} for u in nuevos_users]
+        return (version or 0) + 1
     except:
         return dash.no_update
\ No newline at end of file
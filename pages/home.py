@@ -2,30 +2,26 @@ import dash
 from dash import dcc, html, Input, Output, State, callback
 import dash_bootstrap_components as dbc
 from flask_login import current_user
-from database.models import Prestamo, Cuota, Aporte
-from database.db import db
+from database.resumen import obtener_resumen
+from database.cache_socios import cache_por_socio
 from components.navbar import crear_navbar
 
+@cache_por_socio('home')
 def layout():
     if not current_user.is_authenticated:
         return html.Div("Inicia sesión primero.")
 
+    # Todo sale del resumen del socio (una fila por llave primaria)
+    resumen = obtener_resumen(current_user.id)
+
     # --- 1. CÁLCULO DE AHORROS (EL DATO ESTRELLA) ---
-    ahorros_totales = db.session.query(db.func.sum(Aporte.monto)).filter(
-        Aporte.usuario_id == current_user.id,
-        Aporte.estado == 'Aprobado'
-    ).scalar() or 0
+    ahorros_totales = resumen.ahorro_total if resumen else 0
 
     # --- 2. CÁLCULO DE DEUDAS (SECUNDARIO) ---
-    proxima_cuota = Cuota.query.join(Prestamo).filter(
-        Prestamo.usuario_id == current_user.id,
-        Cuota.estado.in_(['Pendiente', 'Mora'])
-    ).order_by(Cuota.fecha_vencimiento.asc()).first()
-
-    if proxima_cuota:
-        fecha_texto = proxima_cuota.fecha_vencimiento.strftime('%d-%b-%Y')
-        valor_deuda = f"${proxima_cuota.monto_total:,.0f}"
-        if proxima_cuota.estado == 'Mora':
+    if resumen and resumen.proxima_cuota_id:
+        fecha_texto = resumen.proxima_cuota_fecha.strftime('%d-%b-%Y')
+        valor_deuda = f"${resumen.proxima_cuota_monto:,.0f}"
+        if resumen.proxima_cuota_estado == 'Mora':
             color_deuda = "danger" 
             texto_deuda = "¡Atención! Pago Atrasado"
             icono_deuda = "🚨"
@@ -1,30 +1,45 @@
 import dash
-from dash import dcc, html, Input, Output, State, callback, dash_table
+from dash import dcc, html, Input, Output, State, callback
 import dash_bootstrap_components as dbc
 from flask_login import current_user
+from sqlalchemy import select
 from database.models import Aporte
 from database.db import db
+from database.resumen import obtener_resumen
+from database.cache_socios import cache_por_socio
 from components.navbar import crear_navbar
+from components.tabla_servidor import ColumnaServidor, crear_tabla_servidor, registrar_tabla_servidor
 from datetime import datetime
 
-# --- LAYOUT DINÁMICO ---
-def layout():
-    if not current_user.is_authenticated:
-        return html.Div("Inicia sesión primero.")
+# Historial del socio, una página a la vez (más recientes primero)
+COLUMNAS_HISTORIAL = [
+    ColumnaServidor('Fecha', 'Fecha', Aporte.fecha_registro, 'fecha'),
+    ColumnaServidor('Monto', 'Monto', Aporte.monto, 'numero'),
+    ColumnaServidor('Tipo', 'Tipo', Aporte.tipo, 'texto'),
+    ColumnaServidor('Estado', 'Estado', Aporte.estado, 'texto'),
+]
 
-    # Cargar historial de aportes del usuario
-    mis_aportes = Aporte.query.filter_by(usuario_id=current_user.id).order_by(Aporte.fecha_registro.desc()).all()
-    
-    # Calcular total APROBADO (Plata real)
-    total_ahorrado = sum(a.monto for a in mis_aportes if a.estado == 'Aprobado')
-    
-    data_tabla = [{
+def consultar_mis_aportes():
+    return select(Aporte.fecha_registro, Aporte.monto, Aporte.tipo, Aporte.estado, Aporte.notas).where(Aporte.usuario_id == current_user.id)
+
+def fila_historial(a):
+    return {
         'Fecha': a.fecha_registro.strftime('%Y-%m-%d'),
         'Monto': f"${a.monto:,.0f}",
         'Tipo': a.tipo,
         'Estado': a.estado,
         'Notas': a.notas
-    } for a in mis_aportes]
+    }
+
+# --- LAYOUT DINÁMICO (cacheado por socio hasta que cambien sus datos) ---
+@cache_por_socio('mis_aportes')
+def layout():
+    if not current_user.is_authenticated:
+        return html.Div("Inicia sesión primero.")
+
+    # Total APROBADO (Plata real), del resumen del socio
+    resumen = obtener_resumen(current_user.id)
+    total_ahorrado = resumen.ahorro_total if resumen else 0
 
     return html.Div([
         crear_navbar(),
@@ -78,10 +93,8 @@ def layout():
                     dbc.Card([
                         dbc.CardHeader("📜 Historial de Movimientos"),
                         dbc.CardBody([
-                            dash_table.DataTable(
-                                data=data_tabla,
-                                columns=[{'name': i, 'id': i} for i in ['Fecha', 'Monto', 'Tipo', 'Estado']],
-                                page_size=10,
+                            crear_tabla_servidor(
+                                'tabla-mis-aportes', COLUMNAS_HISTORIAL, page_size=10,
                                 style_cell={'textAlign': 'center'},
                                 style_data_conditional=[
                                     {'if': {'filter_query': '{Estado} = "Pendiente"'}, 'color': 'orange', 'fontWeight': 'bold'},
@@ -97,6 +110,9 @@ def layout():
     ])
 
 # --- CALLBACKS ---
+registrar_tabla_servidor('tabla-mis-aportes', consultar_mis_aportes, COLUMNAS_HISTORIAL, Aporte.id, fila_historial,
+                         orden_descendente=True)
+
 @callback(
     Output("msg-aporte", "children"),
     Input("btn-enviar-aporte", "n_clicks"),
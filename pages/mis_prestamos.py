@@ -2,18 +2,21 @@ import dash
 from dash import dcc, html, Input, Output, callback, dash_table
 import dash_bootstrap_components as dbc
 from flask_login import current_user
-from database.models import Prestamo, Cuota
-from database.db import db
+from database.queries import prestamos_de_socio, prestamo_con_plan
+from database.cache_socios import cache_por_socio
 from components.navbar import crear_navbar
+from utils.financiero import valor_liquidacion
+from datetime import date
 import pandas as pd
 
-# --- FUNCION LAYOUT (Dinámica) ---
+# --- FUNCION LAYOUT (Dinámica, cacheada por socio hasta que cambien sus datos) ---
+@cache_por_socio('mis_prestamos')
 def layout():
     if not current_user.is_authenticated:
         return html.Div("Por favor inicia sesión.")
 
     # Buscar préstamos del usuario logueado
-    mis_prestamos = Prestamo.query.filter_by(usuario_id=current_user.id).all()
+    mis_prestamos = prestamos_de_socio(current_user.id)
     
     # Opciones para el Dropdown
     opciones_prestamos = [
@@ -64,9 +67,10 @@ def mostrar_detalle(prestamo_id):
     if not prestamo_id:
         return dash.no_update
     
-    # 1. Obtener datos del préstamo y sus cuotas
-    prestamo = Prestamo.query.get(prestamo_id)
-    cuotas = Cuota.query.filter_by(prestamo_id=prestamo_id).order_by(Cuota.numero_cuota).all()
+    # 1. Obtener datos del préstamo y sus cuotas (solo si es del socio)
+    prestamo, cuotas = prestamo_con_plan(prestamo_id, current_user.id)
+    if prestamo is None:
+        return dbc.Alert("Préstamo no encontrado.", color="danger")
     
     if not cuotas:
         return dbc.Alert("Este préstamo está en revisión o rechazado (No tiene plan de pagos generado).", color="warning")
@@ -75,6 +79,15 @@ def mostrar_detalle(prestamo_id):
     total_pagar = sum(c.monto_total for c in cuotas)
     pagado = sum(c.monto_total for c in cuotas if c.estado == 'Pagado')
     porcentaje = (pagado / total_pagar) * 100 if total_pagar > 0 else 0
+
+    # Valor para cancelar hoy (forma cerrada): saldo después de las cuotas pagadas más el interés
+    # de los días corridos desde el vencimiento de la última pagada (o desde la aprobación)
+    liquidacion = None
+    if prestamo.estado == 'Activo':
+        pagadas = sum(1 for c in cuotas if c.estado == 'Pagado')
+        desde = cuotas[pagadas - 1].fecha_vencimiento if pagadas else (prestamo.fecha_aprobacion or prestamo.fecha_solicitud).date()
+        liquidacion = float(valor_liquidacion(prestamo.monto_solicitado, prestamo.tasa_interes, prestamo.cuotas_totales,
+                                              pagadas, (date.today() - desde).days))
     
     # 3. Preparar datos para la tabla
     df_cuotas = pd.DataFrame([{
@@ -94,7 +107,8 @@ def mostrar_detalle(prestamo_id):
                 dbc.Col([
                     html.H6("Progreso de Pago"),
                     dbc.Progress(label=f"{porcentaje:.1f}%", value=porcentaje, color="success", striped=True, className="mb-3"),
-                    html.P(f"Pagado: ${pagado:,.2f} / Total: ${total_pagar:,.2f}")
+                    html.P(f"Pagado: ${pagado:,.2f} / Total: ${total_pagar:,.2f}"),
+                    html.P(f"Para cancelar hoy: ${liquidacion:,.2f}", className="fw-bold") if liquidacion is not None else None
                 ])
             ]),
             html.Hr(),
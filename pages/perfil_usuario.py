@@ -4,6 +4,7 @@ import dash_bootstrap_components as dbc
 from flask_login import current_user
 from database.models import Usuario
 from database.db import db
+from database.cache_socios import invalidar_socios
 from components.navbar import crear_navbar
 
 def layout():
@@ -83,6 +84,7 @@ def actualizar_datos(n_clicks, nombre, email, telefono):
         user.nombre_completo = nombre
         user.email = email
         user.telefono = telefono
+        invalidar_socios([user.id]) # El saludo del home lleva el nombre
         db.session.commit()
         return dbc.Alert("✅ Datos actualizados.", color="success")
     except Exception as e:
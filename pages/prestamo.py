@@ -4,10 +4,12 @@ import dash_bootstrap_components as dbc
 from flask_login import current_user
 from database.models import Prestamo, Cuota
 from database.db import db
-from utils.financiero import calcular_plan_pagos
-from utils.config import TASA_INTERES_ADMIN
+from database.cache_socios import invalidar_socios
+from utils.financiero import plan_pagos_columnar, plan_a_registros, COLUMNAS_PLAN
+from utils.config import TASA_INTERES_ADMIN, CACHE_SIMULACIONES
 from components.navbar import crear_navbar
-from datetime import datetime
+from datetime import datetime, date
+from functools import lru_cache
 
 # ... (imports iguales) ...
 
@@ -75,26 +77,39 @@ def simular_prestamo(n_clicks, monto, cuotas):
     if not n_clicks or not monto or not cuotas:
         return dash.no_update, "Ingresa monto y cuotas.", True
 
-    df_plan = calcular_plan_pagos(monto, TASA_INTERES_ADMIN, cuotas)
+    tabla, resumen = renderizar_simulacion(monto, TASA_INTERES_ADMIN, cuotas, date.today())
+    return tabla, resumen, False 
+
+# --- CACHÉ DE SIMULACIONES ---
+# La simulación solo depende de (monto, tasa, plazo, fecha de inicio), así que guardamos
+# los componentes ya armados. La fecha va completa porque el día define los vencimientos.
+@lru_cache(maxsize=CACHE_SIMULACIONES)
+def renderizar_simulacion(monto, tasa, cuotas, fecha_inicio):
+    plan = plan_pagos_columnar(monto, tasa, cuotas, fecha_inicio)
     
     tabla = dash_table.DataTable(
-        data=df_plan.to_dict('records'),
-        columns=[{"name": i, "id": i} for i in df_plan.columns],
+        data=plan_a_registros(plan),
+        columns=[{"name": i, "id": i} for i in COLUMNAS_PLAN],
         style_table={'overflowX': 'auto'},
         style_cell={'textAlign': 'center', 'padding': '10px'},
         style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'},
         page_size=10
     )
     
-    valor_cuota = df_plan.iloc[0]['Valor Cuota']
-    total_pagar = df_plan['Valor Cuota'].sum()
+    valor_cuota = plan.cuota[0]
+    total_pagar = plan.cuota.sum()
     
     resumen = html.Div([
         html.P(f"Valor Cuota Aprox: ${valor_cuota:,.2f}"),
         html.P(f"Total a Pagar al final: ${total_pagar:,.2f}", className="text-primary fw-bold")
     ])
     
-    return tabla, resumen, False 
+    return tabla, resumen
+
+def estadisticas_cache_simulacion():
+    """Aciertos/fallos del caché de simulaciones (para monitoreo)."""
+    info = renderizar_simulacion.cache_info()
+    return {'aciertos': info.hits, 'fallos': info.misses, 'tamano': info.currsize, 'maximo': info.maxsize}
 
 @callback(
     Output("alerta-solicitud", "children"),
@@ -117,6 +132,7 @@ def enviar_solicitud(n_clicks, monto, cuotas):
         )
         
         db.session.add(nuevo_prestamo)
+        invalidar_socios([nuevo_prestamo.usuario_id]) # La solicitud aparece en mis_prestamos
         db.session.commit()
         
         return dbc.Alert("¡Solicitud enviada con éxito! Espera la aprobación del Admin.", color="success")
@@ -0,0 +1,122 @@
+# Tareas de mantenimiento sobre la base de datos (instance/fondo.db).
+# Uso: python tareas_db.py resumen                -> recalcula desde cero la tabla resumen_usuario y la verifica
+#      python tareas_db.py mensual                -> recalcula resumen_mensual con un GROUP BY y la verifica
+#      python tareas_db.py conciliar [--corregir]  -> compara totales_fondo contra los agregados crudos
+#      python tareas_db.py mora                    -> marca en Mora las cuotas vencidas (seguro con la app corriendo)
+#      python tareas_db.py multas [--fecha AAAA-MM-DD] -> causa las multas por mora a esa fecha (hoy por defecto)
+#      python tareas_db.py extracto archivo.csv    -> concilia un extracto bancario contra las cuotas pendientes
+#      python tareas_db.py aportes archivo.csv|xlsx -> importa depósitos de aportes (aprobados, sin duplicar)
+import argparse
+from datetime import date
+from app import server, db
+from database.resumen import (reconstruir_resumenes, verificar_resumenes,
+                              conciliar_totales_fondo, reconstruir_totales_fondo,
+                              reconstruir_resumen_mensual, verificar_resumen_mensual)
+from database.tareas import ejecutar_tarea
+from database.conciliacion import conciliar_extracto
+from database.importacion import importar_aportes, filas_csv, filas_xlsx
+
+
+def tarea_resumen(args):
+    filas = reconstruir_resumenes()
+    print(f"🔄 resumen_usuario reconstruida: {filas} socios.")
+    diferencias = verificar_resumenes()
+    for usuario_id, guardado, esperado in diferencias:
+        print(f"❌ Socio {usuario_id}: guardado={guardado} esperado={esperado}")
+    if diferencias:
+        return 1
+    print("✅ Resumen verificado contra los datos crudos.")
+    return 0
+
+
+def tarea_mensual(args):
+    filas = reconstruir_resumen_mensual()
+    print(f"🔄 resumen_mensual reconstruida: {filas} meses.")
+    diferencias = verificar_resumen_mensual()
+    for mes, guardado, esperado in diferencias:
+        print(f"❌ {mes:%Y-%m}: guardado={guardado} esperado={esperado}")
+    if diferencias:
+        return 1
+    print("✅ Resumen mensual verificado contra los datos crudos.")
+    return 0
+
+
+def tarea_conciliar(args):
+    diferencias = conciliar_totales_fondo()
+    for columna, (guardado, crudo) in diferencias.items():
+        print(f"❌ {columna}: guardado=${guardado:,.2f} crudo=${crudo:,.2f} (diferencia ${guardado - crudo:,.2f})")
+    if not diferencias:
+        print("✅ totales_fondo cuadra con los agregados crudos.")
+        return 0
+    if args.corregir:
+        reconstruir_totales_fondo()
+        print("🔄 totales_fondo reescrita con los agregados crudos.")
+        return 0
+    return 1
+
+
+def tarea_mora(args):
+    ejecucion = ejecutar_tarea('mora', origen='cli')
+    if ejecucion is None:
+        print("⏳ Otro proceso está corriendo el barrido de Mora en este momento.")
+        return 1
+    print(f"🚨 {ejecucion.filas} cuotas pasadas a Mora en {ejecucion.duracion_ms:.1f} ms.")
+    return 0
+
+
+def tarea_multas(args):
+    fecha = date.fromisoformat(args.fecha) if args.fecha else date.today()
+    ejecucion = ejecutar_tarea('multas', origen='cli', fecha=fecha)
+    if ejecucion is None:
+        print("⏳ Otro proceso está causando multas en este momento.")
+        return 1
+    print(f"💸 {ejecucion.filas} multas causadas al {fecha} en {ejecucion.duracion_ms:.1f} ms.")
+    return 0
+
+
+def tarea_extracto(args):
+    # Se lee directo del disco por bloques: sirve para extractos muy grandes
+    with open(args.archivo, newline='', encoding=args.codificacion) as archivo:
+        r = conciliar_extracto(archivo)
+    print(f"🏦 {r.lineas} abonos en {r.duracion_ms:,.0f} ms: {r.conciliadas} cuotas pagadas, "
+          f"{r.por_revisar} por revisar, {r.repetidas} ya cargados, {r.prestamos_finalizados} préstamos finalizados.")
+    return 0
+
+
+def tarea_aportes(args):
+    if args.archivo.lower().endswith('.xlsx'):
+        r = importar_aportes(filas_xlsx(args.archivo))
+    else:
+        with open(args.archivo, newline='', encoding=args.codificacion) as archivo:
+            r = importar_aportes(filas_csv(archivo))
+    print(f"📥 {r.filas} filas en {r.duracion_ms:,.0f} ms: {r.creados} aportes creados, "
+          f"{r.pendientes_aprobados} pendientes aprobados, {r.repetidos} ya importados, {r.rechazadas} con errores.")
+    for numero, socio, motivo in r.errores:
+        print(f"   fila {numero} ({socio}): {motivo}")
+    return 0 if not r.rechazadas else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tareas de mantenimiento de FONAMIG")
+    sub = parser.add_subparsers(dest="tarea", required=True)
+    sub.add_parser("resumen", help="Reconstruir y verificar resumen_usuario").set_defaults(funcion=tarea_resumen)
+    sub.add_parser("mensual", help="Reconstruir y verificar resumen_mensual").set_defaults(funcion=tarea_mensual)
+    conciliar = sub.add_parser("conciliar", help="Conciliar totales_fondo contra las tablas crudas")
+    conciliar.add_argument("--corregir", action="store_true", help="Reescribir los totales si no cuadran")
+    conciliar.set_defaults(funcion=tarea_conciliar)
+    sub.add_parser("mora", help="Marcar en Mora las cuotas vencidas").set_defaults(funcion=tarea_mora)
+    multas = sub.add_parser("multas", help="Causar multas por mora")
+    multas.add_argument("--fecha", help="Fecha de causación (AAAA-MM-DD)")
+    multas.set_defaults(funcion=tarea_multas)
+    extracto = sub.add_parser("extracto", help="Conciliar un extracto bancario (CSV)")
+    extracto.add_argument("archivo")
+    extracto.add_argument("--codificacion", default="utf-8-sig", help="Ej: latin-1 para exportaciones de Excel")
+    extracto.set_defaults(funcion=tarea_extracto)
+    aportes = sub.add_parser("aportes", help="Importar depósitos de aportes (CSV o XLSX)")
+    aportes.add_argument("archivo")
+    aportes.add_argument("--codificacion", default="utf-8-sig")
+    aportes.set_defaults(funcion=tarea_aportes)
+
+    args = parser.parse_args()
+    with server.app_context():
+        raise SystemExit(args.funcion(args))
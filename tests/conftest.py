@@ -0,0 +1,24 @@
+import pytest
+from flask import Flask
+from database.db import db
+from database.models import Usuario
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App de Flask con una base SQLite vacía (esquema de los modelos) en una carpeta temporal."""
+    server = Flask(__name__, instance_path=str(tmp_path))
+    server.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'fondo.db'}", SQLALCHEMY_TRACK_MODIFICATIONS=False)
+    db.init_app(server)
+    with server.app_context():
+        db.create_all()
+        yield server
+        db.session.remove()
+
+
+@pytest.fixture
+def socio(app):
+    usuario = Usuario(username='ana', nombre_completo='Ana Pérez', password_hash='x', activo=True)
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
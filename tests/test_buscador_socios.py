@@ -0,0 +1,34 @@
+import pytest
+from database.db import db
+from database.models import Usuario
+from components.buscador_socios import buscar_socios
+
+
+@pytest.fixture
+def socios(app):
+    db.session.add_all([
+        Usuario(username='angela', nombre_completo='Ángela Muñoz', password_hash='x'),
+        Usuario(username='ñandu', nombre_completo='Ñusta Quispe', password_hash='x'),
+        Usuario(username='andres', nombre_completo='Andrés Peña', password_hash='x'),
+    ])
+    db.session.commit()
+
+
+@pytest.mark.parametrize('texto, esperados', [
+    ('án', {'angela', 'andres'}),
+    ('AN', {'angela', 'andres'}),
+    ('ñ', {'ñandu'}),
+    ('Ñus', {'ñandu'}),
+    ('muñ', {'angela'}), # Dentro del nombre (el apellido)
+    ('pena', {'andres'}),
+])
+def test_buscar_socios_sin_tildes_ni_mayusculas(socios, texto, esperados):
+    assert {s.username for s in buscar_socios(texto)} == esperados
+
+
+def test_nombre_de_busqueda_se_actualiza_al_cambiar_el_nombre(socios):
+    usuario = Usuario.query.filter_by(username='angela').one()
+    usuario.nombre_completo = 'Ángela  Ñáñez'
+    db.session.commit()
+    assert usuario.nombre_busqueda == 'angela nanez'
+    assert [s.username for s in buscar_socios('ÑÁÑE')] == ['angela']
@@ -0,0 +1,30 @@
+import sqlite3
+from unittest import mock
+from database.db import db
+from database.models import Usuario
+import database.cache_socios as cache
+
+
+def test_error_del_cache_despues_del_commit_queda_pendiente_para_todos_los_workers(socio, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_SOCIOS_ACTIVO', True)
+    version = cache.version_socio(socio.id)
+    ocupado = sqlite3.OperationalError('database is locked')
+
+    with mock.patch.object(cache, 'subir_versiones', side_effect=ocupado):
+        db.session.get(Usuario, socio.id).telefono = '3001234567'
+        cache.invalidar_socios([socio.id])
+        db.session.commit() # No lanza: el cambio ya quedó guardado en la base
+
+        # La invalidación queda en la carpeta compartida (la ve cualquier worker) y sigue pendiente mientras falle
+        pendientes = cache._leer_pendientes()
+        assert list(pendientes.values()) == [[socio.id]]
+        assert cache._aplicar_pendientes(pendientes) == {socio.id}
+
+    db.session.expire_all()
+    assert db.session.get(Usuario, socio.id).telefono == '3001234567'
+    assert cache.version_socio(socio.id) == version
+
+    # Cuando el almacén vuelve a responder, la invalidación se aplica y el archivo desaparece
+    assert cache._aplicar_pendientes(cache._leer_pendientes()) == set()
+    assert cache._leer_pendientes() == {}
+    assert cache.version_socio(socio.id) != version
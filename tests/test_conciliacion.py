@@ -0,0 +1,48 @@
+import io
+from datetime import date, datetime
+import pytest
+from database.db import db
+from database.models import Prestamo, Cuota, MovimientoBanco
+from database.conciliacion import leer_monto, conciliar_extracto
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('50000.5', 50000.5),
+    ('1234,56', 1234.56),
+    ('50.000', 50000),
+    ('1.234.567', 1234567),
+    ('1,234,567.89', 1234567.89),
+    ('1.234.567,89', 1234567.89),
+    ('$ 50000', 50000),
+    (75000, 75000),
+    ('abc', None),
+])
+def test_leer_monto(texto, esperado):
+    assert leer_monto(texto) == esperado
+
+
+def test_lineas_identicas_no_agrupadas_por_fecha_quedan_todas(socio):
+    prestamo = Prestamo(usuario_id=socio.id, monto_solicitado=300_000, tasa_interes=0.02, cuotas_totales=3,
+                        estado='Activo', fecha_solicitud=datetime(2025, 6, 1))
+    db.session.add(prestamo)
+    db.session.flush()
+    db.session.add_all(Cuota(prestamo_id=prestamo.id, numero_cuota=n, fecha_vencimiento=date(2025, 6 + n, 1),
+                             monto_capital=100_000, monto_interes=2_000, monto_total=102_000, estado='Pendiente')
+                       for n in (1, 2, 3))
+    db.session.commit()
+
+    # La misma transferencia dos veces el 1 de julio, con otra fecha en medio (extracto sin ordenar)
+    extracto = io.StringIO("fecha,monto,referencia,saldo\n"
+                           "2025-07-01,102000,PAGO Ana Pérez,\n"
+                           "2025-08-01,102000,PAGO Ana Pérez,\n"
+                           "2025-07-01,102000,PAGO Ana Pérez,\n")
+    resultado = conciliar_extracto(extracto)
+
+    assert resultado.conciliadas == 3
+    assert db.session.query(MovimientoBanco).count() == 3
+    assert db.session.query(Cuota).filter_by(estado='Pagado').count() == 3
+
+    # Subir el mismo archivo otra vez no paga ni guarda nada
+    extracto.seek(0)
+    assert conciliar_extracto(extracto).repetidas == 3
+    assert db.session.query(MovimientoBanco).count() == 3
@@ -0,0 +1,71 @@
+from datetime import date, datetime, timedelta
+import pytest
+from database.db import db
+from database.models import Usuario, Aporte, Prestamo, Cuota
+from database.resumen import reconstruir_resumenes, reconstruir_totales_fondo, reconstruir_resumen_mensual
+from database.queries import CONSULTAS_POR_PAGINA, contar_sentencias
+
+MUCHAS = 12
+ESTADOS_CUOTA = ['Pagado', 'Pendiente', 'Mora']
+
+
+def _sembrar(socio, n):
+    """
+    El socio con n aportes y n préstamos activos de n cuotas (pagadas, pendientes y en mora, vencidas hace
+    0 a n meses), más n usuarios por activar con una solicitud cada uno. Siempre hay una solicitud sin cuotas
+    de otro socio: es el préstamo que reciben las consultas de un préstamo cuando n = 0.
+    Devuelve los argumentos de las consultas: {'usuario', 'prestamo', 'cuota'}.
+    """
+    otro = Usuario(username='otro', nombre_completo='Otro Socio', password_hash='x', activo=True)
+    db.session.add(otro)
+    db.session.flush()
+    solicitud = Prestamo(usuario_id=otro.id, monto_solicitado=100_000, tasa_interes=0.02, cuotas_totales=3,
+                         estado='Pendiente', fecha_solicitud=datetime(2025, 1, 1))
+    db.session.add(solicitud)
+
+    hoy = date.today()
+    prestamos = []
+    for i in range(n):
+        db.session.add(Aporte(usuario_id=socio.id, monto=50_000, tipo='Ahorro', estado='Aprobado',
+                              fecha_registro=datetime(2025, 1 + i % 12, 1), fecha_confirmacion=datetime(2025, 1 + i % 12, 2)))
+        nuevo = Usuario(username=f'nuevo{i}', nombre_completo=f'Nuevo {i}', password_hash='x', activo=False)
+        db.session.add(nuevo)
+        db.session.flush()
+        db.session.add(Prestamo(usuario_id=nuevo.id, monto_solicitado=100_000, tasa_interes=0.02, cuotas_totales=3,
+                                estado='Pendiente', fecha_solicitud=datetime(2025, 1, 1)))
+        prestamo = Prestamo(usuario_id=socio.id, monto_solicitado=n * 100_000, tasa_interes=0.02, cuotas_totales=n,
+                            estado='Activo', fecha_solicitud=datetime(2025, 1, 1), fecha_aprobacion=datetime(2025, 1, 2))
+        db.session.add(prestamo)
+        db.session.flush()
+        db.session.add_all(Cuota(prestamo_id=prestamo.id, numero_cuota=k + 1, fecha_vencimiento=hoy - timedelta(days=30 * (n - k)),
+                                 monto_capital=100_000, monto_interes=2_000, monto_total=102_000,
+                                 estado=ESTADOS_CUOTA[k % len(ESTADOS_CUOTA)])
+                           for k in range(n))
+        prestamos.append(prestamo)
+    db.session.commit()
+    reconstruir_resumenes()
+    reconstruir_totales_fondo()
+    reconstruir_resumen_mensual()
+
+    cuota = db.session.query(Cuota.id).filter(Cuota.prestamo_id == prestamos[-1].id).first() if prestamos else None
+    return {'usuario': socio.id,
+            'prestamo': prestamos[-1].id if prestamos else solicitud.id,
+            'cuota': cuota.id if cuota else 0}
+
+
+@pytest.fixture(params=[0, MUCHAS], ids=['sin datos', f'{MUCHAS} de cada uno'])
+def argumentos(request, socio):
+    return _sembrar(socio, request.param)
+
+
+def _sentencias(funcion, nombres, argumentos):
+    db.session.expunge_all() # Sin objetos en memoria: cada relación que se toque va a la base
+    with contar_sentencias() as sentencias:
+        funcion(*[argumentos[nombre] for nombre in nombres])
+    return len(sentencias)
+
+
+@pytest.mark.parametrize('nombre, funcion, nombres, esperadas', CONSULTAS_POR_PAGINA,
+                         ids=[c[0] for c in CONSULTAS_POR_PAGINA])
+def test_sentencias_por_consulta_no_dependen_de_las_filas(argumentos, nombre, funcion, nombres, esperadas):
+    assert _sentencias(funcion, nombres, argumentos) == esperadas
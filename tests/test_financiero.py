@@ -0,0 +1,24 @@
+import pytest
+from utils.financiero import factor_anualidad, calcular_cuota_fija
+
+
+def test_factor_anualidad():
+    assert factor_anualidad(0, 4) == pytest.approx(0.25)
+    assert calcular_cuota_fija(1000, 0.05, 1) == pytest.approx(1050)
+
+
+@pytest.mark.parametrize('num_cuotas', [0, -3])
+def test_factor_anualidad_rechaza_plazos_sin_cuotas(num_cuotas):
+    with pytest.raises(ValueError):
+        factor_anualidad(0.05, num_cuotas)
+
+
+def test_factor_anualidad_con_hilos_que_amplian_la_tabla():
+    from concurrent.futures import ThreadPoolExecutor
+    from utils.config import CUOTAS_MAXIMAS
+    tasa = 0.0123 # Tasa nueva: la tabla se crea y se amplía mientras otros hilos la leen
+    plazos = [CUOTAS_MAXIMAS + k for k in range(1, 200)] * 5
+    with ThreadPoolExecutor(max_workers=16) as hilos:
+        factores = list(hilos.map(lambda n: factor_anualidad(tasa, n), plazos))
+    for n, factor in zip(plazos, factores):
+        assert factor == pytest.approx(tasa * (1 + tasa) ** n / ((1 + tasa) ** n - 1))
@@ -0,0 +1,18 @@
+import io
+from datetime import date
+from database.importacion import importar_aportes, filas_csv
+from database.resumen import obtener_resumen_mensual, verificar_resumen_mensual
+
+
+def test_importar_historial_reparte_los_aportes_por_mes_del_deposito(socio):
+    archivo = io.StringIO("socio,fecha,monto,referencia\n"
+                          "Ana Pérez,2025-01-10,100000,ene\n"
+                          "Ana Pérez,2025-02-10,150000,feb\n"
+                          "Ana Pérez,2025-03-10,200000,mar\n"
+                          "Ana Pérez,2025-03-25,50000,mar2\n")
+    resultado = importar_aportes(filas_csv(archivo))
+    assert resultado.creados == 4
+
+    meses = {r.mes: (r.aportes, r.cantidad_aportes) for r in obtener_resumen_mensual()}
+    assert meses == {date(2025, 1, 1): (100_000, 1), date(2025, 2, 1): (150_000, 1), date(2025, 3, 1): (250_000, 2)}
+    assert verificar_resumen_mensual() == []
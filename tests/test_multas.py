@@ -0,0 +1,37 @@
+from datetime import date, datetime
+from sqlalchemy import func
+from database.db import db
+from database.models import Prestamo, Cuota, Multa
+from database.tareas import causar_multas
+
+
+def _total_multas():
+    return db.session.query(func.count(Multa.id), func.sum(Multa.monto)).one()
+
+
+def test_causar_multas_fuera_de_orden_no_cobra_doble(socio):
+    prestamo = Prestamo(usuario_id=socio.id, monto_solicitado=300_000, tasa_interes=0.02, cuotas_totales=3,
+                        estado='Activo', fecha_solicitud=datetime(2025, 6, 1))
+    db.session.add(prestamo)
+    db.session.flush()
+    db.session.add_all(Cuota(prestamo_id=prestamo.id, numero_cuota=n, fecha_vencimiento=date(2025, 6 + n, 1),
+                             monto_capital=100_000, monto_interes=2_000, monto_total=102_000, estado='Mora')
+                       for n in (1, 2, 3))
+    db.session.commit()
+
+    assert causar_multas(date(2025, 9, 20)) == 3
+    db.session.commit()
+    despues_del_20 = _total_multas()
+
+    # Un día anterior (o el mismo día otra vez) no agrega nada: lo causado al 20 ya cubre el 15
+    assert causar_multas(date(2025, 9, 15)) == 0
+    assert causar_multas(date(2025, 9, 20)) == 0
+    db.session.commit()
+    assert _total_multas() == despues_del_20
+
+    # Un día posterior solo causa la diferencia
+    causar_multas(date(2025, 9, 30))
+    db.session.commit()
+    cantidad, total = _total_multas()
+    assert cantidad == 6
+    assert round(total, 2) == round(102_000 * 0.02 * (91 + 60 + 29) / 30, 2) # Días de mora al 30 de septiembre
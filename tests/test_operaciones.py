@@ -0,0 +1,20 @@
+from datetime import date, datetime
+from sqlalchemy import select, func
+from database.db import db
+from database.models import Prestamo, Cuota, EjecucionTarea
+from database.operaciones import aprobar_prestamos
+
+
+def test_aprobar_prestamos_devuelve_filas_y_tiempo_sin_tocar_la_bitacora_de_tareas(socio):
+    prestamo = Prestamo(usuario_id=socio.id, monto_solicitado=300_000, tasa_interes=0.02, cuotas_totales=3,
+                        estado='Pendiente', fecha_solicitud=datetime(2025, 6, 1))
+    db.session.add(prestamo)
+    db.session.commit()
+
+    resultado = aprobar_prestamos([prestamo.id, 999], fecha_inicio=date(2025, 6, 1))
+    assert resultado.procesados == [prestamo.id]
+    assert resultado.omitidos == [999]
+    assert resultado.filas == 1 + 3 # El préstamo y sus cuotas
+    assert resultado.duracion_ms >= 0
+    assert db.session.execute(select(func.count(Cuota.id))).scalar() == 3
+    assert db.session.execute(select(func.count(EjecucionTarea.id))).scalar() == 0
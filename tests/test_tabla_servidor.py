@@ -0,0 +1,38 @@
+import json
+from datetime import datetime
+from sqlalchemy import select
+from database.db import db
+from database.models import Aporte
+from components.tabla_servidor import ColumnaServidor, consultar_pagina
+
+COLUMNAS = [
+    ColumnaServidor('ID', 'ID', Aporte.id, 'numero'),
+    ColumnaServidor('Monto ($)', 'Monto', Aporte.monto, 'numero'),
+]
+
+
+def _recorrer(page_size, sort_by, por_llave=True):
+    """IDs de todas las páginas en orden (por llave con los cursores, o por OFFSET sin ellos)."""
+    ids, cursores, pagina = [], None, 0
+    while True:
+        filas, total_paginas, nuevos = consultar_pagina(select(Aporte.id), COLUMNAS, Aporte.id, pagina, page_size,
+                                                        sort_by, None, cursores)
+        ids += [f.id for f in filas]
+        if por_llave:
+            cursores = json.loads(json.dumps(nuevos)) # Como vuelven del dcc.Store
+        pagina += 1
+        if pagina >= total_paginas:
+            return ids
+
+
+def test_paginacion_por_llave_ordenada_por_monto(socio):
+    # Montos con centavos y repetidos: el cursor (en pesos) debe compararse en centavos contra la columna
+    montos = [50_000.5, 12_000, 50_000.5, 75_000.25, 12_000, 30_000, 99_999.99, 1_000.01, 30_000, 45_500.75] * 4
+    db.session.add_all(Aporte(usuario_id=socio.id, monto=m, fecha_registro=datetime(2025, 1, 1)) for m in montos)
+    db.session.commit()
+
+    for direccion in ('asc', 'desc'):
+        sort_by = [{'column_id': 'Monto ($)', 'direction': direccion}]
+        por_llave = _recorrer(10, sort_by)
+        assert len(por_llave) == len(montos) == len(set(por_llave))
+        assert por_llave == _recorrer(10, sort_by, por_llave=False)
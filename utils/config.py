@@ -7,4 +7,33 @@ TASA_INTERES_ADMIN = 0.05
 # Límites (Opcional, para evitar errores locos)
 MONTO_MINIMO = 10000
 MONTO_MAXIMO = 5000000
-CUOTAS_MAXIMAS = 24
\ No newline at end of file
+CUOTAS_MAXIMAS = 24
+
+# Cantidad de simulaciones de préstamo que se guardan ya renderizadas (caché LRU de /prestamo)
+CACHE_SIMULACIONES = 256
+
+# Caché por socio de home, mis_aportes y mis_prestamos (archivo SQLite en instance/, compartido por los workers)
+CACHE_SOCIOS_ACTIVO = True
+CACHE_SOCIOS_MAXIMO = 5000 # Páginas guardadas; las menos usadas se borran
+
+# Figuras y KPIs del Dashboard ya serializados, por versión de los totales del fondo (caché LRU por proceso)
+CACHE_FIGURAS = 64
+
+# Tareas programadas dentro del proceso de la app (barrido de Mora, etc.)
+# Con varios workers de gunicorn solo uno ejecuta cada tarea gracias al candado en la BD.
+PROGRAMADOR_TAREAS_ACTIVO = True
+INTERVALO_TAREAS_MINUTOS = 60
+
+# Multas por mora: interés mensual sobre el valor de la cuota vencida
+TASA_MORA_MENSUAL = 0.02
+MODO_CAUSACION_MORA = 'diaria' # 'diaria' (proporcional a los días) o 'mensual' (por mes completo vencido)
+DIAS_GRACIA_MORA = 0
+
+# Instrumentación SQL: sentencias y tiempo por callback / ruta (página /admin_sql)
+INSTRUMENTACION_SQL_ACTIVA = True
+UMBRAL_CONSULTA_LENTA_MS = 200 # Más lentas que esto se registran con parámetros y EXPLAIN QUERY PLAN
+CONSULTAS_LENTAS_GUARDADAS = 100
+
+# Perfilador por muestreo (se arma desde /admin_sql; los perfiles quedan en instance/perfiles/)
+INTERVALO_PERFILADOR_MS = 1 # Cada cuánto se toma la pila de la petición perfilada
+PERFILES_GUARDADOS = 50 # Los más viejos se borran
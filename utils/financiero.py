@@ -1,6 +1,169 @@
+import threading
+import numpy as np
 import pandas as pd
-from datetime import date, timedelta
-from dateutil.relativedelta import relativedelta
+from collections import namedtuple
+from datetime import date
+from utils.config import TASA_INTERES_ADMIN, CUOTAS_MAXIMAS, TASA_MORA_MENSUAL, MODO_CAUSACION_MORA, DIAS_GRACIA_MORA
+
+# Columnas con las que las páginas muestran/insertan el plan (se mantienen por compatibilidad)
+COLUMNAS_PLAN = ['Cuota #', 'Fecha Pago', 'Valor Cuota', 'Interés', 'Abono Capital', 'Saldo Restante']
+
+# Resultado columnar: cada campo es un arreglo de NumPy con una posición por cuota
+PlanPagos = namedtuple('PlanPagos', ['numero', 'fecha', 'cuota', 'interes', 'capital', 'saldo'])
+
+
+def sumar_meses(fecha_inicio, meses):
+    """
+    Suma meses a una fecha de forma vectorizada (mismo resultado que relativedelta).
+    Si el día no existe en el mes destino (ej: 31 de febrero) se usa el último día del mes.
+    fecha_inicio: una fecha o un arreglo de fechas (del mismo largo que meses).
+    meses: arreglo de enteros. Devuelve un arreglo datetime64[D].
+    """
+    meses = np.asarray(meses, dtype=np.int64)
+    fechas = np.asarray(fecha_inicio, dtype='datetime64[D]')
+    mes_origen = fechas.astype('datetime64[M]')
+    dia_origen = (fechas - mes_origen.astype('datetime64[D]')).astype(np.int64) + 1
+
+    inicio_mes = mes_origen + meses
+    dias_mes = ((inicio_mes + 1).astype('datetime64[D]') - inicio_mes.astype('datetime64[D]')).astype(np.int64)
+    dia = np.minimum(dia_origen, dias_mes)
+    return inicio_mes.astype('datetime64[D]') + (dia - 1)
+
+
+# --- TABLA PRECALCULADA DE FACTORES ---
+# Por cada tasa guardamos (1+r)^k para k = 0..n y el factor de anualidad r(1+r)^n / ((1+r)^n - 1)
+# para cada plazo. La tasa fija del fondo se precalcula al importar; otras tasas se agregan al usarse.
+# Las dos tablas de una tasa van juntas en una tupla que se reemplaza entera: un hilo nunca ve una
+# ampliada y la otra no. El candado evita que dos hilos que amplían a la vez dejen la más corta.
+_TABLAS = {} # tasa -> (potencias, factores)
+_candado_tablas = threading.Lock()
+
+
+def _extender_tabla(tasa_mensual, num_cuotas):
+    """Calcula (o amplía) las potencias y factores de una tasa hasta num_cuotas. Devuelve (potencias, factores)."""
+    with _candado_tablas:
+        tablas = _TABLAS.get(tasa_mensual)
+        if tablas is not None and len(tablas[1]) >= num_cuotas:
+            return tablas # Otro hilo ya la amplió
+        potencias = (1 + tasa_mensual) ** np.arange(num_cuotas + 1, dtype=np.float64)
+        if tasa_mensual > 0:
+            factores = tasa_mensual * potencias[1:] / (potencias[1:] - 1)
+        else:
+            factores = 1 / np.arange(1, num_cuotas + 1, dtype=np.float64)
+        _TABLAS[tasa_mensual] = tablas = (potencias, factores)
+        return tablas
+
+
+def _tablas_tasa(tasa_mensual, num_cuotas):
+    tablas = _TABLAS.get(tasa_mensual)
+    if tablas is None or len(tablas[1]) < num_cuotas:
+        tablas = _extender_tabla(tasa_mensual, max(num_cuotas, CUOTAS_MAXIMAS))
+    return tablas
+
+
+def potencias_tasa(tasa_mensual, num_cuotas):
+    """Arreglo (1+r)^k para k = 0..num_cuotas, tomado de la tabla precalculada."""
+    return _tablas_tasa(tasa_mensual, num_cuotas)[0][:num_cuotas + 1]
+
+
+def factor_anualidad(tasa_mensual, num_cuotas):
+    """Factor F tal que cuota = monto * F (Sistema Francés). Con tasa 0% es 1/n. ValueError si num_cuotas < 1."""
+    if num_cuotas < 1: # Un índice 0 o negativo leería el factor de otro plazo de la tabla
+        raise ValueError(f"num_cuotas debe ser al menos 1 (llegó {num_cuotas})")
+    return _tablas_tasa(tasa_mensual, num_cuotas)[1][num_cuotas - 1]
+
+
+_extender_tabla(TASA_INTERES_ADMIN, CUOTAS_MAXIMAS)
+
+
+def calcular_cuota_fija(monto, tasa_mensual, num_cuotas):
+    """Valor de la cuota fija (Sistema Francés): R = P * (r * (1+r)^n) / ((1+r)^n - 1)."""
+    return monto * factor_anualidad(tasa_mensual, num_cuotas)
+
+
+def _a_centavos(montos, prestamo, cuotas, valor_cuota, interes):
+    """
+    Pasa un plan (uno o varios préstamos) a centavos enteros int64.
+    Cada cuota se redondea una vez y la última cuota de cada préstamo absorbe
+    el residuo, así la suma del capital es exactamente el monto prestado.
+    """
+    montos_c = np.rint(np.asarray(montos, dtype=np.float64) * 100).astype(np.int64)
+    cuota_c = np.rint(valor_cuota * 100).astype(np.int64)
+    interes_c = np.rint(interes * 100).astype(np.int64)
+    capital_c = cuota_c - interes_c
+
+    ultimas = np.cumsum(cuotas) - 1
+    residuo = montos_c - np.bincount(prestamo, weights=capital_c, minlength=len(montos_c)).astype(np.int64)
+    capital_c[ultimas] += residuo
+    cuota_c[ultimas] += residuo
+
+    # Saldo = monto - capital acumulado dentro de cada préstamo
+    acumulado = np.cumsum(capital_c)
+    previo = np.concatenate(([0], acumulado[ultimas][:-1]))
+    saldo_c = montos_c[prestamo] - (acumulado - previo[prestamo])
+    return cuota_c, interes_c, capital_c, saldo_c
+
+
+def plan_pagos_columnar(monto, tasa_mensual, num_cuotas, fecha_inicio=None, en_centavos=False):
+    """
+    Genera la tabla de amortización (Sistema Francés) sin ciclos de Python.
+    El saldo de cada periodo sale de la fórmula cerrada
+    B_k = P*(1+r)^k - R*((1+r)^k - 1)/r, así que interés, capital y saldo
+    se calculan para todas las cuotas a la vez.
+    Devuelve un PlanPagos con los valores redondeados a 2 decimales, o en
+    centavos enteros (int64) si en_centavos=True.
+    """
+    if fecha_inicio is None:
+        fecha_inicio = date.today()
+
+    cuota = calcular_cuota_fija(monto, tasa_mensual, num_cuotas)
+
+    if tasa_mensual > 0:
+        factor = potencias_tasa(tasa_mensual, num_cuotas)
+        saldos = monto * factor - cuota * (factor - 1) / tasa_mensual
+    else:
+        saldos = monto - cuota * np.arange(num_cuotas + 1, dtype=np.float64)
+
+    interes = saldos[:-1] * tasa_mensual
+    capital = cuota - interes
+    saldo = np.maximum(saldos[1:], 0)
+
+    numero = np.arange(1, num_cuotas + 1, dtype=np.int64)
+    if en_centavos:
+        cuota_c, interes_c, capital_c, saldo_c = _a_centavos(
+            [monto], np.zeros(num_cuotas, dtype=np.int64), [num_cuotas], np.full(num_cuotas, cuota), interes
+        )
+        return PlanPagos(numero=numero, fecha=sumar_meses(fecha_inicio, numero),
+                         cuota=cuota_c, interes=interes_c, capital=capital_c, saldo=saldo_c)
+
+    return PlanPagos(
+        numero=numero,
+        fecha=sumar_meses(fecha_inicio, numero),
+        cuota=np.full(num_cuotas, round(cuota, 2)),
+        interes=np.round(interes, 2),
+        capital=np.round(capital, 2),
+        saldo=np.round(saldo, 2)
+    )
+
+
+def plan_a_registros(plan):
+    """Convierte un PlanPagos en lista de diccionarios (formato 'data' de DataTable)."""
+    columnas = zip(plan.numero.tolist(), plan.fecha.astype(object), plan.cuota.tolist(),
+                   plan.interes.tolist(), plan.capital.tolist(), plan.saldo.tolist())
+    return [dict(zip(COLUMNAS_PLAN, fila)) for fila in columnas]
+
+
+def plan_a_dataframe(plan):
+    """Adaptador: PlanPagos -> DataFrame con las columnas históricas."""
+    return pd.DataFrame({
+        'Cuota #': plan.numero,
+        'Fecha Pago': plan.fecha.astype(object),
+        'Valor Cuota': plan.cuota,
+        'Interés': plan.interes,
+        'Abono Capital': plan.capital,
+        'Saldo Restante': plan.saldo
+    })
+
 
 def calcular_plan_pagos(monto, tasa_mensual, num_cuotas, fecha_inicio=None):
     """
@@ -8,34 +171,153 @@ def calcular_plan_pagos(monto, tasa_mensual, num_cuotas, fecha_inicio=None):
     monto: Cantidad prestada.
     tasa_mensual: Interés en decimal (ej: 0.02 para 2%).
     num_cuotas: Cantidad de meses.
+    Se mantiene para código que espera un DataFrame; el cálculo lo hace plan_pagos_columnar.
     """
-    if fecha_inicio is None:
-        fecha_inicio = date.today()
-        
-    # Fórmula de cuota fija: R = P * (r * (1+r)^n) / ((1+r)^n - 1)
-    if tasa_mensual > 0:
-        cuota = monto * (tasa_mensual * (1 + tasa_mensual)**num_cuotas) / ((1 + tasa_mensual)**num_cuotas - 1)
+    return plan_a_dataframe(plan_pagos_columnar(monto, tasa_mensual, num_cuotas, fecha_inicio))
+
+
+# Bloque plano de cuotas para varios préstamos: 'prestamo' es el índice del préstamo en los arreglos de entrada
+PlanesLote = namedtuple('PlanesLote', ['prestamo', 'numero', 'fecha', 'cuota', 'interes', 'capital', 'saldo'])
+
+
+def calcular_planes_lote(montos, tasas, cuotas, fechas_inicio, en_centavos=False):
+    """
+    Genera los planes de pago de muchos préstamos en una sola pasada vectorizada.
+    montos, tasas, cuotas, fechas_inicio: arreglos del mismo largo (uno por préstamo).
+    Devuelve un PlanesLote con una fila por cuota, ordenado por préstamo y número de cuota
+    (en centavos enteros int64 si en_centavos=True).
+    """
+    montos = np.asarray(montos, dtype=np.float64)
+    tasas = np.asarray(tasas, dtype=np.float64)
+    cuotas = np.asarray(cuotas, dtype=np.int64)
+    fechas_inicio = np.asarray(fechas_inicio, dtype='datetime64[D]')
+
+    # Cuota fija de cada préstamo (tasa 0% -> monto / n)
+    con_interes = tasas > 0
+    tasa_segura = np.where(con_interes, tasas, 1.0)
+    factor_n = (1 + tasas) ** cuotas
+    valor_cuota = np.where(con_interes,
+                           montos * (tasas * factor_n) / np.where(con_interes, factor_n - 1, 1.0),
+                           montos / cuotas)
+
+    # Expandir a una fila por cuota
+    prestamo = np.repeat(np.arange(len(montos)), cuotas)
+    inicio_bloque = np.repeat(np.cumsum(cuotas) - cuotas, cuotas)
+    numero = np.arange(len(prestamo), dtype=np.int64) - inicio_bloque + 1
+
+    P = montos[prestamo]
+    r = tasas[prestamo]
+    R = valor_cuota[prestamo]
+    conint = con_interes[prestamo]
+
+    # Saldo antes y después de cada cuota (fórmula cerrada)
+    factor_ant = (1 + r) ** (numero - 1)
+    factor_act = factor_ant * (1 + r)
+    saldo_ant = np.where(conint, P * factor_ant - R * (factor_ant - 1) / tasa_segura[prestamo], P - R * (numero - 1))
+    saldo_act = np.where(conint, P * factor_act - R * (factor_act - 1) / tasa_segura[prestamo], P - R * numero)
+
+    interes = saldo_ant * r
+    fecha = sumar_meses(fechas_inicio[prestamo], numero)
+    if en_centavos:
+        cuota_c, interes_c, capital_c, saldo_c = _a_centavos(montos, prestamo, cuotas, R, interes)
+        return PlanesLote(prestamo=prestamo, numero=numero, fecha=fecha,
+                          cuota=cuota_c, interes=interes_c, capital=capital_c, saldo=saldo_c)
+
+    return PlanesLote(
+        prestamo=prestamo,
+        numero=numero,
+        fecha=fecha,
+        cuota=np.round(R, 2),
+        interes=np.round(interes, 2),
+        capital=np.round(R - interes, 2),
+        saldo=np.round(np.maximum(saldo_act, 0), 2)
+    )
+
+
+def lote_a_filas_cuotas(lote, prestamo_ids, estado='Pendiente'):
+    """
+    Convierte un PlanesLote en filas para insertar en bloque en la tabla 'cuotas'
+    (db.session.execute(insert(Cuota), filas)). prestamo_ids[i] es el ID del préstamo i.
+    Si el lote viene en centavos se entrega en pesos: el tipo Dinero los vuelve a centavos al guardar.
+    """
+    ids = np.asarray(prestamo_ids, dtype=np.int64)[lote.prestamo]
+    escala = 100 if lote.cuota.dtype.kind == 'i' else 1
+    columnas = zip(ids.tolist(), lote.numero.tolist(), lote.fecha.astype(object),
+                   (lote.capital / escala).tolist(), (lote.interes / escala).tolist(), (lote.cuota / escala).tolist())
+    return [{
+        'prestamo_id': prestamo_id,
+        'numero_cuota': numero,
+        'fecha_vencimiento': fecha,
+        'monto_capital': capital,
+        'monto_interes': interes,
+        'monto_total': total,
+        'estado': estado
+    } for prestamo_id, numero, fecha, capital, interes, total in columnas]
+
+
+# --- CONSULTAS EN FORMA CERRADA (sin generar el plan) ---
+# Todas aceptan escalares o arreglos de NumPy (uno por préstamo), así que sirven
+# igual para un préstamo que para toda la cartera activa.
+
+def _saldo_y_cuota(montos, tasas, cuotas, pagadas):
+    """Saldo sin redondear después de 'pagadas' cuotas, cuota fija y cuotas restantes."""
+    montos = np.asarray(montos, dtype=np.float64)
+    tasas = np.asarray(tasas, dtype=np.float64)
+    cuotas = np.asarray(cuotas, dtype=np.int64)
+    pagadas = np.minimum(np.asarray(pagadas, dtype=np.int64), cuotas)
+
+    con_interes = tasas > 0
+    tasa_segura = np.where(con_interes, tasas, 1.0)
+    factor_n = (1 + tasas) ** cuotas
+    factor_k = (1 + tasas) ** pagadas
+    cuota = np.where(con_interes, montos * tasas * factor_n / np.where(con_interes, factor_n - 1, 1.0), montos / cuotas)
+    saldo = np.where(con_interes, montos * factor_k - cuota * (factor_k - 1) / tasa_segura, montos - cuota * pagadas)
+    return np.maximum(saldo, 0), cuota, cuotas - pagadas
+
+
+def saldo_pendiente(montos, tasas, cuotas, pagadas):
+    """
+    Capital que se debe después de pagar 'pagadas' cuotas:
+    B_k = P*(1+r)^k - R*((1+r)^k - 1)/r   (con tasa 0%: P - R*k).
+    """
+    saldo, _, _ = _saldo_y_cuota(montos, tasas, cuotas, pagadas)
+    return np.round(saldo, 2)
+
+
+def intereses_restantes(montos, tasas, cuotas, pagadas):
+    """Intereses que faltan por cobrar: cuotas restantes * R - saldo pendiente."""
+    saldo, cuota, restantes = _saldo_y_cuota(montos, tasas, cuotas, pagadas)
+    return np.round(np.maximum(cuota * restantes - saldo, 0), 2)
+
+
+def valor_liquidacion(montos, tasas, cuotas, pagadas, dias_corridos=0):
+    """
+    Monto para cancelar el préstamo hoy: saldo pendiente más el interés causado
+    en los días corridos del periodo actual (mes comercial de 30 días).
+    """
+    saldo, _, _ = _saldo_y_cuota(montos, tasas, cuotas, pagadas)
+    dias = np.clip(np.asarray(dias_corridos, dtype=np.float64), 0, 30)
+    return np.round(saldo * (1 + np.asarray(tasas, dtype=np.float64) * dias / 30), 2)
+
+
+# --- MULTAS POR MORA ---
+def calcular_multas_mora(montos_cuota, dias_vencidos, ya_causado,
+                         tasa_mensual=TASA_MORA_MENSUAL, modo=MODO_CAUSACION_MORA, dias_gracia=DIAS_GRACIA_MORA):
+    """
+    Multa pendiente de causar para muchas cuotas a la vez (arreglos, una posición por cuota).
+    Se calcula la multa total a la fecha y se resta lo ya causado, así correr de nuevo
+    (o después de saltarse días) nunca cobra doble.
+    modo 'diaria': monto * tasa * días / 30. modo 'mensual': monto * tasa * meses completos vencidos.
+    Devuelve (multa por causar, días de mora) con la multa redondeada a centavos.
+    """
+    montos_cuota = np.asarray(montos_cuota, dtype=np.float64)
+    ya_causado = np.asarray(ya_causado, dtype=np.float64)
+    dias = np.maximum(np.asarray(dias_vencidos, dtype=np.int64) - dias_gracia, 0)
+
+    if modo == 'mensual':
+        periodos = dias // 30
     else:
-        cuota = monto / num_cuotas # Si la tasa es 0% (préstamos familiares sin interés)
-
-    saldo = monto
-    plan = []
-
-    for i in range(1, num_cuotas + 1):
-        interes = saldo * tasa_mensual
-        capital = cuota - interes
-        saldo -= capital
-        
-        # Fecha de vencimiento (mes a mes)
-        vencimiento = fecha_inicio + relativedelta(months=i)
-        
-        plan.append({
-            'Cuota #': i,
-            'Fecha Pago': vencimiento,
-            'Valor Cuota': round(cuota, 2),
-            'Interés': round(interes, 2),
-            'Abono Capital': round(capital, 2),
-            'Saldo Restante': round(saldo if saldo > 0 else 0, 2)
-        })
-        
-    return pd.DataFrame(plan)
\ No newline at end of file
+        periodos = dias / 30
+
+    total = np.rint(montos_cuota * tasa_mensual * periodos * 100) / 100
+    return np.maximum(np.round(total - ya_causado, 2), 0), dias
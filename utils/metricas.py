@@ -0,0 +1,215 @@
+import functools
+import os
+import platform
+import socket
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, jsonify, request, g
+from sqlalchemy import text
+from database.db import db, origen_peticion, estadisticas_sql
+
+# Métricas de este proceso (cada worker de gunicorn expone las suyas; la etiqueta pid las distingue)
+# Límites de los histogramas: segundos para latencias y bytes para el tamaño de las respuestas
+LIMITES_SEGUNDOS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+LIMITES_BYTES = [1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000]
+
+INICIO_PROCESO = time.time()
+_candado = threading.Lock()
+_histogramas = {} # (métrica, etiqueta) -> [conteos por límite..., +Inf], suma
+_contadores = {} # (métrica, etiqueta) -> valor
+
+DESCRIPCIONES = {
+    'fondo_callback_duracion_segundos': ('histogram', 'Latencia de cada callback de Dash', 'callback'),
+    'fondo_callback_respuesta_bytes': ('histogram', 'Tamaño de la respuesta de cada callback', 'callback'),
+    'fondo_callback_errores_total': ('counter', 'Callbacks que terminaron con error (5xx o excepción)', 'callback'),
+    'fondo_layout_duracion_segundos': ('histogram', 'Tiempo de armar el layout de cada página', 'pagina'),
+    'fondo_layout_errores_total': ('counter', 'Layouts que lanzaron una excepción', 'pagina'),
+    'fondo_healthz_db_segundos': ('histogram', 'Ida y vuelta a la base en /healthz', None),
+}
+
+
+# =========================================================
+# REGISTRO
+# =========================================================
+def observar(metrica, valor, etiqueta=''):
+    limites = LIMITES_BYTES if metrica.endswith('_bytes') else LIMITES_SEGUNDOS
+    with _candado:
+        conteos, suma = _histogramas.get((metrica, etiqueta), ([0] * (len(limites) + 1), 0.0))
+        conteos[bisect_left(limites, valor)] += 1
+        _histogramas[(metrica, etiqueta)] = (conteos, suma + valor)
+
+
+def contar(metrica, etiqueta='', cantidad=1):
+    with _candado:
+        _contadores[(metrica, etiqueta)] = _contadores.get((metrica, etiqueta), 0) + cantidad
+
+
+def medir_layout(pagina, funcion):
+    """Envuelve la función layout de una página: latencia y errores por página."""
+    @functools.wraps(funcion)
+    def envuelta(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        except Exception:
+            contar('fondo_layout_errores_total', pagina)
+            raise
+        finally:
+            observar('fondo_layout_duracion_segundos', time.perf_counter() - inicio, pagina)
+    return envuelta
+
+
+# --- CALLBACKS: se miden en la petición de Flask (cubre todos los @callback sin tocar cada uno) ---
+def _es_callback():
+    return request.path.endswith('_dash-update-component')
+
+
+def _nombre_callback():
+    return origen_peticion().removeprefix('callback ')
+
+
+def _inicio_callback():
+    if _es_callback():
+        g.inicio_callback = time.perf_counter()
+
+
+def _fin_callback(respuesta):
+    if _es_callback() and 'inicio_callback' in g:
+        nombre = _nombre_callback()
+        observar('fondo_callback_duracion_segundos', time.perf_counter() - g.pop('inicio_callback'), nombre)
+        observar('fondo_callback_respuesta_bytes', respuesta.calculate_content_length() or 0, nombre)
+        if respuesta.status_code >= 500:
+            contar('fondo_callback_errores_total', nombre)
+    return respuesta
+
+
+def _error_callback(excepcion=None):
+    # Excepción que no alcanzó a convertirse en respuesta (after_request no corre)
+    if excepcion is not None and _es_callback() and 'inicio_callback' in g:
+        nombre = _nombre_callback()
+        observar('fondo_callback_duracion_segundos', time.perf_counter() - g.pop('inicio_callback'), nombre)
+        contar('fondo_callback_errores_total', nombre)
+
+
+# =========================================================
+# FORMATO DE TEXTO DE PROMETHEUS
+# =========================================================
+def _etiquetas(**valores):
+    partes = [f'{k}="{_escapar(v)}"' for k, v in valores.items() if v is not None]
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def _lineas_metricas_propias(pid):
+    lineas = []
+    with _candado:
+        histogramas = {k: (list(c), s) for k, (c, s) in _histogramas.items()}
+        contadores = dict(_contadores)
+
+    for metrica, (tipo, ayuda, nombre_etiqueta) in DESCRIPCIONES.items():
+        lineas += [f"# HELP {metrica} {ayuda}", f"# TYPE {metrica} {tipo}"]
+        limites = LIMITES_BYTES if metrica.endswith('_bytes') else LIMITES_SEGUNDOS
+        for (m, etiqueta), valor in sorted((contadores if tipo == 'counter' else histogramas).items()):
+            if m != metrica:
+                continue
+            base = {'pid': pid}
+            if nombre_etiqueta:
+                base[nombre_etiqueta] = etiqueta
+            if tipo == 'counter':
+                lineas.append(f"{metrica}{_etiquetas(**base)} {valor}")
+                continue
+            conteos, suma = valor
+            acumulado = 0
+            for limite, conteo in zip(limites + ['+Inf'], conteos):
+                acumulado += conteo
+                lineas.append(f"{metrica}_bucket{_etiquetas(**base, le=limite)} {acumulado}")
+            lineas.append(f"{metrica}_sum{_etiquetas(**base)} {suma}")
+            lineas.append(f"{metrica}_count{_etiquetas(**base)} {acumulado}")
+    return lineas
+
+
+def _lineas_pool(pid):
+    pool = db.engine.pool
+    lineas = []
+    for nombre, metodo, ayuda in [('fondo_db_pool_tamano', 'size', 'Conexiones que mantiene el pool'),
+                                  ('fondo_db_pool_en_uso', 'checkedout', 'Conexiones prestadas ahora'),
+                                  ('fondo_db_pool_libres', 'checkedin', 'Conexiones libres en el pool'),
+                                  ('fondo_db_pool_desborde', 'overflow', 'Conexiones por encima del tamaño del pool')]:
+        if hasattr(pool, metodo):
+            lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} gauge",
+                       f"{nombre}{_etiquetas(pid=pid, pool=type(pool).__name__)} {getattr(pool, metodo)()}"]
+    return lineas
+
+
+def _lineas_sql(pid):
+    lineas = ["# HELP fondo_sql_sentencias_total Sentencias SQL por callback o ruta", "# TYPE fondo_sql_sentencias_total counter"]
+    tiempos = ["# HELP fondo_sql_tiempo_segundos_total Tiempo en la base por callback o ruta", "# TYPE fondo_sql_tiempo_segundos_total counter"]
+    for fila in estadisticas_sql():
+        etiquetas = _etiquetas(pid=pid, origen=fila['origen'])
+        lineas.append(f"fondo_sql_sentencias_total{etiquetas} {fila['sentencias']}")
+        tiempos.append(f"fondo_sql_tiempo_segundos_total{etiquetas} {fila['tiempo_ms'] / 1000}")
+    return lineas + tiempos
+
+
+def _lineas_caches(pid, caches):
+    lineas = []
+    for nombre_metrica, campo, tipo in [('fondo_cache_aciertos_total', 'aciertos', 'counter'),
+                                        ('fondo_cache_fallos_total', 'fallos', 'counter'),
+                                        ('fondo_cache_tamano', 'tamano', 'gauge'),
+                                        ('fondo_cache_maximo', 'maximo', 'gauge')]:
+        lineas.append(f"# TYPE {nombre_metrica} {tipo}")
+        for cache, estadisticas in caches.items():
+            valor = estadisticas().get(campo)
+            if valor is not None:
+                lineas.append(f"{nombre_metrica}{_etiquetas(pid=pid, cache=cache)} {valor}")
+    return lineas
+
+
+def texto_metricas(caches=None):
+    pid = os.getpid()
+    lineas = [
+        "# HELP fondo_worker_info Proceso que respondió (una serie por worker)",
+        "# TYPE fondo_worker_info gauge",
+        f"fondo_worker_info{_etiquetas(pid=pid, host=socket.gethostname(), python=platform.python_version())} 1",
+        "# TYPE fondo_worker_inicio_segundos gauge",
+        f"fondo_worker_inicio_segundos{_etiquetas(pid=pid)} {INICIO_PROCESO}",
+        "# TYPE fondo_worker_hilos gauge",
+        f"fondo_worker_hilos{_etiquetas(pid=pid)} {threading.active_count()}",
+    ]
+    lineas += _lineas_metricas_propias(pid) + _lineas_pool(pid) + _lineas_sql(pid) + _lineas_caches(pid, caches or {})
+    return "\n".join(lineas) + "\n"
+
+
+# =========================================================
+# RUTAS
+# =========================================================
+def registrar_rutas_metricas(server, caches=None):
+    """
+    Mide todos los callbacks de Dash (latencia, errores, tamaño de respuesta) y publica:
+    GET /metrics -> formato de texto de Prometheus (callbacks, layouts, pool de la BD, SQL, cachés, worker)
+    GET /healthz -> 200 con el tiempo de un SELECT 1, o 503 si la base no responde
+    caches: {nombre: función que devuelve {'aciertos', 'fallos', 'tamano', 'maximo'}}
+    """
+    server.before_request(_inicio_callback)
+    server.after_request(_fin_callback)
+    server.teardown_request(_error_callback)
+
+    @server.route('/metrics')
+    def metricas():
+        return Response(texto_metricas(caches), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    @server.route('/healthz')
+    def salud():
+        inicio = time.perf_counter()
+        try:
+            db.session.execute(text('SELECT 1')).scalar()
+        except Exception as e:
+            db.session.rollback()
+            return jsonify(estado='error', error=str(e), pid=os.getpid()), 503
+        segundos = time.perf_counter() - inicio
+        observar('fondo_healthz_db_segundos', segundos)
+        return jsonify(estado='ok', db_ms=round(segundos * 1000, 3), pid=os.getpid())
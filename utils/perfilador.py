@@ -0,0 +1,184 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from flask import request, g, abort, send_from_directory
+from flask_login import current_user
+from database.db import origen_peticion
+from utils.config import INTERVALO_PERFILADOR_MS, PERFILES_GUARDADOS
+
+# Perfilador por muestreo: mientras está armado, cada petición que coincide se perfila tomando la pila de su hilo
+# cada INTERVALO_PERFILADOR_MS (layout, figuras de Plotly, SQL y serialización JSON quedan dentro).
+# El resultado es un archivo speedscope (https://www.speedscope.app) en instance/perfiles/.
+# Apagado, cada petición solo revisa que _modo sea None. El modo es de este proceso (cada worker arma el suyo).
+_candado = threading.Lock()
+_modo = None # {'restantes': N, 'filtro': texto}
+_carpeta = None
+
+# Rutas que nunca se perfilan (archivos estáticos de Dash y el propio monitoreo)
+RUTAS_IGNORADAS = ('/_dash-component-suites', '/_dash-layout', '/_dash-dependencies', '/_reload-hash',
+                   '/_favicon.ico', '/assets', '/metrics', '/healthz', '/admin/perfiles')
+
+
+# =========================================================
+# MUESTREO
+# =========================================================
+class Muestreador(threading.Thread):
+    """Toma la pila del hilo 'hilo_id' cada 'intervalo' segundos hasta que se llama a detener()."""
+
+    def __init__(self, hilo_id, intervalo):
+        super().__init__(name='perfilador', daemon=True)
+        self.hilo_id = hilo_id
+        self.intervalo = intervalo
+        self.muestras = [] # (pila de la raíz a la hoja, segundos desde la muestra anterior)
+        self._parar = threading.Event()
+
+    def run(self):
+        anterior = time.perf_counter()
+        while not self._parar.wait(self.intervalo):
+            marco = sys._current_frames().get(self.hilo_id)
+            ahora = time.perf_counter()
+            if marco is None:
+                break
+            pila = []
+            while marco is not None:
+                codigo = marco.f_code
+                pila.append((codigo.co_qualname, codigo.co_filename, codigo.co_firstlineno))
+                marco = marco.f_back
+            self.muestras.append((pila[::-1], ahora - anterior))
+            anterior = ahora
+
+    def detener(self):
+        self._parar.set()
+        self.join()
+
+
+def a_speedscope(muestras, nombre, duracion):
+    """Perfil en el formato de archivo de speedscope (tipo 'sampled', pesos en milisegundos)."""
+    indices, marcos, pilas, pesos = {}, [], [], []
+    for pila, segundos in muestras:
+        fila = []
+        for marco in pila:
+            if marco not in indices:
+                indices[marco] = len(marcos)
+                marcos.append({'name': marco[0], 'file': marco[1], 'line': marco[2]})
+            fila.append(indices[marco])
+        pilas.append(fila)
+        pesos.append(round(segundos * 1000, 3))
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': nombre,
+        'exporter': 'fondo perfilador',
+        'shared': {'frames': marcos},
+        'profiles': [{'type': 'sampled', 'name': nombre, 'unit': 'milliseconds',
+                      'startValue': 0, 'endValue': round(duracion * 1000, 3),
+                      'samples': pilas, 'weights': pesos}],
+    }
+
+
+# =========================================================
+# CONTROL (página /admin_sql)
+# =========================================================
+def activar_perfilador(peticiones=5, filtro=''):
+    """Perfila las próximas 'peticiones' que coincidan con 'filtro' (ruta, id de callback o página; vacío = todas)."""
+    global _modo
+    with _candado:
+        _modo = {'restantes': max(1, int(peticiones)), 'filtro': (filtro or '').strip()}
+
+
+def desactivar_perfilador():
+    global _modo
+    with _candado:
+        _modo = None
+
+
+def estado_perfilador():
+    """{'restantes', 'filtro'} si está armado, None si está apagado."""
+    with _candado:
+        return dict(_modo) if _modo else None
+
+
+def perfiles_guardados():
+    """[{'nombre', 'fecha', 'kb'}] de los perfiles en instance/perfiles/, el más reciente primero."""
+    if not _carpeta or not os.path.isdir(_carpeta):
+        return []
+    perfiles = []
+    for nombre in os.listdir(_carpeta):
+        if nombre.endswith('.speedscope.json'):
+            info = os.stat(os.path.join(_carpeta, nombre))
+            perfiles.append({'nombre': nombre, 'fecha': datetime.fromtimestamp(info.st_mtime), 'kb': info.st_size / 1024})
+    return sorted(perfiles, key=lambda p: p['fecha'], reverse=True)
+
+
+# =========================================================
+# PETICIONES
+# =========================================================
+def _descripcion_peticion():
+    """Texto contra el que se compara el filtro: ruta o callback, más los valores de texto de sus inputs (ej: la página)."""
+    origen = origen_peticion()
+    if not origen.startswith('callback '):
+        return origen
+    cuerpo = request.get_json(silent=True) or {}
+    valores = [str(i.get('value')) for i in cuerpo.get('inputs', []) if isinstance(i, dict) and isinstance(i.get('value'), str)]
+    return ' '.join([origen] + valores)
+
+
+def _inicio_peticion():
+    global _modo
+    if _modo is None or request.path.startswith(RUTAS_IGNORADAS):
+        return
+    descripcion = _descripcion_peticion()
+    with _candado:
+        if _modo is None or _modo['filtro'] not in descripcion:
+            return
+        _modo['restantes'] -= 1
+        if _modo['restantes'] <= 0:
+            _modo = None
+    muestreador = Muestreador(threading.get_ident(), INTERVALO_PERFILADOR_MS / 1000)
+    g.perfil = (muestreador, descripcion, time.perf_counter())
+    muestreador.start()
+
+
+def _fin_peticion(excepcion=None):
+    if 'perfil' not in g:
+        return
+    muestreador, descripcion, inicio = g.pop('perfil')
+    muestreador.detener()
+    duracion = time.perf_counter() - inicio
+    _guardar_perfil(a_speedscope(muestreador.muestras, descripcion, duracion), descripcion)
+
+
+def _guardar_perfil(perfil, descripcion):
+    os.makedirs(_carpeta, exist_ok=True)
+    nombre_seguro = re.sub(r'[^A-Za-z0-9_.-]+', '_', descripcion.removeprefix('callback '))[:80].strip('_')
+    nombre = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid()}-{nombre_seguro}.speedscope.json"
+    with open(os.path.join(_carpeta, nombre), 'w', encoding='utf-8') as archivo:
+        json.dump(perfil, archivo)
+    # Solo se guardan los PERFILES_GUARDADOS más recientes
+    for viejo in perfiles_guardados()[PERFILES_GUARDADOS:]:
+        try:
+            os.remove(os.path.join(_carpeta, viejo['nombre']))
+        except OSError:
+            pass # Otro worker ya lo borró
+
+
+def registrar_perfilador(server):
+    """
+    Engancha el perfilador a las peticiones de Flask y publica los perfiles:
+    GET /admin/perfiles/<archivo> -> descarga un perfil (solo administradores)
+    """
+    global _carpeta
+    _carpeta = os.path.join(server.instance_path, 'perfiles')
+    server.before_request(_inicio_peticion)
+    server.teardown_request(_fin_peticion)
+
+    @server.route('/admin/perfiles/<nombre>')
+    def descargar_perfil(nombre):
+        if not current_user.is_authenticated or current_user.rol != 'admin':
+            abort(403)
+        if not nombre.endswith('.speedscope.json'):
+            abort(404)
+        return send_from_directory(_carpeta, nombre, as_attachment=True)
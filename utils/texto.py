@@ -0,0 +1,7 @@
+import unicodedata
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sin tildes y con espacios simples ('  Ángela  Muñoz' -> 'angela munoz')."""
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode()
+    return ' '.join(texto.lower().split())